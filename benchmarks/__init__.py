@@ -0,0 +1 @@
+"""Data-layer micro-benchmarks (run with ``python -m benchmarks``)."""
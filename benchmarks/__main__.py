@@ -0,0 +1,109 @@
+"""Run the data-layer benchmarks and compare against earlier runs.
+
+Usage:
+    python -m benchmarks run                      # 10K-row fixture, append to history
+    python -m benchmarks run --size 1m --compare  # run, then flag regressions
+    python -m benchmarks compare --size 1m --baseline a1b2c3d
+    python -m benchmarks list
+"""
+
+from __future__ import annotations
+
+import argparse
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional, Sequence
+
+from benchmarks import app_startup, data_layer  # noqa: F401  (registers the cases)
+from benchmarks.fixtures import SIZES, get_fixture
+from benchmarks.harness import (
+    DEFAULT_HISTORY,
+    DEFAULT_THRESHOLD,
+    append_history,
+    cases,
+    compare_runs,
+    load_history,
+    make_run,
+    measure,
+    select_runs,
+)
+from scripts import commonmethod
+from scripts.connection_pool import close_all_pools
+
+
+def _run_size(size: str, pattern: str, budget: float, rebuild: bool) -> dict:
+    print(f"Preparing {size} fixture ...", flush=True)
+    fixture = get_fixture(size, rebuild=rebuild)
+    workdir = Path(tempfile.mkdtemp(prefix="bench-"))
+    db_path = workdir / "BankSight.db"
+    # Cases may write; keep the fixture itself pristine
+    shutil.copyfile(fixture.db_path, db_path)
+    commonmethod.DB_PATH = str(db_path)
+    results = {}
+    try:
+        for c in cases(pattern):
+            commonmethod.invalidate_cache()
+            fn = c.setup(fixture, db_path)
+            stats = measure(fn, max_rounds=c.max_rounds, budget=budget, warmup=c.warmup)
+            results[c.name] = stats
+            print(f"  {c.name:<45} median {stats['median'] * 1000:10.3f} ms  ({stats['rounds']} rounds)", flush=True)
+    finally:
+        close_all_pools()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return make_run(size, results)
+
+
+def _print_comparison(baseline: dict, current: dict, threshold: float) -> int:
+    rows = compare_runs(baseline, current, threshold)
+    print(f"\n{current['size']}: {baseline['revision']} ({baseline['timestamp']}) -> "
+          f"{current['revision']} ({current['timestamp']})")
+    for name, base, cur, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"  {name:<45} {base * 1000:10.3f} -> {cur * 1000:10.3f} ms  {change:+7.1%}{flag}")
+    regressions = sum(1 for row in rows if row[4])
+    if regressions:
+        print(f"{regressions} case(s) slower than the {threshold:.0%} threshold.")
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="BankSight data-layer benchmarks.")
+    parser.add_argument("command", choices=["run", "compare", "list"])
+    parser.add_argument("--size", action="append", choices=list(SIZES), help="Fixture size (repeatable, default 10k)")
+    parser.add_argument("-k", "--filter", default="", help="Only cases whose name contains this")
+    parser.add_argument("--history", type=Path, default=DEFAULT_HISTORY, help="JSON history file")
+    parser.add_argument("--budget", type=float, default=1.0, help="Seconds to spend timing each case")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Regression threshold (0.1 = 10%%)")
+    parser.add_argument("--baseline", help="Compare against the latest run at this git revision")
+    parser.add_argument("--compare", action="store_true", help="After 'run', compare with the baseline")
+    parser.add_argument("--rebuild-fixtures", action="store_true")
+    args = parser.parse_args(argv)
+    sizes = args.size or ["10k"]
+
+    if args.command == "list":
+        for c in cases(args.filter):
+            print(f"{c.group:<14} {c.name}")
+        return 0
+
+    if args.command == "run":
+        for size in sizes:
+            run = _run_size(size, args.filter, args.budget, args.rebuild_fixtures)
+            append_history(run, args.history)
+        if not args.compare:
+            return 0
+
+    runs = load_history(args.history)
+    regressions = 0
+    for size in sizes:
+        baseline, current = select_runs(runs, size, args.baseline)
+        if current is None or baseline is None:
+            print(f"{size}: need a current run and a baseline run in {args.history}.")
+            continue
+        regressions += _print_comparison(baseline, current, args.threshold)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
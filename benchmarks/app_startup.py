@@ -0,0 +1,35 @@
+"""Benchmark cases for Streamlit app start-up and per-rerun overhead."""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.harness import case
+from scripts.page_registry import page_names
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@case("app.cold_import", "app", max_rounds=10)
+def _cold_import(fixture, db_path):
+    # A fresh interpreter importing main.py, as a new replica does on first request
+    cmd = [sys.executable, "-c", "import main"]
+    return lambda: subprocess.run(cmd, cwd=ROOT, check=True)
+
+
+def _rerun_case(page):
+    @case(f"app.rerun.{page}", "app", max_rounds=50)
+    def _setup(fixture, db_path):
+        from streamlit.testing.v1 import AppTest
+
+        at = AppTest.from_file(str(ROOT / "main.py"), default_timeout=120)
+        at.run()
+        at.sidebar.radio[0].set_value(page).run()
+        # Timed: a plain rerun of the already selected page
+        return at.run
+
+
+for _page in page_names():
+    _rerun_case(_page)
@@ -0,0 +1,118 @@
+"""Benchmark cases for scripts.commonmethod, the Insights SQL, CRUD lookups, the loader, postings and loan risk."""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.harness import case
+from scripts.amortization import refresh_amortization
+from scripts.commonmethod import execute_action, get_connection, run_query
+from scripts.dbsetup import BankSightDB
+from scripts.indexes import REGISTERED_QUERIES
+from scripts.insights_registry import categories, insights_for
+from scripts.ledger import Posting, post_batch
+from scripts.stress_test import SCENARIOS, ensure_stress_tables, run_stress_test
+from scripts.txn_import import import_transactions
+
+
+@case("commonmethod.run_query", "commonmethod")
+def _run_query(fixture, db_path):
+    return lambda: run_query("SELECT account_balance FROM accounts WHERE account_id = ?", (1,))
+
+
+@case("commonmethod.run_query_cached", "commonmethod")
+def _run_query_cached(fixture, db_path):
+    return lambda: run_query("SELECT account_balance FROM accounts WHERE account_id = ?", (1,), cache=True)
+
+
+@case("commonmethod.execute_action", "commonmethod")
+def _execute_action(fixture, db_path):
+    return lambda: execute_action(
+        "UPDATE accounts SET account_balance = account_balance WHERE account_id = ?", (1,)
+    )
+
+
+def _insight_case(query):
+    @case(f"insights.{query.id}", "insights")
+    def _setup(fixture, db_path):
+        # Loans are priced and the stress tables exist before the Insights page runs its queries
+        refresh_amortization()
+        ensure_stress_tables(get_connection())
+        # Uncached: this measures the SQL, not the result cache
+        return lambda: run_query(query.sql, query.params or None)
+
+
+for _category in categories():
+    for _query in insights_for(_category):
+        _insight_case(_query)
+
+
+def _lookup_case(planned):
+    @case(f"crud_lookup.{planned.name}", "crud_lookup")
+    def _setup(fixture, db_path):
+        # Bind the catalog's sample parameters to values present in the fixture
+        customer_id, name = get_connection().execute("SELECT customer_id, name FROM customers LIMIT 1").fetchone()
+        sample = {"C0001": customer_id, "x": name}
+        params = tuple(sample.get(p, p) for p in planned.params)
+        return lambda: run_query(planned.sql, params or None)
+
+
+for _planned in REGISTERED_QUERIES:
+    if not _planned.name.startswith("q"):
+        _lookup_case(_planned)
+
+
+@case("dbsetup.transform_and_load", "etl", max_rounds=3, warmup=False)
+def _transform_and_load(fixture, db_path):
+    source = fixture.datasets()
+    transactions = next(path for path, table in source.items() if table == "transactions")
+    # Lives in the runner's scratch directory, which is removed afterwards
+    target = Path(db_path).parent / "load.db"
+
+    def load():
+        shutil.copyfile(fixture.schema_path, target)
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = BankSightDB(str(target))
+            db.transform_and_load(transactions, "transactions")
+            db.close_connection()
+
+    return load
+
+
+@case("ledger.post_batch_1000", "ledger", max_rounds=20)
+def _post_batch(fixture, db_path):
+    account_id, customer_id = get_connection().execute(
+        "SELECT account_id, customer_id FROM accounts WHERE customer_id IS NOT NULL LIMIT 1"
+    ).fetchone()
+    postings = [Posting(account_id, customer_id, "Deposit", 1.0) for _ in range(1000)]
+    return lambda: post_batch(postings)
+
+
+@case("txn_import.validate_10k", "ledger", max_rounds=10)
+def _import_dry_run(fixture, db_path):
+    # A month-end style file over the fixture's accounts; dry run so rounds don't accumulate
+    accounts = run_query("SELECT account_id, customer_id FROM accounts WHERE customer_id IS NOT NULL")
+    rows = accounts.sample(10_000, replace=True, random_state=0).reset_index(drop=True)
+    rows["txn_type"] = ["Deposit", "Withdrawal", "Debit", "Transfer"] * 2_500
+    rows["amount"] = 500.0
+    rows["txn_time"] = pd.date_range("2024-01-01", periods=10_000, freq="min").strftime("%Y-%m-%d %H:%M:%S")
+    source = Path(db_path).parent / "month_end.csv"
+    rows.to_csv(source, index=False)
+    return lambda: import_transactions(str(source), rejects_path=str(source.with_suffix(".rejects.csv")), dry_run=True)
+
+
+@case("amortization.reprice_all", "amortization", max_rounds=10)
+def _reprice_all(fixture, db_path):
+    # Every loan read, priced and written back each round
+    return lambda: refresh_amortization(reprice=True)
+
+
+@case("stress_test.recession_2k_paths", "stress_test", max_rounds=5)
+def _stress_test(fixture, db_path):
+    # One worker: per-core throughput; the pool scales it with cores
+    return lambda: run_stress_test(SCENARIOS["recession"], paths=2_000, workers=1)
@@ -0,0 +1,104 @@
+"""Synthetic, seeded datasets at benchmark scale.
+
+A fixture is a directory holding source files from ``scripts.datagen`` and a
+SQLite database built from them with the regular schema and loader. Fixtures
+are generated once per size and reused from ``benchmarks/.fixtures/`` until
+the schema ``scripts.dbsetup`` creates (tables, managed indexes, summary
+triggers) changes, so timings never run against a stale schema.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import io
+import shutil
+import sqlite3
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict
+
+from scripts.datagen import DatasetPlan, dataset_paths, generate_files
+from scripts.dbsetup import BankSightDB
+from scripts.etl import load_datasets
+
+FIXTURE_ROOT = Path(__file__).resolve().parent / ".fixtures"
+
+# Size name -> transaction rows; the other tables scale with it
+SIZES: Dict[str, int] = {
+    "10k": 10_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+}
+
+SEED = 20240501
+
+
+@dataclass(frozen=True)
+class Fixture:
+    """Paths of a generated dataset."""
+
+    size: str
+    rows: int
+    directory: Path
+
+    @property
+    def db_path(self) -> Path:
+        return self.directory / "BankSight.db"
+
+    @property
+    def schema_path(self) -> Path:
+        """Empty database with the full schema, for load benchmarks."""
+        return self.directory / "schema.db"
+
+    def datasets(self) -> Dict[str, str]:
+        """Source file -> table, in the same shape as ``scripts.dbsetup.datasets``."""
+        return dataset_paths(str(self.directory))
+
+
+def _create_schema(db_path: Path) -> None:
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = BankSightDB(str(db_path))
+        db.create_tables()
+        db.close_connection()
+
+
+def schema_fingerprint() -> str:
+    """Hash of the schema a fresh ``BankSightDB.create_tables`` builds."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "schema.db"
+        _create_schema(db_path)
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute(
+                "SELECT type, name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%' ORDER BY type, name"
+            ).fetchall()
+        finally:
+            conn.close()
+    return hashlib.sha256(repr(rows).encode()).hexdigest()
+
+
+def get_fixture(size: str, rebuild: bool = False) -> Fixture:
+    """Return the fixture for ``size`` (a SIZES key), generating it if needed.
+
+    The ``.complete`` marker records the :func:`schema_fingerprint` the
+    fixture was built with; a fixture from an older schema is rebuilt.
+    """
+    if size not in SIZES:
+        raise ValueError(f"Unknown fixture size {size!r}; choose from {', '.join(SIZES)}")
+    fixture = Fixture(size, SIZES[size], FIXTURE_ROOT / size)
+    marker = fixture.directory / ".complete"
+    fingerprint = schema_fingerprint()
+    if marker.exists() and marker.read_text() == fingerprint and not rebuild:
+        return fixture
+
+    shutil.rmtree(fixture.directory, ignore_errors=True)
+    fixture.directory.mkdir(parents=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        generate_files(DatasetPlan.for_transactions(fixture.rows, SEED), str(fixture.directory))
+    _create_schema(fixture.schema_path)
+    shutil.copyfile(fixture.schema_path, fixture.db_path)
+    load_datasets(str(fixture.db_path), fixture.datasets(), incremental=False)
+    marker.write_text(fingerprint)
+    return fixture
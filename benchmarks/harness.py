@@ -0,0 +1,166 @@
+"""Minimal benchmark runner: case registry, timing, JSON history and comparison."""
+
+from __future__ import annotations
+
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_HISTORY = Path(__file__).resolve().parent / "history.json"
+# Relative slowdown of the median that counts as a regression
+DEFAULT_THRESHOLD = 0.10
+
+
+@dataclass(frozen=True)
+class Case:
+    """One benchmark.
+
+    ``setup(fixture, db_path)`` runs untimed and returns the zero-argument
+    callable that is timed.
+    """
+
+    name: str
+    group: str
+    setup: Callable[..., Callable[[], Any]]
+    max_rounds: int = 200
+    warmup: bool = True
+
+
+_cases: Dict[str, Case] = {}
+
+
+def case(name: str, group: str, max_rounds: int = 200, warmup: bool = True):
+    """Decorator registering a setup function as a benchmark case."""
+
+    def register(setup):
+        if name in _cases:
+            raise ValueError(f"Benchmark {name!r} is already registered")
+        _cases[name] = Case(name, group, setup, max_rounds, warmup)
+        return setup
+
+    return register
+
+
+def cases(pattern: str = "") -> List[Case]:
+    return [c for c in _cases.values() if pattern in c.name]
+
+
+def measure(
+    fn: Callable[[], Any],
+    max_rounds: int = 200,
+    min_rounds: int = 3,
+    budget: float = 1.0,
+    warmup: bool = True,
+) -> Dict[str, float]:
+    """Time ``fn`` repeatedly and summarize the per-call wall times in seconds.
+
+    Runs at least ``min_rounds`` and then keeps going until ``budget`` seconds
+    have been spent or ``max_rounds`` is reached.
+    """
+    if warmup:
+        fn()
+    times: List[float] = []
+    spent = 0.0
+    while len(times) < min_rounds or (spent < budget and len(times) < max_rounds):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        spent += elapsed
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "rounds": len(times),
+    }
+
+
+def _revision() -> Tuple[str, bool]:
+    try:
+        rev = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip()
+        )
+        return rev, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def make_run(size: str, results: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+    revision, dirty = _revision()
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": revision,
+        "dirty": dirty,
+        "size": size,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.node(),
+        "results": results,
+    }
+
+
+def load_history(path: Path = DEFAULT_HISTORY) -> List[Dict[str, Any]]:
+    if not Path(path).exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("runs", [])
+
+
+def append_history(run: Dict[str, Any], path: Path = DEFAULT_HISTORY) -> None:
+    runs = load_history(path)
+    runs.append(run)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"runs": runs}, f, indent=2)
+        f.write("\n")
+
+
+def compare_runs(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> List[Tuple[str, float, float, float, bool]]:
+    """Compare median times of the cases both runs share.
+
+    Returns:
+        ``(case, baseline median, current median, relative change, regressed)``
+        per shared case, where ``regressed`` means the change exceeds ``threshold``.
+    """
+    rows = []
+    for name, cur in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        change = cur["median"] / base["median"] - 1 if base["median"] else 0.0
+        rows.append((name, base["median"], cur["median"], change, change > threshold))
+    return rows
+
+
+def select_runs(
+    runs: List[Dict[str, Any]],
+    size: str,
+    baseline: Optional[str] = None,
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Return ``(baseline, current)``: the latest run of ``size`` and the one to compare it with.
+
+    The baseline is the previous run of the same size, or the latest earlier
+    run whose revision starts with ``baseline``.
+    """
+    same = [r for r in runs if r["size"] == size]
+    if not same:
+        return None, None
+    current = same[-1]
+    earlier = same[:-1]
+    if baseline is not None:
+        earlier = [r for r in earlier if r["revision"].startswith(baseline)]
+    return (earlier[-1] if earlier else None), current
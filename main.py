@@ -1,33 +1,27 @@
 import streamlit as st
-import sqlite3
-import pandas as pd
-import datetime
-import pandas as pd
-from scripts.home import HomePage
-from scripts.export import DataExplorer
-from scripts.Insights import InsightsPage
-from scripts.crud import CRUDOperationsPage
-from scripts.about import AboutPage
+from scripts.commonmethod import get_connection
+from scripts.page_profiler import profile_render
+from scripts.page_registry import PAGES, get_page, page_names
 
-# Page Config
 def main():
+    # Page Config (must run before anything else renders)
+    st.set_page_config(page_title="BankSight Dashboard", layout="wide")
+
     st.sidebar.title("Navigation")
-    selection = st.sidebar.radio("Go to", ["Home", "Explorer", "Insights", "CRUD", "About"])
-    
-    # Persistent Connection
-    conn = sqlite3.connect("Database/BankSight.db", check_same_thread=False)
+    selection = st.sidebar.radio("Go to", page_names())
+
+    # Pooled connection: reused across reruns instead of reopened every time
+    conn = get_connection()
 
-    # Dictionary mapping selection to Class instances
-    pages = {
-        "Home": HomePage(),
-        "Explorer": DataExplorer(),
-        "Insights": InsightsPage(),
-        "CRUD": CRUDOperationsPage(),
-        "About": AboutPage()  
-    }
+    # Hidden pages (e.g. ?page=performance) replace the sidebar selection
+    requested = st.query_params.get("page", "").capitalize()
+    if requested in PAGES and PAGES[requested].hidden:
+        selection = requested
 
-    # Execute the render method of the selected page
-    pages[selection].render(conn)
+    # Only the selected page's module is imported and built (once per process);
+    # ?profile=1 saves a cProfile of the render
+    with profile_render(selection, conn, capture=st.query_params.get("profile") == "1"):
+        get_page(selection).render(conn)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
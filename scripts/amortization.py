@@ -0,0 +1,347 @@
+"""Vectorized loan amortization: EMI, schedules and outstanding principal.
+
+Every loan is treated as a standard reducing-balance loan. Installment ``i``
+falls due ``i`` months after ``start_date`` (clamped to the month end). The
+installment (EMI) and the balance left after ``k`` installments have closed
+forms::
+
+    r = interest_rate / 1200
+    EMI = P * r * (1 + r)^n / ((1 + r)^n - 1)          (P / n when r == 0)
+    B_k = P * (1 + r)^k - EMI * ((1 + r)^k - 1) / r    (P - EMI * k when r == 0)
+
+so a whole portfolio is priced with a handful of NumPy array operations and
+no per-loan Python. ``refresh_amortization`` stores one row per loan in
+``loan_amortization``: the terms it was priced on, EMI, total interest and the
+position as of a date (installments paid, outstanding principal). Insights and
+the loan CRUD page read that table. A full schedule is expanded on demand with
+``build_schedules``.
+
+``principal`` is the loan amount when the loan was first priced (or last
+re-priced from the loan form). Payments later settled against the loan
+reduce ``loans.loan_amount``. The outstanding principal is the scheduled
+balance, but never more than that book amount. Closed loans owe nothing.
+
+Usage:
+    python -m scripts.amortization                    # price new/changed loans as of today
+    python -m scripts.amortization --as-of 2026-12-31 --full
+    python -m scripts.amortization --schedule 42      # print one loan's schedule
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import sqlite3
+import sys
+import time
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from scripts.commonmethod import get_connection, on_invalidate, run_query, write_transaction
+
+__all__ = [
+    "amortize",
+    "build_schedules",
+    "ensure_amortization",
+    "refresh_amortization",
+    "ensure_priced",
+    "loan_schedule",
+]
+
+CHUNK_SIZE = 250_000
+
+_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS loan_amortization (
+    loan_id INTEGER PRIMARY KEY,
+    principal REAL,
+    book_amount REAL,
+    annual_rate REAL,
+    term_months INTEGER,
+    start_date TEXT,
+    loan_status TEXT,
+    emi REAL,
+    total_interest REAL,
+    as_of TEXT NOT NULL,
+    installments_paid INTEGER,
+    outstanding_principal REAL
+)
+"""
+
+# A deleted loan takes its row with it; inserts and edits are picked up as stale
+_TRIGGER_SQL = """
+CREATE TRIGGER IF NOT EXISTS trg_loan_amortization_del AFTER DELETE ON loans
+BEGIN DELETE FROM loan_amortization WHERE loan_id = OLD.loan_id; END
+"""
+
+# Loans with no row yet, or whose terms, book amount, status or as-of date changed
+_STALE_SQL = """
+SELECT l.loan_id,
+       CASE WHEN :reprice OR a.principal IS NULL THEN l.loan_amount ELSE a.principal END AS principal,
+       l.loan_amount AS book_amount, l.interest_rate AS annual_rate, l.loan_term_months AS term_months,
+       l.start_date, l.loan_status
+FROM loans l LEFT JOIN loan_amortization a ON a.loan_id = l.loan_id
+WHERE l.loan_id > :after {only} AND (
+    a.loan_id IS NULL OR :reprice OR a.as_of IS NOT :as_of
+    OR a.book_amount IS NOT l.loan_amount OR a.annual_rate IS NOT l.interest_rate
+    OR a.term_months IS NOT l.loan_term_months OR a.start_date IS NOT l.start_date
+    OR a.loan_status IS NOT l.loan_status)
+ORDER BY l.loan_id
+LIMIT :limit
+"""
+
+# Computed columns are staged per chunk; the terms they were priced on are
+# copied from loans in the same set-based upsert
+_BATCH_SQL = """
+CREATE TEMP TABLE IF NOT EXISTS amortization_batch (
+    loan_id INTEGER PRIMARY KEY, principal REAL, emi REAL, total_interest REAL,
+    installments_paid INTEGER, outstanding_principal REAL
+)
+"""
+
+_MERGE_SQL = """
+INSERT INTO loan_amortization (
+    loan_id, principal, book_amount, annual_rate, term_months, start_date, loan_status,
+    emi, total_interest, as_of, installments_paid, outstanding_principal)
+SELECT b.loan_id, b.principal, l.loan_amount, l.interest_rate, l.loan_term_months, l.start_date, l.loan_status,
+       b.emi, b.total_interest, ?, b.installments_paid, b.outstanding_principal
+FROM temp.amortization_batch b JOIN loans l ON l.loan_id = b.loan_id
+WHERE true
+ON CONFLICT(loan_id) DO UPDATE SET
+    principal = excluded.principal, book_amount = excluded.book_amount,
+    annual_rate = excluded.annual_rate, term_months = excluded.term_months,
+    start_date = excluded.start_date, loan_status = excluded.loan_status,
+    emi = excluded.emi, total_interest = excluded.total_interest, as_of = excluded.as_of,
+    installments_paid = excluded.installments_paid, outstanding_principal = excluded.outstanding_principal
+"""
+
+
+def ensure_amortization(conn: sqlite3.Connection) -> None:
+    """Create ``loan_amortization`` and its delete trigger if missing."""
+    conn.execute(_TABLE_SQL)
+    conn.execute(_TRIGGER_SQL)
+    conn.commit()
+
+
+def _month_index(dates: pd.Series):
+    """Return (months since year 0, day of month) arrays; NaT gives -1 / 0."""
+    parsed = pd.to_datetime(dates, format="ISO8601", errors="coerce")
+    valid = parsed.notna().to_numpy()
+    months = np.where(valid, parsed.dt.year.fillna(0).to_numpy() * 12 + parsed.dt.month.fillna(1).to_numpy() - 1, -1)
+    return months.astype(np.int64), parsed.dt.day.fillna(0).to_numpy().astype(np.int64)
+
+
+def _days_in_month(months: np.ndarray) -> np.ndarray:
+    first = (months - 1970 * 12).astype("datetime64[M]")
+    return ((first + 1).astype("datetime64[D]") - first.astype("datetime64[D]")).astype(np.int64)
+
+
+def _emi_and_growth(principal: np.ndarray, annual_rate: np.ndarray, term: np.ndarray, k: np.ndarray):
+    """EMI and the balance after ``k`` installments, elementwise."""
+    r = annual_rate / 1200.0
+    zero = r == 0
+    safe_r = np.where(zero, 1.0, r)
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        growth_n = np.power(1.0 + r, term)
+        emi = np.where(zero, principal / term, principal * r * growth_n / (growth_n - 1.0))
+        growth_k = np.power(1.0 + r, k)
+        balance = np.where(zero, principal - emi * k, principal * growth_k - emi * (growth_k - 1.0) / safe_r)
+    return emi, np.where(k >= term, 0.0, np.maximum(balance, 0.0))
+
+
+def amortize(loans: pd.DataFrame, as_of: str) -> pd.DataFrame:
+    """Price every loan in ``loans`` as of ``as_of`` (``YYYY-MM-DD``).
+
+    Args:
+        loans: Columns ``principal``, ``annual_rate``, ``term_months``,
+            ``start_date``, and optionally ``book_amount`` and ``loan_status``.
+        as_of: Date the installments are counted up to (inclusive).
+
+    Returns:
+        ``loans`` with ``emi``, ``total_interest``, ``installments_paid``
+        and ``outstanding_principal`` added. Loans whose terms are missing
+        or invalid get NULL EMI and owe their full principal.
+    """
+    principal = pd.to_numeric(loans["principal"], errors="coerce").to_numpy(dtype=float)
+    rate = pd.to_numeric(loans["annual_rate"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    term = pd.to_numeric(loans["term_months"], errors="coerce").to_numpy(dtype=float)
+    start_month, start_day = _month_index(loans["start_date"])
+
+    day = datetime.date.fromisoformat(as_of)
+    as_of_month = day.year * 12 + day.month - 1
+    # Installments due on or before as_of; a due day past the month end falls on the last day
+    due_day = np.minimum(start_day, _days_in_month(np.array([as_of_month]))[0])
+    paid = as_of_month - start_month - (day.day < due_day)
+    priced = (start_month >= 0) & (term > 0) & np.isfinite(principal) & (rate >= 0)
+    paid = np.where(priced, np.clip(paid, 0, np.nan_to_num(term)), 0).astype(np.int64)
+
+    emi, balance = _emi_and_growth(principal, rate, np.where(priced, term, 1.0), paid)
+    emi = np.where(priced, emi, np.nan)
+    outstanding = np.where(priced, balance, principal)
+    if "book_amount" in loans:
+        book = pd.to_numeric(loans["book_amount"], errors="coerce").to_numpy(dtype=float)
+        outstanding = np.fmin(outstanding, np.maximum(book, 0.0))
+    if "loan_status" in loans:
+        outstanding = np.where(loans["loan_status"].to_numpy() == "Closed", 0.0, outstanding)
+
+    out = loans.copy()
+    out["emi"] = np.round(emi, 2)
+    out["total_interest"] = np.round(emi * term - principal, 2)
+    out["installments_paid"] = paid
+    out["outstanding_principal"] = np.round(outstanding, 2)
+    return out
+
+
+def build_schedules(loans: pd.DataFrame) -> pd.DataFrame:
+    """Expand priced loans into full schedules, one row per installment.
+
+    Args:
+        loans: Output of ``amortize`` (needs ``loan_id``, ``principal``,
+            ``annual_rate``, ``term_months``, ``start_date``, ``emi``).
+
+    Returns:
+        Columns ``loan_id``, ``installment``, ``due_date``, ``payment``,
+        ``interest``, ``principal``, ``balance``; built with ``np.repeat`` over
+        all loans at once. That is ``sum(term_months)`` rows, so expand the
+        loans of interest rather than a whole large book.
+    """
+    loans = loans[loans["emi"].notna()]
+    term = loans["term_months"].to_numpy(dtype=np.int64)
+    rows = np.repeat(np.arange(len(loans)), term)
+    # 1..n within each loan
+    installment = np.arange(len(rows)) - np.repeat(np.cumsum(term) - term, term) + 1
+
+    principal = loans["principal"].to_numpy(dtype=float)[rows]
+    rate = loans["annual_rate"].to_numpy(dtype=float)[rows]
+    emi, balance = _emi_and_growth(principal, rate, term[rows].astype(float), installment)
+    _, before = _emi_and_growth(principal, rate, term[rows].astype(float), installment - 1)
+    interest = before * rate / 1200.0
+
+    start_month, start_day = _month_index(loans["start_date"])
+    due_month = start_month[rows] + installment
+    due_day = np.minimum(start_day[rows], _days_in_month(due_month))
+    due = (due_month - 1970 * 12).astype("datetime64[M]").astype("datetime64[D]") + (due_day - 1)
+
+    # The last installment clears whatever rounding left over
+    payment = np.where(installment == term[rows], before + interest, emi)
+    return pd.DataFrame({
+        "loan_id": loans["loan_id"].to_numpy()[rows],
+        "installment": installment,
+        "due_date": np.datetime_as_string(due, unit="D"),
+        "payment": np.round(payment, 2),
+        "interest": np.round(interest, 2),
+        "principal": np.round(payment - interest, 2),
+        "balance": np.round(balance, 2),
+    })
+
+
+def refresh_amortization(
+    as_of: Optional[str] = None,
+    loan_ids: Optional[Sequence[int]] = None,
+    reprice: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    """Price new and changed loans into ``loan_amortization``.
+
+    Args:
+        as_of: Position date, ``YYYY-MM-DD``; defaults to today. Rows priced
+            as of another date are recomputed.
+        loan_ids: Only consider these loans.
+        reprice: Recompute even unchanged rows and take ``principal`` from the
+            current loan amount (after the loan's terms were edited).
+        chunk_size: Loans read, priced and written per round.
+
+    Returns:
+        Number of loans priced.
+    """
+    as_of = as_of or datetime.date.today().isoformat()
+    conn = get_connection()
+    ensure_amortization(conn)
+    only = "" if loan_ids is None else "AND l.loan_id IN (SELECT value FROM json_each(:loan_ids))"
+    params: Dict[str, object] = {
+        "as_of": as_of,
+        "reprice": int(reprice),
+        "limit": chunk_size,
+        "after": -1,
+        "loan_ids": json.dumps([int(i) for i in loan_ids or []]),
+    }
+
+    priced = 0
+    while True:
+        loans = pd.read_sql_query(_STALE_SQL.format(only=only), conn, params=params)
+        if loans.empty:
+            return priced
+        out = amortize(loans, as_of)
+        # NaN binds as NULL
+        records = zip(*(out[c].tolist() for c in (
+            "loan_id", "principal", "emi", "total_interest", "installments_paid", "outstanding_principal")))
+        with write_transaction("loan_amortization") as tx:
+            tx.execute(_BATCH_SQL)
+            tx.execute("DELETE FROM temp.amortization_batch")
+            tx.executemany("INSERT INTO temp.amortization_batch VALUES (?, ?, ?, ?, ?, ?)", records)
+            tx.execute(_MERGE_SQL, (as_of,))
+        priced += len(out)
+        params["after"] = int(loans["loan_id"].iloc[-1])
+
+
+_priced_on: Optional[str] = None
+
+
+def _note_loan_writes(tables) -> None:
+    global _priced_on
+    if tables is None or "loans" in tables:
+        _priced_on = None
+
+
+on_invalidate(_note_loan_writes)
+
+
+def ensure_priced() -> int:
+    """Re-price stale loans if ``loans`` was written to, or the day changed, since the last call."""
+    global _priced_on
+    today = datetime.date.today().isoformat()
+    if _priced_on == today:
+        return 0
+    priced = refresh_amortization(today)
+    _priced_on = today
+    return priced
+
+
+def loan_schedule(loan_id: int) -> pd.DataFrame:
+    """Return the full schedule of one loan, as last priced."""
+    row = run_query("SELECT * FROM loan_amortization WHERE loan_id = ?", (loan_id,))
+    if row.empty:
+        refresh_amortization(loan_ids=[loan_id])
+        row = run_query("SELECT * FROM loan_amortization WHERE loan_id = ?", (loan_id,))
+    return build_schedules(row)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from scripts import commonmethod
+
+    parser = argparse.ArgumentParser(description="Price loans: EMI, schedules and outstanding principal.")
+    parser.add_argument("--as-of", default=None, help="position date, YYYY-MM-DD (default: today)")
+    parser.add_argument("--full", action="store_true", help="re-price every loan from its current amount")
+    parser.add_argument("--schedule", type=int, default=None, metavar="LOAN_ID", help="print one loan's schedule")
+    parser.add_argument("--db", default=commonmethod.DB_PATH, help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    commonmethod.DB_PATH = args.db
+    if args.schedule is not None:
+        schedule = loan_schedule(args.schedule)
+        if schedule.empty:
+            print(f"Loan {args.schedule} not found or has no valid terms.")
+            return 1
+        print(schedule.to_string(index=False))
+        return 0
+
+    started = time.perf_counter()
+    priced = refresh_amortization(args.as_of, reprice=args.full)
+    print(f"Priced {priced:,} loans in {time.perf_counter() - started:.2f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Per-column statistics used to drive the Explorer's filter widgets.
+
+Statistics are computed with a handful of small SQL queries (a capped
+``SELECT DISTINCT``, one aggregate pass and, for low-cardinality columns, a
+value histogram) and cached per column. A write to a table only marks that
+table's columns stale; each column is recomputed the next time it is asked for.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from scripts.commonmethod import on_invalidate, run_query
+from scripts.table_query import table_columns
+
+__all__ = [
+    "DISTINCT_PROBE_LIMIT",
+    "LOW_CARDINALITY_LIMIT",
+    "ColumnStats",
+    "get_column_stats",
+]
+
+# Probe at most this many distinct values; a column reaching the cap is "high cardinality"
+DISTINCT_PROBE_LIMIT = 51
+# Columns with fewer distinct values than this get a multiselect instead of a text search
+LOW_CARDINALITY_LIMIT = 50
+TOP_N = 10
+
+
+@dataclass(frozen=True)
+class ColumnStats:
+    """Summary of one column's contents.
+
+    Attributes:
+        table: Table name.
+        column: Column name.
+        row_count: Rows in the table.
+        null_count: Rows where the column is NULL.
+        distinct_count: Distinct values, including NULL; capped at
+            DISTINCT_PROBE_LIMIT (see ``distinct_capped``).
+        distinct_capped: True when the real distinct count may be higher.
+        min_value: Smallest non-NULL value.
+        max_value: Largest non-NULL value.
+        distinct_values: All distinct values when the column is low-cardinality.
+        top_values: (value, count) pairs, most frequent first; only computed
+            for low-cardinality columns.
+    """
+
+    table: str
+    column: str
+    row_count: int
+    null_count: int
+    distinct_count: int
+    distinct_capped: bool
+    min_value: Any
+    max_value: Any
+    distinct_values: Tuple[Any, ...]
+    top_values: Tuple[Tuple[Any, int], ...]
+
+    @property
+    def low_cardinality(self) -> bool:
+        """True when the column should be filtered with a value multiselect."""
+        return not self.distinct_capped and self.distinct_count < LOW_CARDINALITY_LIMIT
+
+
+def _compute(table: str, column: str) -> ColumnStats:
+    col = '"' + column.replace('"', '""') + '"'
+    tbl = '"' + table.replace('"', '""') + '"'
+
+    distinct = run_query(f"SELECT DISTINCT {col} AS value FROM {tbl} LIMIT {DISTINCT_PROBE_LIMIT}")['value'].tolist()
+    capped = len(distinct) >= DISTINCT_PROBE_LIMIT
+
+    agg = run_query(f"SELECT COUNT(*), COUNT({col}), MIN({col}), MAX({col}) FROM {tbl}").iloc[0]
+    row_count, non_null = int(agg.iloc[0]), int(agg.iloc[1])
+
+    top: Tuple[Tuple[Any, int], ...] = ()
+    if not capped and len(distinct) < LOW_CARDINALITY_LIMIT:
+        hist = run_query(
+            f"SELECT {col} AS value, COUNT(*) AS n FROM {tbl} GROUP BY {col} ORDER BY n DESC LIMIT {TOP_N}"
+        )
+        top = tuple((v, int(n)) for v, n in zip(hist['value'].tolist(), hist['n'].tolist()))
+
+    return ColumnStats(
+        table=table,
+        column=column,
+        row_count=row_count,
+        null_count=row_count - non_null,
+        distinct_count=len(distinct),
+        distinct_capped=capped,
+        min_value=agg.iloc[2],
+        max_value=agg.iloc[3],
+        distinct_values=tuple(distinct) if not capped else (),
+        top_values=top,
+    )
+
+
+_lock = threading.Lock()
+# (table, column) -> (table generation when computed, stats)
+_stats: Dict[Tuple[str, str], Tuple[Tuple[int, int], ColumnStats]] = {}
+_generations: Dict[str, int] = {}
+_global_generation = 0
+
+
+def _mark_stale(tables: Optional[FrozenSet[str]]) -> None:
+    global _global_generation
+    with _lock:
+        if tables is None:
+            _global_generation += 1
+        else:
+            for name in tables:
+                _generations[name] = _generations.get(name, 0) + 1
+
+
+on_invalidate(_mark_stale)
+
+
+def _generation(table: str) -> Tuple[int, int]:
+    return _global_generation, _generations.get(table.lower(), 0)
+
+
+def get_column_stats(table: str, column: str) -> ColumnStats:
+    """Return cached statistics for ``table.column``, recomputing if stale.
+
+    Raises:
+        ValueError: If the table or column is not part of the schema.
+    """
+    if column not in table_columns(table):
+        raise ValueError(f"Unknown column {column!r} for table {table!r}")
+    key = (table.lower(), column)
+    with _lock:
+        generation = _generation(table)
+        cached = _stats.get(key)
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+    stats = _compute(table, column)
+    with _lock:
+        # Only store if no write landed while we were computing
+        if _generation(table) == generation:
+            _stats[key] = (generation, stats)
+    return stats
@@ -4,16 +4,37 @@ from __future__ import annotations
 
 import sqlite3
 import random
+import time
 import pandas as pd
-from typing import Optional, Sequence, List, Any, Union
+from contextlib import contextmanager
+from typing import Optional, Sequence, List, Any, Union, Dict, Iterator, Callable, FrozenSet
+
+from scripts.connection_pool import get_pool
+from scripts.query_cache import QueryCache, tables_read, tables_written
+from scripts.query_trace import QueryTracer
 
 DB_PATH: str = "Database/BankSight.db"
 
+# Opt-in result cache for run_query(..., cache=True)
+QUERY_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+QUERY_CACHE_TTL: float = 300.0
+_query_cache = QueryCache(max_bytes=QUERY_CACHE_MAX_BYTES, default_ttl=QUERY_CACHE_TTL)
+
+# Statement tracing for run_query/execute_action; off unless BANKSIGHT_TRACE is set
+_tracer = QueryTracer.from_env()
+
 __all__ = [
     "DB_PATH",
     "get_connection",
+    "get_pool_stats",
     "run_query",
     "execute_action",
+    "write_transaction",
+    "invalidate_cache",
+    "on_invalidate",
+    "get_cache_stats",
+    "configure_tracing",
+    "get_tracer",
     "get_next_customer_id",
     "get_customer_id_by_name",
     "get_branch_names",
@@ -34,15 +55,18 @@ def luhn_checksum(card_number: str) -> int:
         total += sum(digits_of(d*2))
     return total % 10
 
-def generate_card_number(prefix: str = "4", length: int = 16) -> str:
+def generate_card_number(prefix: str = "4", length: int = 16, rng: Optional[random.Random] = None) -> str:
     """
     Generate a valid test credit card number.
     - prefix: starting digits (default '4' for Visa)
     - length: total length (default 16)
+    - rng: random.Random to draw digits from (default: the module-level generator);
+      pass a seeded one for reproducible numbers
     """
+    rng = rng or random
     number = prefix
     while len(number) < (length - 1):
-        number += str(random.randint(0, 9))
+        number += str(rng.randint(0, 9))
     # Calculate check digit
     check_digit = luhn_checksum(number + "0")
     if check_digit != 0:
@@ -58,20 +82,104 @@ def to_float(val: Any) -> float:
     return float(val)
 
 def get_connection() -> sqlite3.Connection:
-    """Return a sqlite3 connection to the project's database."""
-    # Centralized connection point; check_same_thread=False used for multi-threaded contexts
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+    """Return the calling thread's pooled connection to the project's database.
+
+    The connection stays open for reuse; callers must not close it. Using it as
+    a context manager (``with get_connection() as conn``) still commits or rolls
+    back the enclosed transaction.
+    """
+    return get_pool(DB_PATH).get()
+
+
+def get_pool_stats() -> Dict[str, int]:
+    """Return connection pool hit/miss counters for the project's database."""
+    return get_pool(DB_PATH).stats()
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """Return query result cache hit/miss counters."""
+    return _query_cache.stats()
+
 
+def invalidate_cache(*tables: str) -> None:
+    """Drop cached results that read from any of ``tables`` (all if none given)."""
+    _query_cache.invalidate(tables or None)
+
+
+def on_invalidate(callback: Callable[[Optional[FrozenSet[str]]], None]) -> None:
+    """Register ``callback(tables)`` to run after writes invalidate cached results.
+
+    ``tables`` is a frozenset of lower-cased table names, or None when every
+    table must be considered stale.
+    """
+    _query_cache.add_listener(callback)
+
+
+def configure_tracing(
+    enabled: Optional[bool] = None,
+    slow_ms: Optional[float] = None,
+    log_path: Optional[str] = None,
+    explain: Optional[bool] = None,
+) -> None:
+    """Turn statement tracing on or off and adjust the slow-query log.
+
+    Args:
+        enabled: Record every ``run_query``/``execute_action`` statement.
+        slow_ms: Statements taking at least this long go to the slow-query log.
+        log_path: Rotating slow-query log file.
+        explain: Include EXPLAIN QUERY PLAN output for slow statements.
+    """
+    _tracer.configure(enabled=enabled, slow_ms=slow_ms, log_path=log_path, explain=explain)
 
-def run_query(query: str, params: Optional[Sequence] = None) -> pd.DataFrame:
+
+def get_tracer() -> QueryTracer:
+    """Return the tracer behind ``run_query``/``execute_action`` (recent records, summary, listeners)."""
+    return _tracer
+
+
+def _read_sql(query: str, params: Optional[Sequence]) -> pd.DataFrame:
+    if not _tracer.enabled:
+        return pd.read_sql(query, get_connection(), params=params)
+    start = time.perf_counter()
+    try:
+        df = pd.read_sql(query, get_connection(), params=params)
+    except Exception as e:
+        _tracer.record(query, params, 0, time.perf_counter() - start, "query", get_connection, error=e)
+        raise
+    _tracer.record(query, params, len(df), time.perf_counter() - start, "query", get_connection)
+    return df
+
+
+def run_query(
+    query: str,
+    params: Optional[Sequence] = None,
+    cache: bool = False,
+    ttl: Optional[float] = None,
+) -> pd.DataFrame:
     """Execute a SELECT query and return results as a DataFrame.
 
     Args:
         query: SQL query to execute.
         params: Optional sequence of parameters for parameterized queries.
+        cache: Serve repeated calls from the result cache. Entries are dropped
+            whenever a write goes through ``execute_action`` or
+            ``write_transaction`` for a table the query reads.
+        ttl: Seconds a cached result stays valid (defaults to QUERY_CACHE_TTL).
     """
-    with get_connection() as conn:
-        return pd.read_sql(query, conn, params=params)
+    key = _query_cache.make_key(query, params) if cache else None
+    if key is None:
+        return _read_sql(query, params)
+
+    cached = _query_cache.get(key)
+    if cached is not None:
+        if _tracer.enabled:
+            _tracer.record(query, params, len(cached), 0.0, "query", cached=True)
+        return cached
+    tables = tables_read(query)
+    snapshot = _query_cache.snapshot(tables)
+    df = _read_sql(query, params)
+    _query_cache.put(key, df, tables, ttl=ttl, snapshot=snapshot)
+    return df.copy()
 
 
 def execute_action(query: str, params: Optional[Sequence] = None) -> None:
@@ -81,12 +189,37 @@ def execute_action(query: str, params: Optional[Sequence] = None) -> None:
         query: SQL statement to execute.
         params: Optional sequence of parameters for parameterized queries.
     """
-    # Debug logging can be enabled if needed
-    # print(f"Executing query: {query}, params: {params}")
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(query, params or ())
-        conn.commit()
+    start = time.perf_counter() if _tracer.enabled else None
+    rows, error = 0, None
+    try:
+        with get_connection() as conn:
+            rows = conn.execute(query, params or ()).rowcount
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        if start is not None:
+            _tracer.record(query, params, max(rows, 0), time.perf_counter() - start, "action", get_connection, error=error)
+        written = tables_written(query)
+        _query_cache.invalidate(written)
+
+
+@contextmanager
+def write_transaction(*tables: str) -> Iterator[sqlite3.Connection]:
+    """Yield the pooled connection for a multi-statement write.
+
+    Commits on success, rolls back on error, and afterwards invalidates cached
+    results for ``tables`` (every cached result if no tables are given).
+
+    Args:
+        tables: Tables the enclosed statements write to.
+    """
+    conn = get_connection()
+    try:
+        with conn:
+            yield conn
+    finally:
+        _query_cache.invalidate(tables or None)
 
 
 def get_next_customer_id() -> str:
@@ -129,13 +262,7 @@ def get_customer_id_by_name(name: str) -> Optional[str]:
     
 def get_branch_names() -> List[str]:
     """Fetch all branch names from the branches table."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT branch_name FROM branches")
-        results = cursor.fetchall()
-        if not results:
-            return []
-        return [row[0] for row in results]
+    return run_query("SELECT branch_name FROM branches", cache=True)['branch_name'].tolist()
 
 
 def get_accounts_by_customer_id(customer_id: Any) -> List[Any]:
@@ -0,0 +1,160 @@
+"""Pooled SQLite connections shared by the data-access helpers.
+
+Streamlit runs every rerun of a session on a fresh script thread, so opening a
+connection per statement (or per rerun) means constant connect/teardown churn.
+The pool keeps one connection per live thread and lets a new thread adopt the
+connection left behind by a finished one, so connections survive reruns while
+never being used by two live threads at once.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+__all__ = [
+    "DEFAULT_PRAGMAS",
+    "ConnectionPool",
+    "get_pool",
+    "close_all_pools",
+]
+
+# Applied once, when a connection is first opened.
+DEFAULT_PRAGMAS: Tuple[str, ...] = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA cache_size = -20000",  # ~20 MB page cache
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",  # 256 MB
+)
+
+
+class ConnectionPool:
+    """Hand out one long-lived sqlite3 connection per thread.
+
+    Args:
+        db_path: Path of the SQLite database file.
+        pragmas: PRAGMA statements run once on every new connection.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        pragmas: Tuple[str, ...] = DEFAULT_PRAGMAS,
+    ) -> None:
+        self.db_path = db_path
+        self.pragmas = pragmas
+        self._lock = threading.Lock()
+        # thread ident -> (owning thread, connection)
+        self._by_thread: Dict[int, Tuple[threading.Thread, sqlite3.Connection]] = {}
+        self._idle: List[sqlite3.Connection] = []
+        self.hits = 0
+        self.misses = 0
+        self.reclaimed = 0
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        for pragma in self.pragmas:
+            try:
+                conn.execute(pragma)
+            except sqlite3.DatabaseError:
+                # e.g. WAL is unavailable on some network filesystems
+                pass
+        return conn
+
+    def _reclaim_dead(self) -> None:
+        """Move connections of finished threads to the idle list (lock held)."""
+        for ident, (thread, conn) in list(self._by_thread.items()):
+            if not thread.is_alive():
+                del self._by_thread[ident]
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.append(conn)
+                self.reclaimed += 1
+
+    def get(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening one if needed."""
+        thread = threading.current_thread()
+        ident = threading.get_ident()
+        conn: sqlite3.Connection
+        with self._lock:
+            entry = self._by_thread.get(ident)
+            if entry is not None:
+                conn = entry[1]
+                if entry[0] is not thread:
+                    # Thread ident was recycled: the previous owner is gone
+                    if conn.in_transaction:
+                        conn.rollback()
+                    self._by_thread[ident] = (thread, conn)
+                    self.reclaimed += 1
+                self.hits += 1
+                return conn
+            if not self._idle:
+                self._reclaim_dead()
+            if self._idle:
+                conn = self._idle.pop()
+                self.hits += 1
+            else:
+                conn = self._open()
+                self.misses += 1
+            self._by_thread[ident] = (thread, conn)
+            return conn
+
+    def release(self) -> None:
+        """Return the calling thread's connection to the idle list."""
+        with self._lock:
+            entry = self._by_thread.pop(threading.get_ident(), None)
+            if entry is not None:
+                conn = entry[1]
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.append(conn)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current pool occupancy."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reclaimed": self.reclaimed,
+                "in_use": len(self._by_thread),
+                "idle": len(self._idle),
+            }
+
+    def close_all(self) -> None:
+        """Close every connection owned by the pool."""
+        with self._lock:
+            conns = [conn for _, conn in self._by_thread.values()] + self._idle
+            self._by_thread.clear()
+            self._idle.clear()
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    """Return the process-wide pool for ``db_path``, creating it on first use."""
+    pool: Optional[ConnectionPool] = _pools.get(db_path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(db_path)
+            if pool is None:
+                pool = _pools[db_path] = ConnectionPool(db_path)
+    return pool
+
+
+def close_all_pools() -> None:
+    """Close every pooled connection (used by scripts and benchmarks)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
@@ -1,9 +1,43 @@
 
+import importlib
 import streamlit as st
 from scripts.commonmethod import run_query
+from scripts.page_profiler import set_profile_label
+from scripts.table_query import TableFilter
+
+# (operation, table) -> (module in scripts.crud_handlers, function); a handler
+# module is imported the first time one of its operations is selected
+HANDLERS = {
+    ("Create", "customers"): ("customers", "create_customer"),
+    ("Create", "branches"): ("branches", "create_branch"),
+    ("Create", "accounts"): ("accounts", "create_account"),
+    ("Create", "transactions"): ("transactions", "create_transaction"),
+    ("Create", "loans"): ("loans", "create_loan"),
+    ("Create", "creditcards"): ("creditcards", "create_creditcard"),
+    ("Create", "SupportTickets"): ("support_tickets", "create_ticket"),
+    ("Update", "customers"): ("customers", "update_customer"),
+    ("Update", "branches"): ("branches", "update_branch"),
+    ("Update", "accounts"): ("accounts", "update_account"),
+    ("Update", "transactions"): ("transactions", "update_transaction"),
+    ("Update", "loans"): ("loans", "update_loan"),
+    ("Update", "creditcards"): ("creditcards", "update_creditcard"),
+    ("Update", "SupportTickets"): ("support_tickets", "update_ticket"),
+    ("Delete", "customers"): ("customers", "delete_customer"),
+    ("Delete", "branches"): ("branches", "delete_branch"),
+    ("Delete", "accounts"): ("accounts", "delete_account"),
+    ("Delete", "transactions"): ("transactions", "delete_transaction"),
+    ("Delete", "loans"): ("loans", "delete_loan"),
+    ("Delete", "creditcards"): ("creditcards", "delete_creditcard"),
+    ("Delete", "SupportTickets"): ("support_tickets", "delete_ticket"),
+}
+
+
+def get_handler(operation, table_name):
+    """Return the handler function for ``operation`` on ``table_name``, importing it lazily."""
+    module_name, func = HANDLERS[(operation, table_name)]
+    module = importlib.import_module(f"scripts.crud_handlers.{module_name}")
+    return getattr(module, func)
 
-# Import handlers
-from scripts.crud_handlers import customers, branches, accounts, transactions, loans, creditcards, support_tickets
 
 class CRUDOperationsPage:       
     def render(self, conn):
@@ -15,40 +49,16 @@ class CRUDOperationsPage:
         
         operation = st.selectbox("Select Operation", ["Create", "Read", "Update", "Delete"])
         table_name = st.selectbox("Select Table", valid_tables)
+        set_profile_label(f"{operation}/{table_name}")
         
         if table_name not in valid_tables:
             st.error("Invalid table selection.")
             return
 
-        if operation == "Create":
-            if table_name == "customers": customers.create_customer()
-            elif table_name == "branches": branches.create_branch()
-            elif table_name == "accounts": accounts.create_account()
-            elif table_name == "transactions": transactions.create_transaction()
-            elif table_name == "loans": loans.create_loan()
-            elif table_name == "creditcards": creditcards.create_creditcard()
-            elif table_name == "SupportTickets": support_tickets.create_ticket()
-            
-        elif operation == "Read":
+        if operation == "Read":
             self.handle_read(table_name)
-            
-        elif operation == "Update":
-            if table_name == "customers": customers.update_customer()
-            elif table_name == "branches": branches.update_branch()
-            elif table_name == "accounts": accounts.update_account()
-            elif table_name == "transactions": transactions.update_transaction()
-            elif table_name == "loans": loans.update_loan()
-            elif table_name == "creditcards": creditcards.update_creditcard()
-            elif table_name == "SupportTickets": support_tickets.update_ticket()
-            
-        elif operation == "Delete":
-            if table_name == "customers": customers.delete_customer()
-            elif table_name == "branches": branches.delete_branch()
-            elif table_name == "accounts": accounts.delete_account()
-            elif table_name == "transactions": transactions.delete_transaction()
-            elif table_name == "loans": loans.delete_loan()
-            elif table_name == "creditcards": creditcards.delete_creditcard()
-            elif table_name == "SupportTickets": support_tickets.delete_ticket()
+        else:
+            get_handler(operation, table_name)()
 
     def handle_read(self, table_name):
         st.subheader(f"Read records from {table_name}")
@@ -56,5 +66,8 @@ class CRUDOperationsPage:
             # table_name is whitelisted above
             df = run_query(f"SELECT * FROM {table_name}")
             st.dataframe(df, use_container_width=True)
+            # The Explorer's export widget; imported here so other CRUD views skip it
+            from scripts.export import render_download
+            render_download(TableFilter(table_name), key="crud_read")
         except Exception as e:
             st.error(f"Failed to read from {table_name}: {e}")
\ No newline at end of file
@@ -1,28 +1,28 @@
 
 import streamlit as st
 import datetime
-from scripts.commonmethod import execute_action, run_query, get_customer_id_by_name
+from scripts.commonmethod import execute_action, run_query
+from scripts.customer_context import load_customer_context
+from scripts.customer_picker import customer_picker
 
 def create_account():
-    customer = run_query("SELECT name FROM customers")['name'].tolist()
-    
     st.subheader("Create New Account")
-    selected_name = st.selectbox("Select Customer", customer)
+    customer_id = customer_picker("Select Customer")
+    ctx = load_customer_context(customer_id) if customer_id else None
+    if not ctx:
+        return
     
     # Check if account exists immediately for better UX
     existing_balance = None
-    if selected_name:
-        customer_id = get_customer_id_by_name(selected_name)
-        check_res = run_query("SELECT account_balance FROM accounts WHERE customer_id = ?", (customer_id,))
-        if not check_res.empty:
-            existing_balance = check_res.iloc[0, 0]
-            st.warning(f"⚠️ Customer '{selected_name}' already has an account! Current Balance: ₹{existing_balance:,.2f}")
-            st.info("You cannot create a second account for the same customer.")
+    if ctx.accounts:
+        existing_balance = ctx.accounts[0].balance
+        st.warning(f"⚠️ Customer '{customer_id}' already has an account! Current Balance: ₹{existing_balance:,.2f}")
+        st.info("You cannot create a second account for the same customer.")
 
     # Only show the creation form if no account exists
     if existing_balance is None:
         with st.form("account_form"):
-            st.write(f"Creating account for: **{selected_name}**")
+            st.write(f"Creating account for: **{customer_id}**")
             account_balance = st.number_input("Initial Account Balance", min_value=0)
             open_date = datetime.date.today().strftime('%Y-%m-%d')
             submit_button = st.form_submit_button("Add Account")
@@ -43,27 +43,24 @@ def create_account():
 
 def update_account():
     # 1. Selection happens OUTSIDE the form to fetch current data
-    accounts_holder_name = run_query("SELECT customer_id, name FROM customers")['name'].tolist()
-    selected_account_holder = st.selectbox("Select Account Customer Name to Update", accounts_holder_name)
-    cust_id = run_query("SELECT customer_id FROM customers WHERE name = ?", (selected_account_holder,)) 
-    accounts_df = run_query("SELECT customer_id FROM accounts WHERE customer_id = ?", (cust_id.iloc[0,0],))
-    if accounts_df.empty:
+    cust_id = customer_picker("Select Account Customer Name to Update")
+    ctx = load_customer_context(cust_id) if cust_id else None
+    if not ctx:
+        return
+    if not ctx.accounts:
         st.warning("No accounts found.")
         return
         
-    accounts_list = accounts_df['customer_id'].tolist()
-    selected_account = st.selectbox("Select Account Customer ID to Update", accounts_list)
+    account_id = st.selectbox("Select Account ID to Update", ctx.account_ids)
     
-    # 2. Fetch current record to pre-fill the form
-    record = run_query("SELECT * FROM accounts WHERE customer_id = ?", (selected_account,))
+    # 2. Current balance (from the customer context) pre-fills the form
+    current_balance = ctx.balance_of(account_id)
     
-    if not record.empty:
-        row = record.iloc[0]
-        account_id = row['account_id'] # Keep this hidden for the WHERE clause
+    if current_balance is not None:
         with st.form("update_account_form"):
-            st.subheader(f"Editing Account for Customer ID: {selected_account} (Account ID: {account_id})")
+            st.subheader(f"Editing Account for Customer ID: {cust_id} (Account ID: {account_id})")
             
-            new_balance = st.number_input("Account Balance", min_value=0.0, value=float(row['account_balance']))
+            new_balance = st.number_input("Account Balance", min_value=0.0, value=float(current_balance))
             new_date = datetime.date.today().strftime('%Y-%m-%d')
             
             submit_update = st.form_submit_button("Update Account Details")
@@ -75,7 +72,7 @@ def update_account():
                     SET account_balance=?, last_updated=? 
                     WHERE account_id=?""",
                     (float(new_balance), new_date, int(account_id)))
-                st.success(f"Account for Customer ID '{selected_account}' updated successfully!")
+                st.success(f"Account for Customer ID '{cust_id}' updated successfully!")
                 st.balloons()
             except Exception as e:
                 st.error(f"Failed to update record: {e}")
@@ -83,22 +80,18 @@ def update_account():
         st.warning("Account details could not be retrieved.")
 
 def delete_account():
-    T_branch = run_query("SELECT name FROM customers")['name'].tolist()
     st.subheader("Select Customer")
-    selected_name = st.selectbox("Customer Name", T_branch)
-    
-    cust_id_res = run_query("SELECT customer_id FROM customers WHERE name = ?", (selected_name,))
-    if cust_id_res.empty:
+    cust_id = customer_picker()
+    ctx = load_customer_context(cust_id) if cust_id else None
+    if not ctx:
         return
-    cust_id = cust_id_res.iloc[0,0]
     
     # Let the user select which SPECIFIC account to delete
-    acc_res = run_query("SELECT account_id FROM accounts WHERE customer_id = ?", (cust_id,))
-    if acc_res.empty:
+    if not ctx.accounts:
         st.warning("No accounts found for this customer.")
         return
         
-    acc_list = acc_res['account_id'].tolist()
+    acc_list = ctx.account_ids
     target_id = st.selectbox("Select Specific Account ID", acc_list)
     
     if target_id:
@@ -29,7 +29,7 @@ def create_branch():
                 st.error(f"Failed to add branch: {e}")
 
 def update_branch():
-    branch_names = run_query("SELECT branch_name FROM branches")['branch_name'].tolist()
+    branch_names = run_query("SELECT branch_name FROM branches", cache=True)['branch_name'].tolist()
     selected_branch_name = st.selectbox("Select Branch to Update", branch_names)
     
     record = run_query("SELECT * FROM branches WHERE branch_name = ?", (selected_branch_name,))
@@ -71,7 +71,7 @@ def update_branch():
         st.warning("Branch details could not be retrieved.")
 
 def delete_branch():
-    T_branch = run_query("SELECT branch_name FROM branches")['branch_name'].tolist()
+    T_branch = run_query("SELECT branch_name FROM branches", cache=True)['branch_name'].tolist()
     st.subheader("Select Branch")
     selected_name = st.selectbox("Branch Name", T_branch)
     
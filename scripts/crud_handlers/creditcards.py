@@ -1,45 +1,41 @@
 
 import streamlit as st
 import datetime
-from dateutil.relativedelta import relativedelta
-from scripts.commonmethod import execute_action, run_query, get_customer_id_by_name, get_branch_names, generate_card_number
+import pandas as pd
+from scripts.commonmethod import execute_action, run_query, get_branch_names, generate_card_number
+from scripts.customer_context import load_customer_context
+from scripts.customer_picker import customer_picker
 
 def create_creditcard():
-    customer = run_query("SELECT name FROM customers")['name'].tolist()
     st.subheader("Create New Credit Card")
-    selected_name = st.selectbox("Select Customer", customer)
+    customer_id = customer_picker("Select Customer")
+    ctx = load_customer_context(customer_id) if customer_id else None
     
-    if not selected_name:
+    if not ctx:
         return
-
-    customer_id = get_customer_id_by_name(selected_name)
     
     # Check for accounts first
-    acc_res = run_query("SELECT account_id FROM accounts WHERE customer_id = ?", (customer_id,))
-    if acc_res.empty:
-        st.error(f"Customer {selected_name} does not have an account! Please create an account first.")
+    if not ctx.accounts:
+        st.error(f"Customer {customer_id} does not have an account! Please create an account first.")
         return
-    accounts = acc_res['account_id'].tolist()
+    accounts = ctx.account_ids
 
-    # Get Existing Active Cards
+    # Existing Active Cards
     # Rule: Can only create a card type if no active (unexpired) card of that type exists.
-    existing_cards = run_query("""
-        SELECT card_type, expiry_date, status 
-        FROM creditcards 
-        WHERE customer_id = ?
-    """, (customer_id,))
-    
     blocked_types = []
     today_str = datetime.date.today().strftime('%Y-%m-%d')
     
-    if not existing_cards.empty:
+    if ctx.cards:
         st.info("Existing Cards:")
-        st.dataframe(existing_cards)
+        st.dataframe(pd.DataFrame(
+            [(c.card_type, c.expiry_date, c.status) for c in ctx.cards],
+            columns=["card_type", "expiry_date", "status"],
+        ))
         
-        for _, row in existing_cards.iterrows():
+        for card in ctx.cards:
             # If card is NOT Expired/Blocked AND Expiry Date is in the future
-            if row['status'] not in ['Expired', 'Blocked'] and row['expiry_date'] > today_str:
-                blocked_types.append(row['card_type'])
+            if card.status not in ['Expired', 'Blocked'] and (card.expiry_date or '') > today_str:
+                blocked_types.append(card.card_type)
     
     all_types = ["Business", "Platinum", "Gold", "Silver", "Bronze"]
     allowed_types = [t for t in all_types if t not in blocked_types]
@@ -65,6 +61,7 @@ def create_creditcard():
         current_balance = 0.0
         
         issue_date_obj = datetime.date.today()
+        from dateutil.relativedelta import relativedelta  # only needed when a card is issued
         expiry_date_obj = issue_date_obj + relativedelta(years=15)
         issue_date = issue_date_obj.strftime('%Y-%m-%d')
         expiry_date = expiry_date_obj.strftime('%Y-%m-%d')
@@ -83,28 +80,25 @@ def create_creditcard():
                 (branch_name, customer_id, selected_account, card_number, card_type, card_network,
                 credit_limit, current_balance, issue_date, expiry_date, status)
             )
-            st.success(f"Credit Card ({card_type}) for {selected_name} added successfully!")
+            st.success(f"Credit Card ({card_type}) for {customer_id} added successfully!")
             st.session_state.temp_card_number = generate_card_number() # Reset
             st.balloons()
         except Exception as e:
             st.error(f"Failed to add credit card: {e}")
 
 def update_creditcard():
-    customer = run_query("SELECT name FROM customers")['name'].tolist()
     st.subheader("Select Customer")
-    selected_name = st.selectbox("Customer Name", customer)
-    customer_id = get_customer_id_by_name(selected_name)
-    
-    # Logic to fetch Card IDs to populate selectbox
-    cc_res = run_query("SELECT card_id, card_number FROM creditcards WHERE customer_id = ?", (customer_id,))
+    customer_id = customer_picker()
+    ctx = load_customer_context(customer_id) if customer_id else None
+    if not ctx:
+        return
     
-    if cc_res.empty:
+    if not ctx.cards:
         st.warning("No credit cards found for this customer.")
         return
         
     # Create a display list (ID - Number)
-    cc_res['display'] = cc_res['card_id'].astype(str) + " - " + cc_res['card_number']
-    cc_list = cc_res['display'].tolist()
+    cc_list = [f"{c.card_id} - {c.card_number}" for c in ctx.cards]
     
     selected_cc_display = st.selectbox("Select Credit Card to Update", cc_list)
     selected_cc_id = selected_cc_display.split(" - ")[0]
@@ -126,8 +120,7 @@ def update_creditcard():
         new_branch = st.selectbox("Branch Name", branch_names, index=b_idx)
         
         # Account
-        acc_res = run_query("SELECT account_id FROM accounts WHERE customer_id = ?", (customer_id,))
-        accounts = acc_res['account_id'].tolist()
+        accounts = ctx.account_ids
         curr_acc = current_cc.get('account_id')
         a_idx = accounts.index(curr_acc) if curr_acc in accounts else 0
         new_account = st.selectbox("Linked Account", accounts, index=a_idx)
@@ -165,20 +158,17 @@ def update_creditcard():
             st.error(f"Failed to update credit card: {e}")
 
 def delete_creditcard():
-    customer = run_query("SELECT name FROM customers")['name'].tolist()
     st.subheader("Select Customer")
-    selected_name = st.selectbox("Customer Name", customer)
-    
-    customer_id = get_customer_id_by_name(selected_name)
-    
-    cc_res = run_query("SELECT card_id, card_number FROM creditcards WHERE customer_id = ?", (customer_id,))
+    customer_id = customer_picker()
+    ctx = load_customer_context(customer_id) if customer_id else None
+    if not ctx:
+        return
     
-    if cc_res.empty:
+    if not ctx.cards:
         st.warning("No credit cards found for this customer.")
         return
 
-    cc_res['display'] = cc_res['card_id'].astype(str) + " - " + cc_res['card_number']
-    cc_list = cc_res['display'].tolist()
+    cc_list = [f"{c.card_id} - {c.card_number}" for c in ctx.cards]
     
     selected_cc_display = st.selectbox("Select Credit Card to Delete", cc_list)
     target_id = selected_cc_display.split(" - ")[0]
@@ -2,6 +2,7 @@
 import streamlit as st
 import datetime
 from scripts.commonmethod import execute_action, run_query, get_next_customer_id
+from scripts.customer_picker import customer_picker
 
 def create_customer():
     custom_id = get_next_customer_id()
@@ -41,16 +42,17 @@ def create_customer():
                 st.error(f"Failed to add customer: {e}")
 
 def update_customer():
-    T_customer = run_query("SELECT name FROM customers")['name'].tolist()
     st.subheader("Select Customer")
-    selected_name = st.selectbox("Customer Name", T_customer)
+    record_id = customer_picker()
+    if not record_id:
+        return
     
-    record = run_query("SELECT * FROM customers WHERE name = ?", (selected_name,))
+    record = run_query("SELECT * FROM customers WHERE customer_id = ?", (record_id,))
     if record.empty:
         st.error("Customer not found!")
         return
     
-    record_id = record.iloc[0]['customer_id']
+    selected_name = record.iloc[0]['name']
     # Pre-fill logic could be improved, but keeping simple for now matched to original
     gender = st.selectbox("Gender", ["M", "F", "O"])
     age = st.number_input("Age", min_value=18)
@@ -69,12 +71,8 @@ def update_customer():
             st.error(f"Failed to update record: {e}")
 
 def delete_customer():
-    T_customer = run_query("SELECT name FROM customers")['name'].tolist()
     st.subheader("Select Customer")
-    selected_name = st.selectbox("Customer Name", T_customer)
-    
-    res = run_query("SELECT customer_id FROM customers WHERE name = ?", (selected_name,))
-    target_id = str(res.iloc[0, 0]) if not res.empty else None
+    target_id = customer_picker()
     
     if target_id:
         check_df = run_query("SELECT * FROM customers WHERE customer_id = ?", (target_id,))
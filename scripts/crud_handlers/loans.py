@@ -1,25 +1,25 @@
 
 import streamlit as st
 import datetime
-from scripts.commonmethod import execute_action, run_query, get_customer_id_by_name
+from scripts.amortization import ensure_priced, loan_schedule, refresh_amortization
+from scripts.commonmethod import execute_action, run_query
+from scripts.customer_context import load_customer_context
+from scripts.customer_picker import customer_picker
 
 def create_loan():
-    customer = run_query("SELECT name FROM customers")['name'].tolist()
     st.subheader("Select Customer")
-    selected_name = st.selectbox("Customer Name", customer)
+    customer_id = customer_picker()
+    ctx = load_customer_context(customer_id) if customer_id else None
     
-    if not selected_name: return
-
-    customer_id = get_customer_id_by_name(selected_name)
+    if not ctx: return
     
     with st.form("loan_form"):
-        acc_res = run_query("SELECT account_id FROM accounts WHERE customer_id = ?", (customer_id,))
-        accunt = acc_res['account_id'].tolist()
+        accunt = ctx.account_ids
         
         st.subheader("Select Account")
         selected_account = st.selectbox("Account ID", accunt)
         
-        branch_res = run_query("SELECT branch_name FROM branches")
+        branch_res = run_query("SELECT branch_name FROM branches", cache=True)
         branch = branch_res['branch_name'].tolist()
         st.subheader("Select Branch")
         selected_branch = st.selectbox("Branch Name", branch)
@@ -46,15 +46,30 @@ def create_loan():
             except Exception as e:
                 st.error(f"Failed to add loan: {e}")
 
+def show_amortization(loan_id):
+    ensure_priced()
+    schedule = loan_schedule(loan_id)
+    position = run_query("SELECT emi, installments_paid, outstanding_principal, as_of FROM loan_amortization WHERE loan_id = ?",
+                         (loan_id,))
+    if schedule.empty or position.empty:
+        st.caption("No repayment schedule: the loan's amount, rate, term or start date is missing.")
+        return
+    position = position.iloc[0]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("EMI", f"₹{position['emi']:,.2f}")
+    col2.metric("Installments paid", f"{position['installments_paid']} / {len(schedule)}")
+    col3.metric(f"Outstanding principal ({position['as_of']})", f"₹{position['outstanding_principal']:,.2f}")
+    with st.expander("Repayment schedule"):
+        st.dataframe(schedule.drop(columns="loan_id"), use_container_width=True, hide_index=True)
+
 def update_loan():
-    customer = run_query("SELECT name FROM customers")['name'].tolist()
     st.subheader("Select Customer")
-    selected_name = st.selectbox("Customer Name", customer)
-    customer_id = get_customer_id_by_name(selected_name)
+    customer_id = customer_picker()
+    ctx = load_customer_context(customer_id) if customer_id else None
+    if not ctx: return
     
-    # Logic to fetch loan IDs to populate selectbox
-    loan_res = run_query("SELECT loan_id FROM loans WHERE customer_id = ?", (customer_id,))
-    loan_ids = loan_res['loan_id'].tolist()
+    # Loan IDs to populate selectbox
+    loan_ids = ctx.loan_ids
     
     if not loan_ids:
         st.warning("No loans found for this customer.")
@@ -70,16 +85,17 @@ def update_loan():
          st.error("Error retrieving loan details.")
          return
 
+    show_amortization(loan_id)
+
     with st.form("loan_update_form"):
         
-        acc_res = run_query("SELECT account_id FROM accounts WHERE customer_id = ?", (customer_id,))
-        accunt = acc_res['account_id'].tolist()
+        accunt = ctx.account_ids
         # Find index of current account
         curr_acc = current_loan.get('account_id')
         acc_idx = accunt.index(curr_acc) if curr_acc in accunt else 0
         selected_account = st.selectbox("Account ID", accunt, index=acc_idx)
         
-        branch_res = run_query("SELECT branch_name FROM branches")
+        branch_res = run_query("SELECT branch_name FROM branches", cache=True)
         branch = branch_res['branch_name'].tolist()
         
         # Check column name for branch. create_loan uses 'branch_name' but checks user edits elsewhere.
@@ -136,6 +152,8 @@ def update_loan():
                """ UPDATE loans SET customer_id = ?, branch_name = ?, loan_amount = ?, account_id = ?, interest_rate = ?, loan_type = ?, loan_status = ?, loan_term_months = ?, start_date = ? WHERE loan_id = ? """, 
                ( customer_id, selected_branch, loan_amount, selected_account, interest_rate, loan_type, loan_status, loan_duration_months, start_date, loan_id )
             )
+             # The form re-enters the loan's terms, so its schedule starts over from them
+             refresh_amortization(loan_ids=[loan_id], reprice=True)
              st.success(f"Loan {loan_id} updated successfully!")
              st.balloons()
         except Exception as e:
@@ -143,15 +161,12 @@ def update_loan():
             st.error(f"Failed to update loan: {e}. (Hint: Column might be 'branch' instead of 'branch_name'?)")
 
 def delete_loan():
-    T_branch = run_query("SELECT name FROM customers")['name'].tolist()
     st.subheader("Select Customer")
-    selected_name = st.selectbox("Customer Name", T_branch)
-    
-    cust_id_res = run_query("SELECT customer_id FROM customers WHERE name = ?", (selected_name,))
-    if cust_id_res.empty: return
-    cust_id = cust_id_res.iloc[0,0]
+    cust_id = customer_picker()
+    ctx = load_customer_context(cust_id) if cust_id else None
+    if not ctx: return
     
-    loan_list = run_query("SELECT loan_id FROM loans WHERE customer_id = ?", (cust_id,))['loan_id'].tolist()
+    loan_list = ctx.loan_ids
     target_id = st.selectbox("Select Specific Loan ID", loan_list)
     
     if target_id:
@@ -1,23 +1,20 @@
 
 import streamlit as st
 import datetime
-from scripts.commonmethod import execute_action, run_query, get_customer_id_by_name, get_branch_names
+from scripts.commonmethod import execute_action, run_query, get_branch_names
+from scripts.customer_context import load_customer_context
+from scripts.customer_picker import customer_picker
 
 def create_ticket():
-    customer = run_query("SELECT name FROM customers")['name'].tolist()
     st.subheader("Select Customer")
-    selected_name = st.selectbox("Customer Name", customer)
+    customer_id = customer_picker()
+    ctx = load_customer_context(customer_id) if customer_id else None
     
-    if not selected_name: return
-    customer_id = get_customer_id_by_name(selected_name)
+    if not ctx: return
     
-    # 1. Fetch Accounts for this customer
-    acc_df = run_query("SELECT account_id FROM accounts WHERE customer_id = ?", (customer_id,))
-    account_options = acc_df['account_id'].tolist() if not acc_df.empty else []
-    
-    # 2. Fetch Loans for this customer
-    loan_df = run_query("SELECT loan_id FROM loans WHERE customer_id = ?", (customer_id,))
-    loan_options = loan_df['loan_id'].tolist() if not loan_df.empty else []
+    # Accounts and Loans for this customer
+    account_options = ctx.account_ids
+    loan_options = ctx.loan_ids
     
     with st.form("ticket_form"):
         # Allow selecting specific Account/Loan if multiple, or default to None
@@ -47,26 +44,23 @@ def create_ticket():
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
                 (customer_id, selected_account_id, selected_loan_id, branch_name, issue_category, description, date_opened, priority, status, support_agent, channel)
             )
-            st.success(f"Support Ticket created for {selected_name}!")
+            st.success(f"Support Ticket created for {customer_id}!")
             st.balloons()
         except Exception as e:
             st.error(f"Failed to create ticket: {e}")
 
 def update_ticket():
     # Select ticket by ID or Customer
-    customer = run_query("SELECT name FROM customers")['name'].tolist()
     st.subheader("Filter by Customer")
-    selected_name = st.selectbox("Customer Name", customer)
-    customer_id = get_customer_id_by_name(selected_name)
-    
-    tickets = run_query("SELECT Ticket_ID, Issue_Category, Status FROM SupportTickets WHERE Customer_ID = ?", (customer_id,))
+    customer_id = customer_picker()
+    ctx = load_customer_context(customer_id) if customer_id else None
+    if not ctx: return
     
-    if tickets.empty:
+    if not ctx.tickets:
         st.warning("No tickets found for this customer.")
         return
         
-    tickets['display'] = tickets['Ticket_ID'].astype(str) + " - " + tickets['Issue_Category'] + " (" + tickets['Status'] + ")"
-    ticket_list = tickets['display'].tolist()
+    ticket_list = [f"{t.ticket_id} - {t.issue_category} ({t.status})" for t in ctx.tickets]
     selected_ticket_display = st.selectbox("Select Ticket to Update", ticket_list)
     selected_ticket_id = selected_ticket_display.split(" - ")[0]
     
@@ -74,18 +68,18 @@ def update_ticket():
     
     with st.form("update_ticket_form"):
         st.write(f"Updating Ticket: {selected_ticket_id}")
-        st.write(f"Opened: {current_ticket['Date_Opened']}")
+        st.write(f"Opened: {current_ticket['date_opened']}")
         
         # Display current links
-        st.write(f"Linked Account: {current_ticket['Account_ID']}")
-        st.write(f"Linked Loan: {current_ticket['Loan_ID']}")
+        st.write(f"Linked Account: {current_ticket['account_id']}")
+        st.write(f"Linked Loan: {current_ticket['loan_id']}")
         
         new_status = st.selectbox("Status", ["Open", "In Progress", "Resolved", "Closed"], 
-                                  index=["Open", "In Progress", "Resolved", "Closed"].index(current_ticket['Status']) if current_ticket['Status'] in ["Open", "In Progress", "Resolved", "Closed"] else 0)
+                                  index=["Open", "In Progress", "Resolved", "Closed"].index(current_ticket['status']) if current_ticket['status'] in ["Open", "In Progress", "Resolved", "Closed"] else 0)
         
-        resolution_remarks = st.text_area("Resolution Remarks", value=current_ticket['Resolution_Remarks'] if current_ticket['Resolution_Remarks'] else "")
+        resolution_remarks = st.text_area("Resolution Remarks", value=current_ticket['resolution_remarks'] if current_ticket['resolution_remarks'] else "")
         
-        date_closed_val = current_ticket['Date_Closed']
+        date_closed_val = current_ticket['date_closed']
         
         close_ticket = st.checkbox("Close Ticket Now?")
         if close_ticket:
@@ -105,19 +99,16 @@ def update_ticket():
             st.error(f"Failed to update ticket: {e}")
 
 def delete_ticket():
-    customer = run_query("SELECT name FROM customers")['name'].tolist()
     st.subheader("Filter by Customer")
-    selected_name = st.selectbox("Customer Name", customer)
-    customer_id = get_customer_id_by_name(selected_name)
-    
-    tickets = run_query("SELECT Ticket_ID, Issue_Category, Status FROM SupportTickets WHERE Customer_ID = ?", (customer_id,))
+    customer_id = customer_picker()
+    ctx = load_customer_context(customer_id) if customer_id else None
+    if not ctx: return
     
-    if tickets.empty:
+    if not ctx.tickets:
         st.warning("No tickets found.")
         return
         
-    tickets['display'] = tickets['Ticket_ID'].astype(str) + " - " + tickets['Issue_Category']
-    ticket_list = tickets['display'].tolist()
+    ticket_list = [f"{t.ticket_id} - {t.issue_category}" for t in ctx.tickets]
     selected_ticket_display = st.selectbox("Select Ticket to Delete", ticket_list)
     target_id = selected_ticket_display.split(" - ")[0]
     
@@ -1,60 +1,96 @@
 
 import streamlit as st
-import datetime
-from scripts.commonmethod import execute_action, run_query, get_customer_id_by_name, get_connection, to_float
+import os
+import tempfile
+import pandas as pd
+from scripts.commonmethod import execute_action, run_query
+from scripts.customer_context import load_customer_context
+from scripts.customer_picker import customer_picker
+from scripts.ledger import DEFERRED_TYPES, INSUFFICIENT_FUNDS, POSTED, TXN_TYPES, Posting, apply_status_change, post
+from scripts.settlement import AMBIGUOUS_TARGET, EXCEEDS_OUTSTANDING, NO_ACCOUNT, NO_TARGET, settle_pending
+from scripts.txn_import import import_transactions
+
+SETTLEMENT_REASONS = {
+    NO_TARGET: "no matching loan/card",
+    AMBIGUOUS_TARGET: "several open loans/cards, pick one",
+    NO_ACCOUNT: "no source account",
+    EXCEEDS_OUTSTANDING: "more than the amount outstanding",
+    INSUFFICIENT_FUNDS: "would breach the ₹1,000 minimum",
+}
+
+def bulk_import_transactions():
+    with st.expander("Bulk import (CSV / NDJSON)"):
+        st.caption("Columns: account_id, txn_type, amount, and optionally customer_id, txn_time, status, txn_id. "
+                   "Rows are checked against the same rules as this form; rejected rows are returned with reasons.")
+        upload = st.file_uploader("Transactions file", type=["csv", "json", "jsonl", "ndjson"], key="txn_import_file")
+        dry_run = st.checkbox("Validate only (dry run)", key="txn_import_dry_run")
+        if upload is None or not st.button("Import Transactions"):
+            return
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, os.path.basename(upload.name))
+            with open(path, "wb") as f:
+                f.write(upload.getbuffer())
+            try:
+                result = import_transactions(path, dry_run=dry_run)
+            except Exception as e:
+                st.error(f"Import failed: {e}")
+                return
+            rejects = open(result.rejects_path, "rb").read() if result.rejects_path else None
+
+        verb = "Validated" if result.dry_run else "Posted"
+        st.success(f"{verb} {result.rows - result.rejected:,} of {result.rows:,} rows in {result.elapsed:.2f}s.")
+        if rejects:
+            st.warning(f"{result.rejected:,} rows rejected: "
+                       + ", ".join(f"{code} ({count:,})" for code, count in result.reasons.items()))
+            st.download_button("Download rejects", rejects, file_name=f"{os.path.splitext(upload.name)[0]}.rejects.csv",
+                               mime="text/csv")
 
 def create_transaction():
-    customer_names = run_query("SELECT name FROM customers")['name'].tolist()
+    bulk_import_transactions()
 
     st.subheader("Select Customer")
-    selected_name = st.selectbox("Customer Name", customer_names)
+    customer_id = customer_picker()
 
-    # Fetch dependent data
-    customer_id = get_customer_id_by_name(selected_name)
-    if not customer_id:
+    # Fetch dependent data (accounts, balances, loans, cards) in one read
+    ctx = load_customer_context(customer_id) if customer_id else None
+    if not ctx:
         return
         
-    select_account = run_query("SELECT account_id FROM accounts WHERE customer_id = ?", (customer_id,))['account_id'].tolist()
+    select_account = ctx.account_ids
     if not select_account:
         st.error("No accounts found for this customer.")
         return
         
     account = st.selectbox("Select Account", select_account)
     
-    res = run_query("SELECT account_balance FROM accounts WHERE account_id = ?", (account,))
-    bankbalance = res.iloc[0,0] if not res.empty else 0
+    bankbalance = ctx.balance_of(account) or 0
     st.info(f"Current Account Balance: ₹{bankbalance}")
 
     # Transaction types and extra info logic
-    txn_type = st.selectbox("Transaction Type", ["Deposit", "Withdrawal", "Transfer", "loan Payment", "Debit", "Credit payment"])
-    
-    Loanoutstanding = 0
-    creditcard_due = 0
+    txn_type = st.selectbox("Transaction Type", TXN_TYPES)
     
+    reference_id = None
     if txn_type == "loan Payment":
-        try:
-            loan_res = run_query("SELECT loan_amount FROM loans WHERE customer_id = ?", (customer_id,))
-            Loanoutstanding = loan_res.iloc[0, 0] if not loan_res.empty else 0
-        except Exception:
-            Loanoutstanding = 0
-            
-        if Loanoutstanding == 0:
-            st.warning("No loan found for this customer.")
+        open_loans = [l for l in ctx.loans if l.loan_status != "Closed" and l.loan_amount > 0]
+        if not open_loans:
+            st.warning("No open loan found for this customer.")
         else:
-            st.info(f"Current Loan Outstanding: ₹{Loanoutstanding}")
+            loan = st.selectbox("Loan", open_loans,
+                                format_func=lambda l: f"#{l.loan_id} {l.loan_type or ''} (₹{l.loan_amount:,.2f} outstanding)")
+            reference_id = loan.loan_id
+            st.info(f"Current Loan Outstanding: ₹{loan.loan_amount}")
             st.info("Note: Transaction status will be set to 'Pending' for loan payments. Staff will verify and update accordingly.")
             
     elif txn_type == "Credit payment":
-         try:
-            cc_res = run_query("SELECT current_balance FROM creditcards WHERE customer_id = ?", (customer_id,))
-            creditcard_due = cc_res.iloc[0, 0] if not cc_res.empty else 0
-         except Exception:
-            creditcard_due = 0
-            
-         if creditcard_due == 0:
-             st.warning("No credit card found for this customer.")
+         due_cards = [c for c in ctx.cards if c.current_balance > 0]
+         if not due_cards:
+             st.warning("No credit card with a balance due found for this customer.")
          else:
-             st.info(f"Current Credit Card Due: ₹{creditcard_due}")
+             card = st.selectbox("Credit Card", due_cards,
+                                 format_func=lambda c: f"{c.card_type or 'Card'} {c.card_number} (₹{c.current_balance:,.2f} due)")
+             reference_id = card.card_id
+             st.info(f"Current Credit Card Due: ₹{card.current_balance}")
              st.info("Note: Transaction status will be set to 'Pending' for credit payments. Staff will verify and update accordingly.")
 
     # Status handling
@@ -70,81 +106,34 @@ def create_transaction():
             st.error("Account ID not found.")
             return
 
-        current_balance = float(bankbalance)
-        cust_id = customer_id
-        
-        is_valid = True
-        new_balance = current_balance
-        
-        # Balance Calculation and Validation Logic
-        if txn_type == "Debit":
-             if (current_balance - amount) < 1000:
-                 st.error(f"Transaction Denied! Minimum balance of ₹1,000 required. Current: ₹{current_balance}")
-                 is_valid = False
-             else:
-                 new_balance = current_balance - amount
-                 
-        elif txn_type == "Withdrawal" or txn_type == "Transfer":
-             if (current_balance - amount) < 1000:
-                 st.error(f"Transaction Denied! Minimum balance of ₹1,000 required. Current: ₹{current_balance}")
-                 is_valid = False
-             else:
-                 new_balance = current_balance - amount
-                 
-        elif txn_type == "loan Payment" or txn_type == "Credit payment":
-             # Original logic: new_balance = current_balance + amount (Wait, this logic in original code was weird implementation of deposit to another internal account maybe?)
-             # BUT critically, looking at original code:
-             # For Loan/Credit payments, it did NOT update account balance in the main block.
-             # It only logged transaction.
-             # So we will KEEP account balance UNCHANGED for the customer account in this step.
-             new_balance = current_balance # No change to customer saving account for now, as it is pending verification.
-             
-        else: # Deposit
-             new_balance = current_balance + amount
+        # Balance check and update happen atomically in the ledger, against the
+        # balance at write time rather than the one shown above
+        try:
+            result = post(Posting(account, customer_id, txn_type, amount, status or "Success", reference_id=reference_id))
+        except Exception as e:
+            st.error(f"Database Error: {e}")
+            return
 
-        if is_valid:
-            try:
-                with get_connection() as conn:
-                    cursor = conn.cursor()
-                    
-                    # Update Account Balance logic
-                    # Only update if NOT Loan/Credit Payment (which are pending) AND status is Success
-                    if txn_type not in ["loan Payment", "Credit payment"] and status == "Success":
-                        cursor.execute("UPDATE accounts SET account_balance = ? WHERE account_id = ?", (new_balance, account))
-                    
-                    # Log Transaction
-                    new_txn_id = f"T{int(datetime.datetime.now().timestamp())}"
-                    
-                    # Ensure status logic matches
-                    final_status = status if status else 'Success'
-                    
-                    cursor.execute("""
-                        INSERT INTO transactions (txn_id, customer_id, txn_type, amount, txn_time, status) 
-                        VALUES (?, ?, ?, ?, ?, ?)""", 
-                        (new_txn_id, cust_id, txn_type, amount, datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'), final_status))
-                    
-                    conn.commit()
-                
-                if txn_type in ["loan Payment", "Credit payment"]:
-                     st.success(f"Transaction logged with status {final_status}. No balance update yet.")
-                
-                elif status == "Success":
-                     st.success(f"Success! New Balance: ₹{new_balance:.2f}")
-                else:
-                     st.success(f"Transaction logged with status {final_status}. No balance update yet.")
-                
-                st.balloons()
-            except Exception as e:
-                st.error(f"Database Error: {e}")
+        if not result.ok:
+            st.error(f"Transaction Denied! {result.message}")
+        elif result.outcome == POSTED:
+            st.success(f"Success! New Balance: ₹{result.balance:.2f}")
+            st.balloons()
+        else:
+            st.success(f"Transaction logged with status {result.posting.status}. No balance update yet.")
+            st.balloons()
 
 def update_transaction():
+    settle_pending_payments()
+
     st.info("Only 'Failed' and 'Pending' transactions can be updated.")
-    T_customer = run_query("SELECT name FROM customers")['name'].tolist()
     st.subheader("Select Customer")
-    selected_name = st.selectbox("Customer Name", T_customer)
+    selected_customer = customer_picker()
+    if not selected_customer:
+        return
     
-    result = run_query("SELECT * FROM transactions WHERE customer_id = (SELECT customer_id FROM customers WHERE name = ?) AND status IN ('Failed', 'Pending')",
-             (selected_name,))
+    result = run_query("SELECT * FROM transactions WHERE customer_id = ? AND status IN ('Failed', 'Pending')",
+             (selected_customer,))
              
     if result.empty:
         st.write("No Failed/Pending transactions found.")
@@ -161,7 +150,30 @@ def update_transaction():
     customer_id = row['customer_id']
     
     st.write(f"Editing Transaction: {selected_txn} ({trx_type})")
-    
+
+    # Balance changes go to the account the transaction was made on; legacy
+    # rows without one ask which of the customer's accounts to use
+    account_id = row['account_id']
+    ctx = load_customer_context(customer_id)
+    if pd.isna(account_id):
+        if not ctx or not ctx.account_ids:
+            st.error("No account found for customer.")
+            return
+        account_id = st.selectbox("Select Account", ctx.account_ids)
+
+    # Loan/card payments are settled against the loan or card they are for
+    deferred = trx_type.lower() in DEFERRED_TYPES
+    reference_id = None if pd.isna(row.get('reference_id')) else int(row['reference_id'])
+    if deferred and ctx:
+        if trx_type.lower() == "loan payment":
+            targets = {l.loan_id: f"Loan #{l.loan_id} {l.loan_type or ''} (₹{l.loan_amount:,.2f} outstanding)" for l in ctx.loans}
+        else:
+            targets = {c.card_id: f"{c.card_type or 'Card'} {c.card_number} (₹{c.current_balance:,.2f} due)" for c in ctx.cards}
+        if targets:
+            ids = list(targets)
+            reference_id = st.selectbox("Pay towards", ids, format_func=targets.get,
+                                        index=ids.index(reference_id) if reference_id in ids else 0)
+
     with st.form("transaction_update_form"):
         new_status = st.selectbox("Update Status", ["Success", "Failed", "Pending"], 
                                 index=["Success", "Failed", "Pending"].index(old_status) if old_status in ["Success", "Failed", "Pending"] else 0)
@@ -170,77 +182,59 @@ def update_transaction():
         submit_button = st.form_submit_button(" Update Changes")
 
     if submit_button:
-        with get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # For Loan Payments, we update Loan table? Original code had complex logic for this in update.
-            # Step 31 line 509: if trx_type=="loan Payment": update loans table.
-            
-            if trx_type == "loan Payment":
-                loan_res = run_query("SELECT loan_id, loan_amount FROM loans WHERE customer_id = ?", (customer_id,))
-                if not loan_res.empty:
-                    loan_id = loan_res.iloc[0]['loan_id']
-                    current_loan_bal = float(loan_res.iloc[0]['loan_amount'])
-                    
-                    # New loan balance = old - amount
-                    new_loan_bal = current_loan_bal - float(new_amount)
-                    
-                    try:
-                        cursor.execute("UPDATE loans SET loan_amount = ? WHERE loan_id = ?", (new_loan_bal, loan_id))
-                        cursor.execute(
-                            "UPDATE transactions SET status = ?, amount = ?, txn_time = ? WHERE txn_id = ?",
-                            (new_status, new_amount, datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'), selected_txn))
-                        conn.commit()
-                        st.success("Database synchronized successfully! Loan balance updated.")
-                        st.balloons()
-                    except Exception as e:
-                        st.error(f"Database Error: {e}")
-                else:
-                    st.error("No active loan found to update.")
-
+        if deferred and new_status == "Success":
+            # The edits are saved together with the settlement, or not at all
+            edit = {"amount": float(new_amount), "account_id": int(account_id), "reference_id": reference_id}
+            try:
+                report = settle_pending(txn_ids=[selected_txn], overrides={selected_txn: edit})
+            except Exception as e:
+                st.error(f"Database Error: {e}")
+                return
+            if report.settled:
+                st.success("Payment settled! Account and outstanding balance updated.")
+                st.balloons()
             else:
-                # Normal Account Logic
-                cursor.execute("SELECT account_id, account_balance FROM accounts WHERE customer_id = ?", (customer_id,))
-                res = cursor.fetchone()
-                if not res:
-                    st.error("No account found for customer.")
-                    return
-                account_id, current_balance = res
-                
-                temp_balance = float(current_balance)
-                final_balance = temp_balance
-                is_valid = True
-                
-                if new_status == "Success":
-                    if trx_type in ["Withdrawal", "Transfer", "Debit"]:
-                        if (temp_balance - new_amount) < 1000:
-                             st.error(f"Denied! Balance would fall below ₹1,000. Available: ₹{temp_balance}")
-                             is_valid = False
-                        else:
-                            final_balance = temp_balance - new_amount
-                    elif trx_type in ["Deposit"]:
-                        final_balance = temp_balance + new_amount
-                
-                if is_valid:
-                    try:
-                        cursor.execute("UPDATE accounts SET account_balance = ? WHERE account_id = ?", (final_balance, account_id))
-                        cursor.execute(
-                            "UPDATE transactions SET status = ?, amount = ?, txn_time = ? WHERE txn_id = ?",
-                            (new_status, new_amount, datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'), selected_txn))
-                        conn.commit()
-                        st.success("Database synchronized successfully!")
-                        st.balloons()
-                    except Exception as e:
-                         st.error(f"Database Error: {e}")
+                reason = next(iter(report.left_pending), "not pending")
+                st.error(f"Denied! Payment left Pending ({SETTLEMENT_REASONS.get(reason, reason)}).")
+            return
+
+        try:
+            result = apply_status_change(selected_txn, int(account_id), new_status, float(new_amount))
+        except Exception as e:
+            st.error(f"Database Error: {e}")
+            return
+        if result.ok:
+            st.success("Database synchronized successfully!")
+            st.balloons()
+        else:
+            st.error(f"Denied! {result.message}")
+
+def settle_pending_payments():
+    with st.expander("Settle all pending loan / card payments"):
+        st.caption("Matches every Pending payment to its loan or card and applies it in batches. "
+                   "Payments that would breach the ₹1,000 minimum or overpay stay Pending.")
+        dry_run = st.checkbox("Preview only (dry run)", value=True, key="settle_dry_run")
+        if not st.button("Run Settlement"):
+            return
+        try:
+            report = settle_pending(dry_run=dry_run)
+        except Exception as e:
+            st.error(f"Settlement failed: {e}")
+            return
+
+        verb = "Would settle" if report.dry_run else "Settled"
+        st.success(f"{verb} {report.settled:,} of {report.examined:,} pending payments "
+                   f"(₹{report.amount_settled:,.2f}) in {report.elapsed:.2f}s.")
+        if report.left_pending:
+            st.warning("Left pending: " + ", ".join(
+                f"{SETTLEMENT_REASONS.get(code, code)} ({count:,})" for code, count in report.left_pending.items()))
+        if not report.lines.empty:
+            st.dataframe(report.lines, use_container_width=True, hide_index=True)
 
 def delete_transaction():
-    T_branch = run_query("SELECT name FROM customers")['name'].tolist()
     st.subheader("Select Customer")
-    selected_name = st.selectbox("Customer Name", T_branch)
-    
-    cust_id_res = run_query("SELECT customer_id FROM customers WHERE name = ?", (selected_name,))
-    if cust_id_res.empty: return
-    cust_id = cust_id_res.iloc[0,0]
+    cust_id = customer_picker()
+    if not cust_id: return
     
     txn_list = run_query("SELECT txn_id FROM transactions WHERE customer_id = ? and status in('Pending', 'Failed')", (cust_id,))['txn_id'].tolist()
     if not txn_list:
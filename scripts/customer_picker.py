@@ -0,0 +1,86 @@
+"""Typeahead customer search shared by the CRUD handlers.
+
+Instead of loading every customer name into a selectbox, the picker asks for
+part of a name and offers the top matches, resolved straight to
+``customer_id``. Name prefixes are answered from ``idx_customers_name_nocase``
+(``name COLLATE NOCASE``), which SQLite uses for ``LIKE 'prefix%'``; when a
+search of three or more characters finds fewer prefix matches than the limit,
+the rest are filled by a substring match (e.g. a surname), which scans but
+stops as soon as the limit is reached.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import pandas as pd
+import streamlit as st
+
+from scripts.commonmethod import run_query
+
+__all__ = [
+    "PICKER_LIMIT",
+    "search_customers",
+    "customer_picker",
+]
+
+PICKER_LIMIT = 20
+# Shorter substrings match too much of the table to be worth the scan
+SUBSTRING_MIN_LENGTH = 3
+
+_ALL_SQL = "SELECT customer_id, name, city FROM customers ORDER BY name COLLATE NOCASE LIMIT ?"
+_PREFIX_SQL = (
+    "SELECT customer_id, name, city FROM customers "
+    "WHERE name LIKE ? ESCAPE '\\' ORDER BY name COLLATE NOCASE LIMIT ?"
+)
+_SUBSTRING_SQL = (
+    "SELECT customer_id, name, city FROM customers "
+    "WHERE instr(lower(name), ?) > 0 AND name NOT LIKE ? ESCAPE '\\' LIMIT ?"
+)
+
+
+def _like_prefix(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+def search_customers(term: str, limit: int = PICKER_LIMIT) -> pd.DataFrame:
+    """Return up to ``limit`` customers whose name matches ``term``.
+
+    Prefix matches (case-insensitive, in name order) come first, then
+    substring matches. An empty term lists the first customers by name.
+
+    Returns:
+        DataFrame with ``customer_id``, ``name`` and ``city``.
+    """
+    term = (term or "").strip()
+    if not term:
+        return run_query(_ALL_SQL, (limit,), cache=True)
+    pattern = _like_prefix(term)
+    matches = run_query(_PREFIX_SQL, (pattern, limit), cache=True)
+    if len(matches) < limit and len(term) >= SUBSTRING_MIN_LENGTH:
+        more = run_query(_SUBSTRING_SQL, (term.lower(), pattern, limit - len(matches)), cache=True)
+        if not more.empty:
+            matches = pd.concat([matches, more], ignore_index=True)
+    return matches
+
+
+def customer_picker(label: str = "Customer Name", key: str = "customer") -> Optional[str]:
+    """Render a search box plus a selectbox of matches; return the chosen ``customer_id``.
+
+    The same ``key`` is used by every handler, so the chosen customer carries
+    over when the user switches between CRUD operations.
+    """
+    term = st.text_input("Search customers", key=f"{key}_search", placeholder="Type part of a name")
+    matches = search_customers(term)
+    if matches.empty:
+        st.warning("No customers match that search.")
+        return None
+    labels = {
+        cid: f"{name} ({cid}{', ' + city if city else ''})"
+        for cid, name, city in matches[["customer_id", "name", "city"]].itertuples(index=False)
+    }
+    customer_id = st.selectbox(label, list(labels), format_func=labels.get, key=f"{key}_select")
+    if len(matches) >= PICKER_LIMIT:
+        st.caption(f"Showing the first {PICKER_LIMIT} matches; type more of the name to narrow down.")
+    return customer_id
@@ -0,0 +1,488 @@
+"""Seeded synthetic BankSight data at any scale.
+
+Reproduces the layout and value mix of the files in ``Data/`` (transaction
+type/status mix, loan types and terms, ticket categories, card networks with
+Luhn-valid numbers from ``generate_card_number``) with foreign keys that line
+up: every account belongs to an existing customer, and transactions, loans,
+cards and tickets reference an existing account together with that account's
+customer.
+
+Rows are produced in fixed-size chunks by a process pool. Every chunk is
+generated from its own seed derived from ``(seed, table, chunk index)``, so
+the output is identical for a given seed whatever the worker count. Output
+goes to CSV (cards as JSON Lines, like ``credit_cards.json``), to JSON Lines
+for every table, or straight into a SQLite database.
+
+Usage:
+    python -m scripts.datagen --transactions 1000000 --out Data/generated
+    python -m scripts.datagen --transactions 100000000 --format sqlite --db /data/big.db
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import sys
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from scripts.commonmethod import generate_card_number
+
+__all__ = [
+    "OUTPUT_FORMATS",
+    "DatasetPlan",
+    "generate_chunk",
+    "dataset_paths",
+    "generate_files",
+    "generate_sqlite",
+]
+
+OUTPUT_FORMATS: Tuple[str, ...] = ("csv", "ndjson", "sqlite")
+DEFAULT_CHUNK_ROWS = 500_000
+DEFAULT_SEED = 42
+
+# Value mixes measured on the sample files in Data/
+TXN_TYPES = {"deposit": 0.392, "withdrawal": 0.306, "purchase": 0.151, "transfer": 0.101, "online fraud": 0.05}
+TXN_STATUSES = {"success": 0.85, "failed": 0.15}
+LOAN_TYPES = {"Home": 0.219, "Personal": 0.208, "Auto": 0.193, "Education": 0.193, "Business": 0.187}
+LOAN_TERMS = {180: 0.15, 120: 0.136, 24: 0.127, 84: 0.127, 240: 0.123, 36: 0.121, 12: 0.118, 60: 0.098}
+LOAN_STATUSES = {"Active": 0.259, "Approved": 0.257, "Defaulted": 0.25, "Closed": 0.234}
+CARD_TYPES = {"Platinum": 0.26, "Gold": 0.259, "Business": 0.246, "Silver": 0.235}
+# Network -> (weight, card number prefixes)
+CARD_NETWORKS = {
+    "Visa": (0.289, ("4",)),
+    "Amex": (0.262, ("34", "37")),
+    "RuPay": (0.233, ("60", "65")),
+    "MasterCard": (0.216, ("51", "52", "53", "54", "55")),
+}
+CARD_STATUSES = {"Blocked": 0.363, "Expired": 0.323, "Active": 0.314}
+ISSUE_CATEGORIES = {
+    "Interest Rate Dispute": 0.123, "Loan Foreclosure": 0.12, "Loan Payment Delay": 0.11,
+    "EMI Auto-debit Failed": 0.088, "Mismatch in Account Statement": 0.062, "KYC Update Required": 0.06,
+    "Account Closure Request": 0.058, "Account Access Issue": 0.055, "Account Frozen": 0.053,
+    "UPI Payment Failed": 0.052, "Debit Card Delivery Delay": 0.05, "Unauthorized Transaction": 0.047,
+    "Cheque Bounce": 0.047, "Online Transfer Failed": 0.042, "Card Not Working": 0.033,
+}
+PRIORITIES = {"Critical": 0.285, "Low": 0.278, "High": 0.223, "Medium": 0.214}
+TICKET_STATUSES = {"Closed": 0.213, "In Progress": 0.203, "Escalated": 0.202, "Open": 0.199, "Resolved": 0.183}
+REMARKS = {
+    "KYC documents verified.": 0.178, "Card replaced and activated.": 0.177, "Issue resolved successfully.": 0.14,
+    "Loan schedule updated.": 0.13, "Pending customer verification.": 0.127, "Refund processed.": 0.125,
+    "Escalated to technical team.": 0.123,
+}
+CHANNELS = {"Phone": 0.265, "In-person": 0.263, "Email": 0.245, "Mobile App": 0.227}
+
+FIRST_NAMES = np.array([
+    "Aarav", "Vivaan", "Aditya", "Vihaan", "Arjun", "Sai", "Reyansh", "Ayaan", "Krishna", "Ishaan",
+    "Ananya", "Diya", "Aadhya", "Saanvi", "Pari", "Anika", "Navya", "Myra", "Sara", "Leena",
+    "Kevin", "Andrea", "Owen", "Maria", "David", "Priya", "Rahul", "Sneha", "Karan", "Meera",
+])
+LAST_NAMES = np.array([
+    "Sharma", "Verma", "Iyer", "Nair", "Reddy", "Patel", "Mehta", "Apte", "Mahajan", "Kapoor",
+    "Jones", "Steele", "Perez", "Miller", "Wang", "Crawford", "Torres", "Gonzalez", "Martin", "Baldwin",
+])
+BRANCH_SUFFIXES = np.array(["Ltd", "Inc", "and Sons", "Group", "PLC", "LLC"])
+CITIES = np.array([
+    "Mumbai", "Delhi", "Bengaluru", "Hyderabad", "Chennai", "Kolkata", "Pune", "Ahmedabad", "Jaipur", "Lucknow",
+    "Kochi", "Indore", "Bhopal", "Nagpur", "Surat", "Patna", "Chandigarh", "Coimbatore", "Mysuru", "Vadodara",
+])
+
+# Which file each table is written to, per output format
+_FILE_NAMES = {
+    "customers": "customers",
+    "branches": "branches",
+    "accounts": "accounts",
+    "loans": "loans",
+    "creditcards": "credit_cards",
+    "transactions": "transactions",
+    "supporttickets": "support_tickets",
+}
+# Generation order follows the foreign keys
+TABLE_ORDER: Tuple[str, ...] = (
+    "customers", "branches", "accounts", "loans", "creditcards", "transactions", "supporttickets",
+)
+
+
+@dataclass(frozen=True)
+class DatasetPlan:
+    """Row counts per table and the seed; all other tables scale with transactions."""
+
+    seed: int
+    customers: int
+    branches: int
+    accounts: int
+    loans: int
+    cards: int
+    tickets: int
+    transactions: int
+
+    @classmethod
+    def for_transactions(cls, transactions: int, seed: int = DEFAULT_SEED) -> "DatasetPlan":
+        """Scale the sample's ratios (500 customers, ~1.1 loans/cards/tickets each per 10K transactions)."""
+        customers = max(10, transactions // 20)
+        return cls(
+            seed=seed,
+            customers=customers,
+            branches=max(10, min(customers, 10_000)),
+            accounts=customers,
+            loans=customers * 11 // 10,
+            cards=customers * 11 // 10,
+            tickets=customers * 6 // 5,
+            transactions=transactions,
+        )
+
+    def rows(self, table: str) -> int:
+        return {
+            "customers": self.customers,
+            "branches": self.branches,
+            "accounts": self.accounts,
+            "loans": self.loans,
+            "creditcards": self.cards,
+            "transactions": self.transactions,
+            "supporttickets": self.tickets,
+        }[table]
+
+    def customer_of(self, account_ids: np.ndarray) -> np.ndarray:
+        """Owning customer number of each account id (1-based, every customer has one)."""
+        return (account_ids - 1) % self.customers + 1
+
+
+def _choice(rng: np.random.Generator, weights: Dict, n: int) -> np.ndarray:
+    values = list(weights)
+    p = np.array(list(weights.values()), dtype=float)
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size=n, p=p / p.sum())]
+
+
+def _ids(prefix: str, numbers: np.ndarray, width: int) -> np.ndarray:
+    return np.char.add(prefix, np.char.zfill(numbers.astype(str), width))
+
+
+def _dates(rng: np.random.Generator, n: int, start: str, end: str) -> np.ndarray:
+    lo, hi = np.datetime64(start, "s"), np.datetime64(end, "s")
+    span = (hi - lo).astype(np.int64)
+    return lo + rng.integers(0, span, n).astype("timedelta64[s]")
+
+
+def _iso(ts: np.ndarray, unit: str = "D") -> np.ndarray:
+    out = np.datetime_as_string(ts, unit=unit)
+    return np.char.replace(out, "T", " ") if unit == "s" else out
+
+
+def _width(count: int, minimum: int) -> int:
+    return max(minimum, len(str(count)))
+
+
+def _branch_names(plan: DatasetPlan, numbers: np.ndarray) -> np.ndarray:
+    # Deterministic per branch number so other tables can reference names without a lookup
+    last = LAST_NAMES[(numbers * 7) % len(LAST_NAMES)]
+    suffix = BRANCH_SUFFIXES[(numbers * 3) % len(BRANCH_SUFFIXES)]
+    return np.char.add(np.char.add(np.char.add(last.astype(str), " "), suffix.astype(str)),
+                       np.char.add(" Branch ", numbers.astype(str)))
+
+
+def _customers(plan, rng, ids):
+    n = len(ids)
+    return pd.DataFrame({
+        "customer_id": _ids("C", ids, _width(plan.customers, 4)),
+        "name": np.char.add(np.char.add(rng.choice(FIRST_NAMES, n), " "), rng.choice(LAST_NAMES, n)),
+        "phnumber": rng.integers(6_000_000_000, 9_999_999_999, n).astype(str),
+        "gender": rng.choice(["M", "F"], n),
+        "age": rng.integers(18, 80, n),
+        "city": rng.choice(CITIES, n),
+        "account_type": rng.choice(["Savings", "Current"], n, p=[0.7, 0.3]),
+        "join_date": _iso(_dates(rng, n, "2015-01-01", "2025-05-24")),
+    })
+
+
+def _branches(plan, rng, ids):
+    n = len(ids)
+    return pd.DataFrame({
+        "Branch_ID": ids,
+        "Branch_Name": _branch_names(plan, ids),
+        "City": rng.choice(CITIES, n),
+        "Manager_Name": np.char.add(np.char.add(rng.choice(FIRST_NAMES, n), " "), rng.choice(LAST_NAMES, n)),
+        "Total_Employees": rng.integers(15, 201, n),
+        "Branch_Revenue": rng.uniform(500_000, 20_000_000, n).round(2),
+        "Opening_Date": _iso(_dates(rng, n, "2005-11-18", "2025-10-23")),
+        "Performance_Rating": rng.integers(1, 6, n),
+    })
+
+
+def _accounts(plan, rng, ids):
+    n = len(ids)
+    # account_id is written explicitly so the references below stay valid
+    return pd.DataFrame({
+        "account_id": ids,
+        "customer_id": _ids("C", plan.customer_of(ids), _width(plan.customers, 4)),
+        "account_balance": rng.uniform(1_500, 500_000, n).round(2),
+        "last_updated": _iso(_dates(rng, n, "2024-05-24", "2025-05-24"), "s"),
+    })
+
+
+def _pick_accounts(plan, rng, n) -> Tuple[np.ndarray, np.ndarray]:
+    accounts = rng.integers(1, plan.accounts + 1, n)
+    return accounts, _ids("C", plan.customer_of(accounts), _width(plan.customers, 4))
+
+
+def _loans(plan, rng, ids):
+    n = len(ids)
+    accounts, customers = _pick_accounts(plan, rng, n)
+    terms = _choice(rng, LOAN_TERMS, n).astype(np.int64)
+    start = _dates(rng, n, "2015-01-16", "2023-12-13").astype("datetime64[D]")
+    end = start + (terms * 30).astype("timedelta64[D]")
+    return pd.DataFrame({
+        "Loan_ID": ids,
+        "Customer_ID": customers,
+        "Account_ID": accounts,
+        "Branch": _branch_names(plan, rng.integers(1, plan.branches + 1, n)),
+        "Loan_Type": _choice(rng, LOAN_TYPES, n),
+        "Loan_Amount": rng.integers(50_000, 5_000_000, n),
+        "Interest_Rate": rng.uniform(6.5, 14.5, n).round(2),
+        "Loan_Term_Months": terms,
+        # The sample files write loan dates day-first
+        "Start_Date": pd.to_datetime(start).strftime("%d-%m-%Y"),
+        "End_Date": pd.to_datetime(end).strftime("%d-%m-%Y"),
+        "Loan_Status": _choice(rng, LOAN_STATUSES, n),
+    })
+
+
+def _cards(plan, rng, ids):
+    n = len(ids)
+    accounts, customers = _pick_accounts(plan, rng, n)
+    networks = _choice(rng, {k: w for k, (w, _) in CARD_NETWORKS.items()}, n)
+    digits = random.Random(int(rng.integers(0, 2**63)))
+    numbers = []
+    for network in networks:
+        prefix = digits.choice(CARD_NETWORKS[network][1])
+        numbers.append(generate_card_number(prefix, 15 if network == "Amex" else 16, rng=digits))
+    issued = _dates(rng, n, "2015-01-03", "2023-12-28").astype("datetime64[D]")
+    return pd.DataFrame({
+        "Card_ID": ids,
+        "Customer_ID": customers,
+        "Account_ID": accounts,
+        "Branch": _branch_names(plan, rng.integers(1, plan.branches + 1, n)),
+        "Card_Number": numbers,
+        "Card_Type": _choice(rng, CARD_TYPES, n),
+        "Card_Network": networks,
+        "Credit_Limit": rng.integers(50_000, 500_000, n),
+        "Current_Balance": rng.uniform(50, 480_000, n).round(2),
+        "Issued_Date": _iso(issued),
+        "Expiry_Date": _iso(issued + rng.integers(365, 5 * 365, n).astype("timedelta64[D]")),
+        "Status": _choice(rng, CARD_STATUSES, n),
+    })
+
+
+def _transactions(plan, rng, ids):
+    n = len(ids)
+    accounts, customers = _pick_accounts(plan, rng, n)
+    return pd.DataFrame({
+        "txn_id": _ids("T", ids, _width(plan.transactions, 5)),
+        "account_id": accounts,
+        "customer_id": customers,
+        "txn_type": _choice(rng, TXN_TYPES, n),
+        "amount": rng.uniform(100, 100_000, n).round(2),
+        "txn_time": _iso(_dates(rng, n, "2024-05-24", "2025-05-24"), "s"),
+        "status": _choice(rng, TXN_STATUSES, n),
+    })
+
+
+def _tickets(plan, rng, ids):
+    n = len(ids)
+    accounts, customers = _pick_accounts(plan, rng, n)
+    categories = _choice(rng, ISSUE_CATEGORIES, n)
+    opened = _dates(rng, n, "2015-01-03", "2023-12-25").astype("datetime64[D]")
+    closed = _iso(opened + rng.integers(1, 31, n).astype("timedelta64[D]")).astype(object)
+    closed[rng.random(n) < 0.173] = None
+    loan_ids = rng.integers(1, plan.loans + 1, n).astype(object)
+    loan_ids[rng.random(n) < 0.618] = None
+    return pd.DataFrame({
+        "Ticket_ID": _ids("T", ids, _width(plan.tickets, 5)),
+        "Customer_ID": customers,
+        "Account_ID": np.char.add("A", accounts.astype(str)),
+        "Loan_ID": loan_ids,
+        "Branch_Name": _branch_names(plan, rng.integers(1, plan.branches + 1, n)),
+        "Issue_Category": categories,
+        "Description": [f"Client raised {c.lower()}." for c in categories],
+        "Date_Opened": _iso(opened),
+        "Date_Closed": closed,
+        "Priority": _choice(rng, PRIORITIES, n),
+        "Status": _choice(rng, TICKET_STATUSES, n),
+        "Resolution_Remarks": _choice(rng, REMARKS, n),
+        "Support_Agent": np.char.add(np.char.add(rng.choice(FIRST_NAMES, n), " "), rng.choice(LAST_NAMES, n)),
+        "Channel": _choice(rng, CHANNELS, n),
+        "Customer_Rating": rng.integers(1, 6, n),
+    })
+
+
+_GENERATORS: Dict[str, Callable[[DatasetPlan, np.random.Generator, np.ndarray], pd.DataFrame]] = {
+    "customers": _customers,
+    "branches": _branches,
+    "accounts": _accounts,
+    "loans": _loans,
+    "creditcards": _cards,
+    "transactions": _transactions,
+    "supporttickets": _tickets,
+}
+
+
+def generate_chunk(plan: DatasetPlan, table: str, chunk_index: int, chunk_rows: int) -> pd.DataFrame:
+    """Generate chunk ``chunk_index`` of ``table``; identical for the same plan and chunk size."""
+    start = chunk_index * chunk_rows
+    count = min(chunk_rows, plan.rows(table) - start)
+    rng = np.random.default_rng([plan.seed, TABLE_ORDER.index(table), chunk_index])
+    return _GENERATORS[table](plan, rng, np.arange(start + 1, start + count + 1))
+
+
+def _file_format(table: str, fmt: str) -> str:
+    # Cards follow credit_cards.json; JSON Lines so they can be streamed
+    return "ndjson" if fmt == "ndjson" or table == "creditcards" else "csv"
+
+
+def dataset_paths(out_dir: str, fmt: str = "csv") -> Dict[str, str]:
+    """Generated file -> table, in the shape of ``scripts.dbsetup.datasets``."""
+    paths = {}
+    for table in TABLE_ORDER:
+        suffix = ".json" if _file_format(table, fmt) == "ndjson" else ".csv"
+        paths[str(Path(out_dir) / f"{_FILE_NAMES[table]}{suffix}")] = table
+    return paths
+
+
+def _render(plan: DatasetPlan, table: str, chunk_index: int, chunk_rows: int, fmt: str) -> bytes:
+    df = generate_chunk(plan, table, chunk_index, chunk_rows)
+    if _file_format(table, fmt) == "ndjson":
+        return df.to_json(orient="records", lines=True).encode("utf-8")
+    return df.to_csv(index=False, header=chunk_index == 0).encode("utf-8")
+
+
+def _rows_for_sqlite(plan, table, chunk_index, chunk_rows, table_cols) -> Tuple[List[str], List[tuple]]:
+    from scripts.etl import transform_chunk
+
+    df = generate_chunk(plan, table, chunk_index, chunk_rows)
+    insert_cols, rows, _ = transform_chunk(df, table, table_cols)
+    return insert_cols, rows
+
+
+def _in_order(pool: Executor, fn, task_args: Sequence[tuple], window: int) -> Iterator:
+    """Submit tasks with at most ``window`` in flight and yield results in task order."""
+    pending: deque = deque()
+    tasks = iter(task_args)
+    for args in tasks:
+        pending.append(pool.submit(fn, *args))
+        if len(pending) >= window:
+            break
+    while pending:
+        yield pending.popleft().result()
+        for args in tasks:
+            pending.append(pool.submit(fn, *args))
+            break
+
+
+def _chunks(plan: DatasetPlan, table: str, chunk_rows: int) -> range:
+    return range(-(-plan.rows(table) // chunk_rows))
+
+
+def generate_files(
+    plan: DatasetPlan,
+    out_dir: str,
+    fmt: str = "csv",
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    workers: Optional[int] = None,
+) -> Dict[str, str]:
+    """Write every table to ``out_dir`` as CSV/JSON Lines; returns ``dataset_paths``."""
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    paths = dataset_paths(out_dir, fmt)
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path, table in paths.items():
+            with open(path, "wb") as out:
+                tasks = [(plan, table, i, chunk_rows, fmt) for i in _chunks(plan, table, chunk_rows)]
+                for payload in _in_order(pool, _render, tasks, 2 * workers):
+                    out.write(payload)
+            print(f"Wrote {plan.rows(table)} rows to {path}", flush=True)
+    return paths
+
+
+def generate_sqlite(
+    plan: DatasetPlan,
+    db_path: str,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    workers: Optional[int] = None,
+    commit_rows: int = 1_000_000,
+) -> None:
+    """Create the schema in ``db_path`` if needed and insert every table directly."""
+    from scripts.dbsetup import BankSightDB
+    from scripts.etl import BULK_PRAGMAS
+    from scripts.insights_summary import drop_summary_triggers, ensure_summaries
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = BankSightDB(db_path)
+        db.create_tables()
+        db.close_connection()
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    previous = {}
+    for name, value in BULK_PRAGMAS:
+        previous[name] = conn.execute(f"PRAGMA {name}").fetchone()[0]
+        conn.execute(f"PRAGMA {name} = {value}")
+    workers = workers or os.cpu_count() or 1
+    try:
+        drop_summary_triggers(conn)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for table in TABLE_ORDER:
+                table_cols = [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+                tasks = [(plan, table, i, chunk_rows, table_cols) for i in _chunks(plan, table, chunk_rows)]
+                uncommitted = 0
+                conn.execute("BEGIN")
+                for insert_cols, rows in _in_order(pool, _rows_for_sqlite, tasks, 2 * workers):
+                    conn.executemany(
+                        f"INSERT OR IGNORE INTO {table} ({', '.join(insert_cols)}) "
+                        f"VALUES ({', '.join('?' for _ in insert_cols)})",
+                        rows,
+                    )
+                    uncommitted += len(rows)
+                    if uncommitted >= commit_rows:
+                        conn.execute("COMMIT")
+                        conn.execute("BEGIN")
+                        uncommitted = 0
+                conn.execute("COMMIT")
+                print(f"Inserted {plan.rows(table)} rows into {table}", flush=True)
+    finally:
+        ensure_summaries(conn)
+        for name, value in previous.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        conn.close()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic BankSight dataset.")
+    parser.add_argument("--transactions", type=int, default=10_000, help="Transaction rows; other tables scale with it")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="csv")
+    parser.add_argument("--out", default="Data/generated", help="Output directory for csv/ndjson")
+    parser.add_argument("--db", help="SQLite database for --format sqlite")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, help="Generator processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    plan = DatasetPlan.for_transactions(args.transactions, args.seed)
+    if args.format == "sqlite":
+        if not args.db:
+            parser.error("--format sqlite requires --db")
+        generate_sqlite(plan, args.db, args.chunk_rows, args.workers)
+    else:
+        generate_files(plan, args.out, args.format, args.chunk_rows, args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
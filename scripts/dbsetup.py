@@ -1,8 +1,14 @@
+import argparse
 import sqlite3
 import pandas as pd
 from pathlib import Path
 import json
-import warnings
+
+from scripts.amortization import ensure_amortization, refresh_amortization
+from scripts.etl import load_datasets
+from scripts.indexes import apply_indexes
+from scripts.insights_summary import ensure_summaries
+from scripts.stress_test import ensure_stress_tables
 
 datasets = {
     "Data/customers.csv": "customers",
@@ -170,10 +176,13 @@ class BankSightDB:
                 amount REAL NOT NULL CHECK (amount > 0),
                 txn_time TEXT NOT NULL,
                 status VARCHAR(20) NOT NULL,
+                reference_id INTEGER,
                 FOREIGN KEY (customer_id) REFERENCES customers(customer_id) ON DELETE CASCADE,
                 FOREIGN KEY (account_id) REFERENCES accounts(account_id) ON DELETE CASCADE
             );
         ''')
+        # Loan/card a Pending payment is for (see scripts.settlement)
+        self.ensure_columns('transactions', {'reference_id': 'INTEGER'})
 
         self.recreate_table_if_empty('supporttickets', '''
             CREATE TABLE IF NOT EXISTS supporttickets (
@@ -199,6 +208,20 @@ class BankSightDB:
             );
         ''')
 
+        # Secondary indexes for the CRUD handlers' and Insights' access paths
+        created = apply_indexes(self.conn)
+        if created:
+            print(f"Indexes created/updated: {', '.join(created)}")
+
+        # Materialized Insights aggregates, kept current by triggers from here on
+        if ensure_summaries(self.conn):
+            print("Insights summary tables created.")
+
+        # One priced row per loan (EMI, outstanding principal), filled after loading
+        ensure_amortization(self.conn)
+        # Results of scripts.stress_test, read by the Insights stress section
+        ensure_stress_tables(self.conn)
+
     def extract_data(self, file_path):
         """Extract data from a CSV or JSON file.
 
@@ -265,92 +288,41 @@ class BankSightDB:
         self.conn.commit()
 
     def transform_and_load(self, file_path, table_name):
-        df = self.extract_data(file_path)
-        if df is not None:
-            # 1. Standardize column names
-            df.columns = [c.lower() for c in df.columns]
-            
-            # 2. Fix the ID type mismatchs and duplicate columns
-            df = df.loc[:, ~df.columns.duplicated()]
-            
-            # 3. Handle duplicates BEFORE loading
-            df = df.drop_duplicates()
-
-            try:
-                # Normalize date/time-like columns (use dayfirst=True — datasets use dd-mm-YYYY)
-                date_cols = [col for col in df.columns if 'date' in col or 'time' in col]
-                for col in date_cols:
-                    # Suppress ambiguous parsing warnings from pandas for mixed formats
-                    with warnings.catch_warnings():
-                        warnings.filterwarnings('ignore', message='Parsing dates')
-                        df[col] = pd.to_datetime(df[col], errors='coerce', dayfirst=True).dt.strftime('%Y-%m-%d')
+        """Load a single file into table_name with the chunked bulk loader."""
+        self.bulk_load({file_path: table_name})
 
-                # Table-specific column mappings (common differences between data and schema)
-                mappings = {
-                    'loans': {'branch': 'branch_name'},
-                    'creditcards': {'branch': 'branch_name'}
-                }
-                if table_name in mappings:
-                    df = df.rename(columns=mappings[table_name])
-
-                # Align DataFrame columns with target table columns
-                try:
-                    pragma = self.cursor.execute(f"PRAGMA table_info({table_name})").fetchall()
-                    table_cols = [r[1] for r in pragma]
-                    pk_cols = [r[1] for r in pragma if r[5] == 1]
-                except Exception:
-                    table_cols = list(df.columns)
-                    pk_cols = []
-
-                # Keep only columns that exist in the target table
-                insert_cols = [c for c in df.columns if c in table_cols]
-                df = df.loc[:, insert_cols]
-
-                if df.empty:
-                    print(f"No matching columns to insert into {table_name}.")
-                    return
-
-                # Best-effort: remove rows whose PK already exists (if PK is present both in df and table)
-                try:
-                    if pk_cols and pk_cols[0] in df.columns:
-                        pk = pk_cols[0]
-                        existing = pd.read_sql(f"SELECT {pk} FROM {table_name}", self.conn)[pk].astype(str)
-                        df = df[~df[pk].astype(str).isin(existing)]
-                except Exception:
-                    pass
+    def bulk_load(self, datasets, **options):
+        """Stream every file in datasets (path -> table) into the database.
 
-                if df.empty:
-                    print(f"No new records to load into {table_name}.")
-                    return
-
-                # Use INSERT OR IGNORE to avoid halting on unique/constraint violations
-                cols_sql = ", ".join(insert_cols)
-                placeholders = ", ".join(["?" for _ in insert_cols])
-                insert_sql = f"INSERT OR IGNORE INTO {table_name} ({cols_sql}) VALUES ({placeholders})"
-
-                try:
-                    # Insert in chunks to avoid huge single transactions
-                    # Prepare rows, replacing NaN/NaT with None for sqlite
-                    df_to_insert = df[insert_cols].copy()
-                    df_to_insert = df_to_insert.where(pd.notnull(df_to_insert), None)
-                    rows = [tuple(x) for x in df_to_insert.itertuples(index=False, name=None)]
-                    chunk = 500
-                    candidate_count = len(rows)
-                    for i in range(0, candidate_count, chunk):
-                        batch = rows[i:i+chunk]
-                        self.cursor.executemany(insert_sql, batch)
-                        self.conn.commit()
-                    print(f"Loaded {candidate_count} candidate records into {table_name} (INSERT OR IGNORE).")
-                except sqlite3.IntegrityError as e:
-                    print(f"Skipping {table_name}: Data violates constraints: {e}")
-                except Exception as e:
-                    print(f"Error loading data into {table_name}: {e}")
-            except sqlite3.IntegrityError:
-                print(f"Skipping {table_name}: Data already exists or violates constraints.")
-            except Exception as e:
-                print(f"Error loading data into {table_name}: {e}")
-        else:
-            print(f"Skipping {table_name}: Data extraction failed.")
+        Files are read in chunks and transformed in a process pool, and rows are
+        written by a single connection in large transactions (see scripts.etl).
+        Tables load after their FK parents; independent tables load together.
+        By default only rows appended since the last load are read (see the
+        etl_watermarks table); pass incremental=False to re-read every file.
+        """
+        # The loader switches journal modes, which SQLite refuses while
+        # another connection to the file is open
+        self.conn.commit()
+        self.conn.close()
+        try:
+            results = load_datasets(self.db_name, datasets, **options)
+        finally:
+            self.conn = sqlite3.connect(self.db_name)
+            self.cursor = self.conn.cursor()
+        for result in results.values():
+            if result.error:
+                print(f"Error loading data into {result.table}: {result.error}")
+            if result.mode == "unchanged":
+                print(f"No new records to load into {result.table}.")
+                continue
+            print(
+                f"Loaded {result.candidates} candidate records into {result.table} "
+                f"({result.mode}: {result.written} written, {result.rejected} rejected, {result.seconds:.1f}s)."
+            )
+            for col, count in result.coerced.items():
+                if count:
+                    print(f"  {result.table}.{col}: {count} unparseable dates stored as NULL")
+        return results
 
     def verify_data(self):
     # Must be lowercase to match your SQL
@@ -409,10 +381,14 @@ class BankSightDB:
         self.conn.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the BankSight schema and load Data/.")
+    parser.add_argument("--full", action="store_true", help="Re-read every source file instead of only new rows")
+    args = parser.parse_args()
+
     db = BankSightDB()
     db.create_tables()
-    for file_path, table_name in datasets.items():
-        db.transform_and_load(file_path, table_name)
+    db.bulk_load(datasets, incremental=not args.full)
     db.verify_data()
     db.close_connection()
+    print(f"Loans priced: {refresh_amortization()}")
 #
\ No newline at end of file
@@ -0,0 +1,638 @@
+"""Chunked, parallel bulk loader for the BankSight source files.
+
+Each file is read in ``chunksize`` pieces. Every chunk is transformed
+(column normalization, date parsing, schema alignment) in a process pool, and
+all SQLite writes go through one writer connection that commits in large
+batches. Tables are loaded level by level following their foreign keys, and
+the files of one level (e.g. customers and branches) are read and transformed
+concurrently.
+
+Loads are incremental: a watermark per source file (byte offset plus a
+fingerprint of the bytes already loaded) is kept in ``etl_watermarks``. An
+unchanged file is skipped, a CSV/JSON Lines file that only grew is read from
+the stored offset, and anything else is re-read in full. Rows are upserted on
+the table's primary key, updating only rows whose values changed, so a re-run
+costs in proportion to the new data.
+
+Bulk mode relaxes durability (``synchronous=OFF``, ``journal_mode=MEMORY``) for
+the duration of the load and restores the database's own settings afterwards.
+A WAL database (the app's pooled connections switch it to WAL) stays in WAL,
+so it can be reloaded while other connections are open. When any file is read from the start, the Insights
+summary triggers are dropped and the summaries rebuilt once at the end; an
+append-only delta keeps the triggers so the summaries update incrementally.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import queue
+import sqlite3
+import threading
+import time
+import warnings
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from scripts.insights_summary import drop_summary_triggers, ensure_summaries
+
+__all__ = [
+    "BULK_PRAGMAS",
+    "LoadResult",
+    "read_chunks",
+    "DATE_FORMATS",
+    "date_columns",
+    "sniff_date_format",
+    "normalize_dates",
+    "transform_chunk",
+    "load_levels",
+    "upsert_sql",
+    "ensure_watermark_table",
+    "load_datasets",
+]
+
+DEFAULT_CHUNK_SIZE = 100_000
+# Rows written per transaction by the single writer
+DEFAULT_COMMIT_ROWS = 500_000
+
+BULK_PRAGMAS: Tuple[Tuple[str, object], ...] = (
+    ("synchronous", "OFF"),
+    ("journal_mode", "MEMORY"),
+    ("temp_store", "MEMORY"),
+    ("cache_size", -200_000),
+)
+
+# Bytes hashed from each end of the loaded region to fingerprint a source file
+FINGERPRINT_BYTES = 64 * 1024
+
+# Candidate formats for date columns, day-first before month-first
+DATE_FORMATS: Tuple[str, ...] = (
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%dT%H:%M:%S",
+    "%d-%m-%Y",
+    "%d/%m/%Y",
+    "%d-%m-%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M:%S",
+    "%d-%m-%Y %H:%M",
+    "%d/%m/%Y %H:%M",
+    "%m/%d/%Y",
+    "%Y/%m/%d",
+)
+SNIFF_SAMPLE_SIZE = 1_000
+# Share of the sample a format must parse to be used for the fast path
+SNIFF_MIN_MATCH = 0.9
+
+# Source column -> table column, per table
+COLUMN_MAPPINGS: Dict[str, Dict[str, str]] = {
+    'loans': {'branch': 'branch_name'},
+    'creditcards': {'branch': 'branch_name'},
+}
+
+
+@dataclass
+class LoadResult:
+    """Outcome of loading one file.
+
+    Attributes:
+        table: Target table.
+        mode: ``full`` (read from the start), ``append`` (read from the
+            watermark) or ``unchanged`` (skipped).
+        candidates: Rows read and transformed.
+        written: Rows inserted or updated.
+        rejected: Rows skipped because they violate a constraint.
+        coerced: Date column -> values that could not be parsed (stored as NULL).
+        seconds: Wall time spent on the file.
+        error: Set if the load of this file stopped early.
+    """
+
+    table: str
+    mode: str = "full"
+    candidates: int = 0
+    written: int = 0
+    rejected: int = 0
+    coerced: Dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+class _ByteRange(io.RawIOBase):
+    """Readable view of ``prefix`` followed by bytes ``[start, end)`` of a file."""
+
+    def __init__(self, path: str, start: int, end: int, prefix: bytes = b""):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._remaining = end - start
+        self._prefix = prefix
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._prefix:
+            n = min(len(buffer), len(self._prefix))
+            buffer[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+        n = min(len(buffer), self._remaining)
+        if n <= 0:
+            return 0
+        data = self._file.read(n)
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+def _is_json_lines(file_path: str) -> bool:
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.read(64).lstrip()[:1] == '{'
+
+
+def _appendable(file_path: str) -> bool:
+    """True for line-oriented sources that can be resumed from a byte offset."""
+    suffix = Path(file_path).suffix.lower()
+    return suffix == '.csv' or (suffix == '.json' and _is_json_lines(file_path))
+
+
+def read_chunks(
+    file_path: str,
+    chunksize: int = DEFAULT_CHUNK_SIZE,
+    start: int = 0,
+    end: Optional[int] = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield a CSV/JSON file as DataFrames of at most ``chunksize`` rows.
+
+    CSV and JSON Lines files are streamed, optionally restricted to the byte
+    range ``[start, end)`` (``start`` must be a line boundary past the CSV
+    header). A JSON array has to be parsed whole and is then sliced.
+    """
+    suffix = Path(file_path).suffix.lower()
+    if suffix not in ('.csv', '.json'):
+        raise ValueError(f"Unsupported file type: {suffix!r}")
+    size = os.path.getsize(file_path)
+    end = size if end is None else end
+
+    if suffix == '.json' and not _is_json_lines(file_path):
+        df = pd.read_json(file_path, orient='records')
+        for offset in range(0, len(df), chunksize):
+            yield df.iloc[offset:offset + chunksize]
+        return
+
+    if start == 0 and end == size:
+        source = file_path
+    else:
+        prefix = b""
+        if suffix == '.csv' and start > 0:
+            with open(file_path, 'rb') as f:
+                prefix = f.readline()
+        source = io.BufferedReader(_ByteRange(file_path, start, end, prefix))
+    try:
+        if suffix == '.csv':
+            yield from pd.read_csv(source, chunksize=chunksize)
+        else:
+            with pd.read_json(source, lines=True, chunksize=chunksize) as reader:
+                yield from reader
+    finally:
+        if not isinstance(source, str):
+            source.close()
+
+
+def date_columns(columns: Sequence[str]) -> List[str]:
+    """Columns treated as dates: any whose (lowercased) name mentions date or time."""
+    return [c for c in columns if 'date' in c.lower() or 'time' in c.lower()]
+
+
+def sniff_date_format(values: pd.Series) -> Optional[str]:
+    """Pick the DATE_FORMATS entry that parses most of a sample of ``values``.
+
+    Returns None when no format parses at least SNIFF_MIN_MATCH of the
+    non-null sample. Day-first formats are listed before month-first ones, so
+    an ambiguous sample resolves day-first like the old parser.
+    """
+    sample = values.dropna()
+    sample = sample[sample.astype(str).str.strip() != ""].head(SNIFF_SAMPLE_SIZE).astype(str)
+    if sample.empty:
+        return None
+    best, best_ratio = None, 0.0
+    for fmt in DATE_FORMATS:
+        ratio = pd.to_datetime(sample, format=fmt, errors='coerce').notna().mean()
+        if ratio > best_ratio:
+            best, best_ratio = fmt, ratio
+        if ratio == 1.0:
+            break
+    return best if best_ratio >= SNIFF_MIN_MATCH else None
+
+
+def normalize_dates(df: pd.DataFrame, formats: Optional[Mapping[str, Optional[str]]] = None) -> Dict[str, int]:
+    """Rewrite every date column of ``df`` in place as ``YYYY-MM-DD`` text.
+
+    Each column is parsed with its sniffed format (``formats``, or sniffed
+    from ``df`` itself). Only values that do not match go through the slow
+    per-value parser (day-first, mixed formats).
+
+    Returns:
+        Column -> number of non-empty values that could not be parsed and
+        were stored as NULL.
+    """
+    coerced = {}
+    for col in date_columns(df.columns):
+        raw = df[col]
+        fmt = formats.get(col) if formats is not None and col in formats else sniff_date_format(raw)
+        present = raw.notna() & (raw.astype(str).str.strip() != "")
+        if fmt is not None:
+            parsed = pd.to_datetime(raw, format=fmt, errors='coerce')
+        else:
+            parsed = pd.Series(pd.NaT, index=raw.index, dtype='datetime64[ns]')
+        # Stragglers: ISO 8601 variants first, then anything day-first
+        for fallback_format in ('ISO8601', 'mixed'):
+            misses = present & parsed.isna()
+            if not misses.any():
+                break
+            with warnings.catch_warnings():
+                warnings.filterwarnings('ignore', message='Parsing dates')
+                fallback = pd.to_datetime(
+                    raw[misses].astype(str), errors='coerce', dayfirst=True, format=fallback_format
+                )
+            if parsed.dtype != fallback.dtype:
+                parsed = parsed.astype(fallback.dtype)
+            parsed.loc[misses] = fallback
+        coerced[col] = int((present & parsed.isna()).sum())
+        df[col] = parsed.dt.strftime('%Y-%m-%d')
+    return coerced
+
+
+def transform_chunk(
+    df: pd.DataFrame,
+    table_name: str,
+    table_cols: Sequence[str],
+    date_formats: Optional[Mapping[str, Optional[str]]] = None,
+) -> Tuple[List[str], List[tuple], Dict[str, int]]:
+    """Normalize one chunk for executemany.
+
+    Runs in a worker process, so it only depends on its arguments.
+
+    Returns:
+        ``(insert columns, rows, NULL-coerced date values per column)``.
+    """
+    df.columns = [c.lower() for c in df.columns]
+    df = df.loc[:, ~df.columns.duplicated()]
+    df = df.drop_duplicates()
+
+    coerced = normalize_dates(df, date_formats)
+
+    if table_name in COLUMN_MAPPINGS:
+        df = df.rename(columns=COLUMN_MAPPINGS[table_name])
+
+    insert_cols = [c for c in df.columns if c in table_cols]
+    df = df.loc[:, insert_cols].astype(object)
+    df = df.where(pd.notnull(df), None)
+    return insert_cols, list(df.itertuples(index=False, name=None)), coerced
+
+
+def upsert_sql(table: str, columns: Sequence[str], key: Sequence[str]) -> str:
+    """Build an INSERT that updates rows whose ``key`` exists and whose values differ.
+
+    Without a usable key (e.g. an AUTOINCREMENT id absent from the source)
+    this is a plain INSERT OR IGNORE. Conflicts on other UNIQUE constraints
+    skip the row.
+    """
+    cols = ", ".join(columns)
+    values = ", ".join("?" for _ in columns)
+    sql = f"INSERT OR IGNORE INTO {table} ({cols}) VALUES ({values})"
+    if not key or not set(key) <= set(columns):
+        return sql
+    rest = [c for c in columns if c not in key]
+    if rest:
+        sets = ", ".join(f"{c} = excluded.{c}" for c in rest)
+        current = ", ".join(f"{table}.{c}" for c in rest)
+        incoming = ", ".join(f"excluded.{c}" for c in rest)
+        sql += (
+            f" ON CONFLICT({', '.join(key)}) DO UPDATE SET {sets}"
+            f" WHERE ({current}) IS NOT ({incoming})"
+        )
+    return sql + " ON CONFLICT DO NOTHING"
+
+
+def ensure_watermark_table(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS etl_watermarks (
+            source TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            byte_offset INTEGER NOT NULL,
+            fingerprint TEXT NOT NULL,
+            file_size INTEGER NOT NULL,
+            file_mtime REAL NOT NULL,
+            rows_loaded INTEGER NOT NULL DEFAULT 0,
+            loaded_at TEXT NOT NULL DEFAULT (datetime('now')),
+            PRIMARY KEY (source, table_name)
+        )
+    """)
+
+
+def _fingerprint(file_path: str, upto: int) -> str:
+    """Hash the first and last FINGERPRINT_BYTES of ``[0, upto)`` plus its length."""
+    digest = hashlib.sha256(str(upto).encode())
+    with open(file_path, 'rb') as f:
+        digest.update(f.read(min(upto, FINGERPRINT_BYTES)))
+        tail = max(0, upto - FINGERPRINT_BYTES)
+        f.seek(tail)
+        digest.update(f.read(upto - tail))
+    return digest.hexdigest()
+
+
+def _last_line_end(file_path: str, size: int) -> int:
+    """Offset just past the last newline; a trailing partial line waits for the next run."""
+    with open(file_path, 'rb') as f:
+        pos = size
+        while pos > 0:
+            step = min(pos, FINGERPRINT_BYTES)
+            pos -= step
+            f.seek(pos)
+            block = f.read(step)
+            idx = block.rfind(b'\n')
+            if idx != -1:
+                return pos + idx + 1
+    return 0
+
+
+@dataclass
+class _SourcePlan:
+    path: str
+    start: int
+    end: int
+    fingerprint: str
+    size: int
+    mtime: float
+    mode: str
+
+
+def _plan_source(conn: sqlite3.Connection, path: str, table: str, incremental: bool) -> _SourcePlan:
+    stat = os.stat(path)
+    appendable = _appendable(path)
+    end = _last_line_end(path, stat.st_size) if appendable else stat.st_size
+    plan = _SourcePlan(path, 0, end, _fingerprint(path, end), stat.st_size, stat.st_mtime, "full")
+    if not incremental:
+        return plan
+    mark = conn.execute(
+        "SELECT byte_offset, fingerprint FROM etl_watermarks WHERE source = ? AND table_name = ?",
+        (path, table),
+    ).fetchone()
+    if mark is None:
+        return plan
+    offset, fingerprint = mark
+    if offset == end and fingerprint == plan.fingerprint:
+        plan.start, plan.mode = end, "unchanged"
+    elif appendable and offset < end and _fingerprint(path, offset) == fingerprint:
+        plan.start, plan.mode = offset, "append"
+    return plan
+
+
+def _save_watermark(conn: sqlite3.Connection, table: str, plan: _SourcePlan, rows: int) -> None:
+    conn.execute(
+        """
+        INSERT INTO etl_watermarks (source, table_name, byte_offset, fingerprint, file_size, file_mtime, rows_loaded)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(source, table_name) DO UPDATE SET
+            byte_offset = excluded.byte_offset,
+            fingerprint = excluded.fingerprint,
+            file_size = excluded.file_size,
+            file_mtime = excluded.file_mtime,
+            rows_loaded = etl_watermarks.rows_loaded + excluded.rows_loaded,
+            loaded_at = datetime('now')
+        """,
+        (plan.path, table, plan.end, plan.fingerprint, plan.size, plan.mtime, rows),
+    )
+
+
+def load_levels(conn: sqlite3.Connection, tables: Sequence[str]) -> List[List[str]]:
+    """Group ``tables`` into levels so each table's FK parents are in an earlier level."""
+    remaining = {t.lower(): t for t in tables}
+    parents = {}
+    for key, table in remaining.items():
+        refs = {row[2].lower() for row in conn.execute(f"PRAGMA foreign_key_list({table})")}
+        parents[key] = (refs & remaining.keys()) - {key}
+
+    levels: List[List[str]] = []
+    done: set = set()
+    while remaining:
+        level = [key for key in remaining if parents[key] <= done]
+        if not level:
+            # FK cycle: load the rest together
+            level = list(remaining)
+        levels.append([remaining.pop(key) for key in level])
+        done.update(level)
+    return levels
+
+
+class _Done:
+    def __init__(self, table: str, error: Optional[str] = None):
+        self.table = table
+        self.error = error
+
+
+class _InlineExecutor(Executor):
+    """Runs submitted work immediately; used when ``workers=0``."""
+
+    def submit(self, fn, *args, **kwargs):
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def _produce(plan: _SourcePlan, table, table_cols, chunksize, pool, out: queue.Queue) -> None:
+    try:
+        formats = None
+        for chunk in read_chunks(plan.path, chunksize, plan.start, plan.end):
+            if formats is None:
+                # Sniff each date column's format once, from the first chunk
+                formats = {col.lower(): sniff_date_format(chunk[col]) for col in date_columns(chunk.columns)}
+            # Futures are queued in file order so rows are applied in file order
+            out.put((table, pool.submit(transform_chunk, chunk, table, table_cols, formats)))
+        out.put(_Done(table))
+    except Exception as e:
+        out.put(_Done(table, str(e)))
+
+
+def _apply_pragmas(conn: sqlite3.Connection, pragmas) -> Dict[str, object]:
+    """Apply ``pragmas``; returns the previous value of each one changed."""
+    previous = {}
+    for name, value in pragmas:
+        current = conn.execute(f"PRAGMA {name}").fetchone()[0]
+        # Leaving WAL needs every other connection closed, and WAL with
+        # synchronous=OFF is already a fast bulk mode
+        if name == "journal_mode" and str(current).lower() == "wal":
+            continue
+        previous[name] = current
+        conn.execute(f"PRAGMA {name} = {value}")
+    return previous
+
+
+def load_datasets(
+    db_path: str,
+    datasets: Mapping[str, str],
+    chunksize: int = DEFAULT_CHUNK_SIZE,
+    workers: Optional[int] = None,
+    commit_rows: int = DEFAULT_COMMIT_ROWS,
+    incremental: bool = True,
+) -> Dict[str, LoadResult]:
+    """Bulk-load ``datasets`` (file path -> table) into ``db_path``.
+
+    Rows are upserted on the table's primary key when the source carries it,
+    otherwise inserted with INSERT OR IGNORE. Tables must already exist.
+
+    Args:
+        db_path: SQLite database to load into.
+        datasets: Source file path -> target table.
+        chunksize: Rows read from a file per chunk.
+        workers: Transform processes; None uses the CPU count, 0 transforms
+            inline in the reader threads.
+        commit_rows: Rows written per transaction.
+        incremental: Use the stored watermarks to skip unchanged files and
+            read only appended rows; False re-reads every file in full.
+
+    Returns:
+        LoadResult per table.
+    """
+    # Autocommit mode: the writer manages BEGIN/COMMIT itself
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    files = {table: path for path, table in datasets.items()}
+    results = {table: LoadResult(table) for table in files}
+    pool: Optional[Executor] = None
+    previous = _apply_pragmas(conn, BULK_PRAGMAS)
+    try:
+        ensure_watermark_table(conn)
+        plans = {table: _plan_source(conn, path, table, incremental) for table, path in files.items()}
+        for table, plan in plans.items():
+            results[table].mode = plan.mode
+        if any(plan.mode == "full" for plan in plans.values()):
+            # Cheaper to rebuild the summaries once than to maintain them row by row
+            drop_summary_triggers(conn)
+        pool = _InlineExecutor() if workers == 0 else ProcessPoolExecutor(max_workers=workers or os.cpu_count())
+        columns = {}
+        for table in files:
+            info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+            pk = [r[1] for r in sorted(info, key=lambda r: r[5]) if r[5] > 0]
+            columns[table] = ([r[1] for r in info], pk)
+        for level in load_levels(conn, [t for t in files if plans[t].mode != "unchanged"]):
+            _load_level(conn, level, plans, columns, results, chunksize, pool, commit_rows)
+        conn.execute("PRAGMA optimize")
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        ensure_summaries(conn)
+        # Restore the database's own settings; journal_mode first since it ends bulk mode
+        for name in sorted(previous, key=lambda name: name != "journal_mode"):
+            conn.execute(f"PRAGMA {name} = {previous[name]}")
+        conn.close()
+    return results
+
+
+def _write_rows(conn: sqlite3.Connection, sql: str, rows: List[tuple]) -> Tuple[int, int]:
+    """Write ``rows``; on a constraint error retry row by row. Returns (written, rejected)."""
+    before = conn.total_changes
+    try:
+        conn.executemany(sql, rows)
+        return conn.total_changes - before, 0
+    except sqlite3.IntegrityError:
+        pass
+    # Rows applied before the failure are re-applied as no-op upserts
+    rejected = 0
+    for row in rows:
+        try:
+            conn.execute(sql, row)
+        except sqlite3.IntegrityError:
+            rejected += 1
+    return conn.total_changes - before, rejected
+
+
+def _load_level(conn, level, plans, columns, results, chunksize, pool, commit_rows) -> None:
+    started = {table: time.perf_counter() for table in level}
+    # Bounded so fast readers cannot queue up the whole file in memory
+    pending: queue.Queue = queue.Queue(maxsize=max(4, 2 * len(level)))
+    threads = [
+        threading.Thread(
+            target=_produce,
+            args=(plans[table], table, columns[table][0], chunksize, pool, pending),
+            name=f"etl-read-{table}",
+            daemon=True,
+        )
+        for table in level
+    ]
+    for t in threads:
+        t.start()
+
+    statements: Dict[Tuple[str, Tuple[str, ...]], str] = {}
+    uncommitted = 0
+    open_tables = set(level)
+    failed: set = set()
+    conn.execute("BEGIN")
+    try:
+        while open_tables:
+            item = pending.get()
+            if isinstance(item, _Done):
+                open_tables.discard(item.table)
+                result = results[item.table]
+                if item.error and item.table not in failed:
+                    failed.add(item.table)
+                    result.error = item.error
+                if item.table not in failed:
+                    # Committed together with the table's last rows
+                    _save_watermark(conn, item.table, plans[item.table], result.candidates)
+                result.seconds = time.perf_counter() - started[item.table]
+                continue
+            table, future = item
+            if table in failed:
+                continue
+            try:
+                insert_cols, rows, coerced = future.result()
+            except Exception as e:
+                failed.add(table)
+                results[table].error = str(e)
+                continue
+            for col, count in coerced.items():
+                results[table].coerced[col] = results[table].coerced.get(col, 0) + count
+            if not insert_cols or not rows:
+                continue
+            key = (table, tuple(insert_cols))
+            if key not in statements:
+                statements[key] = upsert_sql(table, insert_cols, columns[table][1])
+            try:
+                written, rejected = _write_rows(conn, statements[key], rows)
+            except sqlite3.Error as e:
+                failed.add(table)
+                results[table].error = str(e)
+                continue
+            results[table].candidates += len(rows)
+            results[table].written += written
+            results[table].rejected += rejected
+            uncommitted += len(rows)
+            if uncommitted >= commit_rows:
+                conn.execute("COMMIT")
+                conn.execute("BEGIN")
+                uncommitted = 0
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        # Unblock readers still waiting on a full queue before joining them
+        while any(t.is_alive() for t in threads):
+            try:
+                pending.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for t in threads:
+            t.join()
@@ -1,18 +1,47 @@
-
 import streamlit as st
-import pandas as pd
-from scripts.commonmethod import run_query
+import tempfile
+from scripts.column_stats import get_column_stats
+from scripts.table_export import CONTENT_TYPES, EXPORT_FORMATS, export_table
+from scripts.table_query import ROWID_COLUMN, TableFilter, count_rows, fetch_page, list_tables, table_columns
+
+
+PAGE_SIZES = [50, 100, 500, 1000]
+
 
-# Page Config
-st.set_page_config(page_title="BankSight Dashboard", layout="wide")
+def render_download(flt: TableFilter, key: str = "explorer") -> None:
+    """Offer the rows matching ``flt`` as a CSV/Parquet/NDJSON download.
+
+    The export is streamed to a temporary file in chunks, never through a
+    DataFrame. Streamlit serves downloads from memory, though, so the finished
+    file is read in whole; very large exports belong on the command line
+    (``python -m scripts.table_export``), which keeps memory bounded.
+    """
+    with st.expander("Export Data"):
+        fmt = st.selectbox("Format", EXPORT_FORMATS, key=f"{key}_export_format")
+        if st.button("Prepare Export", key=f"{key}_export_prepare"):
+            with tempfile.TemporaryFile() as spool:
+                try:
+                    count = export_table(flt, fmt, spool)
+                except Exception as e:
+                    st.error(f"Export failed: {e}")
+                    return
+                spool.seek(0)
+                payload = spool.read()
+            st.download_button(
+                f"Download {count} rows as {fmt.upper()}",
+                data=payload,
+                file_name=f"{flt.table}.{fmt}",
+                mime=CONTENT_TYPES[fmt],
+                key=f"{key}_export_download",
+            )
 
 
 class DataExplorer:
     def render(self, conn):
         st.title("Raw Data Viewer & Filter")
-        
+
         try:
-            tables = run_query("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';")['name'].tolist()
+            tables = list_tables()
         except Exception:
             tables = ["customers", "branches", "accounts", "transactions", "loans", "creditcards", "SupportTickets"]
 
@@ -23,31 +52,55 @@ class DataExplorer:
                 st.error("Invalid table selected.")
             else:
                 try:
-                    # Load all data (or a larger subset) for filtering
-                    # Warning: production apps should filter in SQL. For this project size, pandas processing is fine.
-                    df = run_query(f"SELECT * FROM {table_name}")
-                    
-                    st.write(f"Total Records: {len(df)}")
-                    
+                    # Filters are compiled into a parameterized WHERE clause and only
+                    # one page of rows is fetched, so memory stays flat for any table size.
+                    st.write(f"Total Records: {count_rows(TableFilter(table_name))}")
+
                     # Filtering UI
+                    flt = TableFilter(table_name)
                     with st.expander("Filter Data"):
-                        columns = df.columns.tolist()
+                        columns = table_columns(table_name)
                         selected_column = st.selectbox("Select Column to Filter By", ["None"] + columns)
-                        
+
                         if selected_column != "None":
-                            unique_vals = df[selected_column].unique()
-                            # Decide on filter type based on dtype
-                            if len(unique_vals) < 50:
-                                selected_vals = st.multiselect(f"Select values for {selected_column}", unique_vals)
+                            stats = get_column_stats(table_name, selected_column)
+                            distinct = f"{stats.distinct_count}+" if stats.distinct_capped else stats.distinct_count
+                            st.caption(
+                                f"Distinct: {distinct} | Nulls: {stats.null_count} | "
+                                f"Min: {stats.min_value} | Max: {stats.max_value}"
+                            )
+                            # Decide on filter type based on cardinality
+                            if stats.low_cardinality:
+                                selected_vals = st.multiselect(f"Select values for {selected_column}", list(stats.distinct_values))
                                 if selected_vals:
-                                    df = df[df[selected_column].isin(selected_vals)]
+                                    flt = TableFilter(table_name, selected_column, values=tuple(selected_vals))
                             else:
                                 # Text search or range?
                                 filter_val = st.text_input(f"Search in {selected_column}")
                                 if filter_val:
-                                    df = df[df[selected_column].astype(str).str.contains(filter_val, case=False)]
-                                    
-                    st.dataframe(df, use_container_width=True)
-                    
+                                    flt = TableFilter(table_name, selected_column, search=filter_val)
+
+                    matching = count_rows(flt)
+                    page_size = st.selectbox("Rows per page", PAGE_SIZES)
+                    page_count = max(1, -(-matching // page_size))
+                    page = int(st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1))
+
+                    # Remember where each page ends so the next one is a keyset seek
+                    anchors = st.session_state.setdefault("explorer_page_anchors", {})
+                    key = (flt, page_size)
+                    anchor = anchors.get(key, {}).get(page)
+                    if page == 1:
+                        df = fetch_page(flt, page_size)
+                    elif anchor is not None:
+                        df = fetch_page(flt, page_size, after_rowid=anchor)
+                    else:
+                        df = fetch_page(flt, page_size, offset=(page - 1) * page_size)
+                    if not df.empty:
+                        anchors.setdefault(key, {})[page + 1] = int(df[ROWID_COLUMN].iloc[-1])
+
+                    st.write(f"Matching Records: {matching}")
+                    st.dataframe(df.drop(columns=[ROWID_COLUMN]), use_container_width=True)
+                    render_download(flt)
+
                 except Exception as e:
-                    st.error(f"Failed to load table {table_name}: {e}")
\ No newline at end of file
+                    st.error(f"Failed to load table {table_name}: {e}")
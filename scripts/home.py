@@ -10,8 +10,6 @@ import streamlit as st
 
 from scripts.commonmethod import  run_query 
 
-# Page Config
-st.set_page_config(page_title="BankSight Dashboard", layout="wide")
 
 
 # Function to generate custom_id for new entries
@@ -22,7 +20,7 @@ class HomePage:
         st.write("### Database Row Counts")
         for table in ["customers", "branches", "accounts", "transactions"]:
             try:
-                count = run_query(f"SELECT COUNT(*) FROM {table}").iloc[0, 0]
+                count = run_query(f"SELECT COUNT(*) FROM {table}", cache=True).iloc[0, 0]
             except Exception:
                 count = 0
             st.metric(label=table.capitalize(), value=count)
@@ -0,0 +1,250 @@
+"""Managed secondary-index catalog and query-plan check for BankSight.db.
+
+The catalog lists every index the app relies on. ``apply_indexes`` creates the
+missing ones (and drops retired ``idx_`` indexes), and ``check_query_plans``
+runs EXPLAIN QUERY PLAN over the registered hot queries, reporting any that
+fall back to a full table scan. The Insights questions are registered straight
+from :mod:`scripts.insights_registry`, so the check follows their current SQL.
+
+Usage:
+    python -m scripts.indexes migrate   # bring an existing DB up to the catalog
+    python -m scripts.indexes check     # exit 1 if a registered query full-scans
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sqlite3
+import sys
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from scripts.insights_registry import categories, insights_for
+
+__all__ = [
+    "IndexSpec",
+    "PlannedQuery",
+    "INDEX_CATALOG",
+    "INSIGHT_SCANS",
+    "REGISTERED_QUERIES",
+    "apply_indexes",
+    "check_query_plans",
+]
+
+MANAGED_PREFIX = "idx_"
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """One managed index. ``columns`` may carry collations, e.g. ``name COLLATE NOCASE``."""
+
+    name: str
+    table: str
+    columns: Tuple[str, ...]
+    unique: bool = False
+
+    def create_sql(self) -> str:
+        unique = "UNIQUE " if self.unique else ""
+        return f"CREATE {unique}INDEX IF NOT EXISTS {self.name} ON {self.table} ({', '.join(self.columns)})"
+
+
+@dataclass(frozen=True)
+class PlannedQuery:
+    """A hot query whose plan must stay index-driven; ``params`` are sample values.
+
+    ``allow_scans`` names tables (as the plan shows them, i.e. by alias) that
+    the query is meant to read in full.
+    """
+
+    name: str
+    sql: str
+    params: Tuple = ()
+    allow_scans: Tuple[str, ...] = ()
+
+
+INDEX_CATALOG: Tuple[IndexSpec, ...] = (
+    # Case-insensitive name prefix search (customer_picker); exact name
+    # lookups use the UNIQUE(name, phnumber) index
+    IndexSpec("idx_customers_name_nocase", "customers", ("name COLLATE NOCASE",)),
+    # Per-customer lookups; balance included so balance reads are index-only
+    IndexSpec("idx_accounts_customer", "accounts", ("customer_id", "account_balance")),
+    IndexSpec("idx_transactions_customer", "transactions", ("customer_id", "status")),
+    # Account statements: keyset pages in (txn_time, txn_id) order
+    IndexSpec("idx_transactions_account_time", "transactions", ("account_id", "txn_time", "txn_id")),
+    IndexSpec("idx_loans_customer", "loans", ("customer_id",)),
+    IndexSpec("idx_creditcards_customer", "creditcards", ("customer_id",)),
+    IndexSpec("idx_supporttickets_customer", "supporttickets", ("customer_id",)),
+    # Covering indexes for the Insights GROUP BYs
+    IndexSpec("idx_transactions_type", "transactions", ("txn_type", "amount")),
+    IndexSpec("idx_transactions_status_type", "transactions", ("status", "txn_type")),
+    IndexSpec("idx_loans_type", "loans", ("loan_type", "loan_amount", "interest_rate")),
+    IndexSpec("idx_loans_status_customer", "loans", ("loan_status", "customer_id")),
+    IndexSpec("idx_loans_branch", "loans", ("branch_name", "loan_amount")),
+    IndexSpec("idx_supporttickets_category", "supporttickets", ("issue_category", "date_opened", "date_closed")),
+    IndexSpec(
+        "idx_supporttickets_priority",
+        "supporttickets",
+        ("priority", "status", "customer_rating", "support_agent"),
+    ),
+)
+
+
+# Full scans the Insights questions are built on: the summary tables and the
+# stress run log hold one row per group / run, and the customer-wide
+# aggregates read every customer or account. Any other scan fails the check.
+INSIGHT_SCANS: Dict[str, Tuple[str, ...]] = {
+    "Q1": ("summary_city_balance",),
+    "Q2": ("cs",),
+    "Q4": ("c",),
+    "Q5": ("summary_txn_type",),
+    "Q6": ("summary_txn_type",),
+    "Q7": ("summary_txn_type",),
+    "Q8": ("ac",),
+    "Q9": ("summary_loan_type",),
+    "Q12": ("s",),
+    "Q13": ("customers",),
+    "Q14": ("summary_ticket_category",),
+    "Q16": ("stress_runs",),
+    "Q17": ("stress_runs",),
+    "Q18": ("stress_runs",),
+}
+
+REGISTERED_QUERIES: Tuple[PlannedQuery, ...] = (
+    # crud_handlers lookups
+    PlannedQuery("customer_id_by_name", "SELECT customer_id FROM customers WHERE name = ?", ("x",)),
+    PlannedQuery(
+        "customer_search_prefix",
+        "SELECT customer_id, name, city FROM customers "
+        "WHERE name LIKE ? ESCAPE '\\' ORDER BY name COLLATE NOCASE LIMIT ?",
+        ("Al%", 20),
+    ),
+    PlannedQuery("accounts_by_customer", "SELECT account_id FROM accounts WHERE customer_id = ?", ("C0001",)),
+    PlannedQuery("balance_by_customer", "SELECT account_balance FROM accounts WHERE customer_id = ?", ("C0001",)),
+    PlannedQuery(
+        "open_txns_by_customer",
+        "SELECT txn_id FROM transactions WHERE customer_id = ? and status in('Pending', 'Failed')",
+        ("C0001",),
+    ),
+    PlannedQuery(
+        "statement_page",
+        "SELECT txn_id, txn_time, amount FROM transactions "
+        "WHERE account_id = ? AND txn_time >= ? AND txn_time < ? AND (txn_time, txn_id) > (?, ?) "
+        "ORDER BY txn_time, txn_id LIMIT ?",
+        (1, "2025-01-01", "2025-02-01", "2025-01-15", "T00001", 51),
+    ),
+    PlannedQuery("loans_by_customer", "SELECT loan_id, loan_amount FROM loans WHERE customer_id = ?", ("C0001",)),
+    PlannedQuery(
+        "cards_by_customer",
+        "SELECT card_id, card_number FROM creditcards WHERE customer_id = ?",
+        ("C0001",),
+    ),
+    PlannedQuery(
+        "tickets_by_customer",
+        "SELECT Ticket_ID, Issue_Category, Status FROM SupportTickets WHERE Customer_ID = ?",
+        ("C0001",),
+    ),
+    PlannedQuery(
+        "customer_context",
+        "SELECT c.customer_id, "
+        "(SELECT json_group_array(account_id) FROM accounts WHERE customer_id = c.customer_id), "
+        "(SELECT json_group_array(loan_id) FROM loans WHERE customer_id = c.customer_id), "
+        "(SELECT json_group_array(card_id) FROM creditcards WHERE customer_id = c.customer_id), "
+        "(SELECT json_group_array(ticket_id) FROM supporttickets WHERE customer_id = c.customer_id) "
+        "FROM customers c WHERE c.customer_id = ?",
+        ("C0001",),
+    ),
+) + tuple(
+    # Insights questions, as the Insights page runs them
+    PlannedQuery(query.id.lower(), query.sql, query.params, INSIGHT_SCANS.get(query.id, ()))
+    for category in categories()
+    for query in insights_for(category)
+)
+
+# "SCAN t" / "SCAN t AS x" with no index = full table scan
+_FULL_SCAN_RE = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+
+def apply_indexes(conn: sqlite3.Connection, drop_retired: bool = True) -> List[str]:
+    """Create catalog indexes that are missing; optionally drop retired managed ones.
+
+    Returns:
+        Names of the indexes created or dropped.
+    """
+    existing = {
+        row[0]
+        for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE ?", (MANAGED_PREFIX + "%",)
+        )
+    }
+    wanted = {spec.name for spec in INDEX_CATALOG}
+    changed = []
+    for spec in INDEX_CATALOG:
+        if spec.name not in existing:
+            conn.execute(spec.create_sql())
+            changed.append(spec.name)
+    if drop_retired:
+        for name in sorted(existing - wanted):
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+            changed.append(name)
+    if changed:
+        conn.execute("ANALYZE")
+    conn.commit()
+    return changed
+
+
+def check_query_plans(
+    conn: sqlite3.Connection,
+    queries: Sequence[PlannedQuery] = REGISTERED_QUERIES,
+) -> List[Tuple[str, str]]:
+    """Return ``(query name, plan detail)`` for every registered query that full-scans.
+
+    A query that cannot be planned (e.g. its summary table is not built yet)
+    is reported with the SQLite error as the detail.
+    """
+    failures = []
+    for query in queries:
+        try:
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {query.sql}", query.params).fetchall()
+        except sqlite3.OperationalError as e:
+            failures.append((query.name, f"cannot plan: {e}"))
+            continue
+        for row in plan:
+            detail = row[3]
+            match = _FULL_SCAN_RE.match(detail)
+            if match and match.group(1) not in query.allow_scans:
+                failures.append((query.name, detail))
+    return failures
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from scripts.commonmethod import DB_PATH
+
+    parser = argparse.ArgumentParser(description="Manage BankSight secondary indexes.")
+    parser.add_argument("command", choices=["migrate", "check", "list"])
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == "list":
+            for spec in INDEX_CATALOG:
+                print(spec.create_sql())
+            return 0
+        if args.command == "migrate":
+            changed = apply_indexes(conn)
+            print(f"Indexes changed: {', '.join(changed)}" if changed else "Indexes already up to date.")
+            return 0
+        failures = check_query_plans(conn)
+        for name, detail in failures:
+            print(f"{name}: {detail}" if detail.startswith("cannot plan") else f"FULL SCAN in {name}: {detail}")
+        if failures:
+            return 1
+        print(f"All {len(REGISTERED_QUERIES)} registered queries use an index.")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,415 @@
+"""Registry of Insights questions and the shared executor that runs them.
+
+Each question is plain data (id, category, SQL, params, cache policy). New
+questions are added with ``register_insight`` and show up on the Insights page
+without any rendering changes. ``InsightExecutor`` runs a question with timing
+and result caching, and can warm the cache for the rest of a category on a
+background thread so switching questions is instant.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from scripts.commonmethod import run_query
+
+__all__ = [
+    "InsightQuery",
+    "InsightResult",
+    "InsightExecutor",
+    "register_insight",
+    "get_insight",
+    "categories",
+    "insights_for",
+    "get_executor",
+]
+
+
+@dataclass(frozen=True)
+class InsightQuery:
+    """One Insights question.
+
+    Attributes:
+        id: Short identifier shown before the question, e.g. ``Q1``.
+        category: Category heading the question is listed under.
+        question: Question text shown to the user.
+        sql: Query answering the question.
+        params: Bound parameters for ``sql``.
+        cache: Whether results go through the run_query result cache
+            (and may be prefetched).
+        ttl: Cache TTL in seconds; None uses the cache default.
+    """
+
+    id: str
+    category: str
+    question: str
+    sql: str
+    params: Tuple = ()
+    cache: bool = True
+    ttl: Optional[float] = None
+
+    @property
+    def label(self) -> str:
+        return f"{self.id}: {self.question}"
+
+
+@dataclass(frozen=True)
+class InsightResult:
+    """Outcome of running an InsightQuery; ``error`` is set instead of ``frame`` on failure."""
+
+    query: InsightQuery
+    frame: Optional[pd.DataFrame]
+    elapsed: float
+    error: Optional[str] = None
+
+
+_registry: Dict[str, InsightQuery] = {}
+
+
+def register_insight(query: InsightQuery) -> InsightQuery:
+    """Add ``query`` to the registry; categories and questions keep registration order.
+
+    Raises:
+        ValueError: If a question with the same id is already registered.
+    """
+    if query.id in _registry:
+        raise ValueError(f"Insight {query.id!r} is already registered")
+    _registry[query.id] = query
+    return query
+
+
+def get_insight(insight_id: str) -> InsightQuery:
+    return _registry[insight_id]
+
+
+def categories() -> List[str]:
+    return list(dict.fromkeys(q.category for q in _registry.values()))
+
+
+def insights_for(category: str) -> List[InsightQuery]:
+    return [q for q in _registry.values() if q.category == category]
+
+
+class InsightExecutor:
+    """Runs InsightQuery objects with timing, caching and background prefetch."""
+
+    def __init__(self, prefetch_workers: int = 2):
+        self._pool = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix="insights-prefetch")
+        self._lock = threading.Lock()
+        self._inflight: set = set()
+        self._timings: Dict[str, float] = {}
+
+    def run(self, query: InsightQuery) -> InsightResult:
+        """Run ``query`` on the calling thread; errors are returned, not raised."""
+        start = time.perf_counter()
+        try:
+            frame = run_query(query.sql, query.params or None, cache=query.cache, ttl=query.ttl)
+        except Exception as e:
+            return InsightResult(query, None, time.perf_counter() - start, str(e))
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._timings[query.id] = elapsed
+        return InsightResult(query, frame, elapsed)
+
+    def prefetch(self, queries: Sequence[InsightQuery]) -> None:
+        """Warm the result cache for cacheable ``queries`` on a background thread."""
+        for query in queries:
+            if not query.cache:
+                continue
+            with self._lock:
+                if query.id in self._inflight:
+                    continue
+                self._inflight.add(query.id)
+            self._pool.submit(self._prefetch_one, query)
+
+    def _prefetch_one(self, query: InsightQuery) -> None:
+        try:
+            self.run(query)
+        finally:
+            with self._lock:
+                self._inflight.discard(query.id)
+
+    def timings(self) -> Dict[str, float]:
+        """Return the last wall time in seconds of each question run so far."""
+        with self._lock:
+            return dict(self._timings)
+
+
+_executor: Optional[InsightExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> InsightExecutor:
+    """Return the process-wide executor shared by all Streamlit sessions."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = InsightExecutor()
+        return _executor
+
+
+CUSTOMER = "CUSTOMER & ACCOUNT ANALYSIS"
+TRANSACTION = "TRANSACTION BEHAVIOR"
+LOAN = "LOAN INSIGHTS"
+BRANCH = "BRANCH & PERFORMANCE"
+SUPPORT = "SUPPORT TICKETS & CUSTOMER EXPERIENCE"
+STRESS = "PORTFOLIO STRESS TESTS"
+
+# Latest run of every scenario (scripts.stress_test)
+_LATEST_STRESS_RUNS = "SELECT MAX(run_id) FROM stress_runs GROUP BY scenario"
+
+for _query in (
+    InsightQuery(
+        "Q1",
+        CUSTOMER,
+        "How many customers exist per city, and what is their average account balance?",
+        """
+        SELECT NULLIF(group_key, '') AS city, CAST(account_count AS INTEGER) AS customer_count,
+               balance_sum / account_count AS avg_balance
+        FROM summary_city_balance
+        WHERE account_count > 0
+        ORDER BY customer_count DESC;
+        """,
+    ),
+    InsightQuery(
+        "Q2",
+        CUSTOMER,
+        "Which account type (Savings, Current, Loan, etc.) holds the highest total balance?",
+        """
+        SELECT cs.account_type, SUM(a.account_balance) AS total_balance
+        FROM accounts a
+        JOIN Customers cs ON cs.customer_id = a.customer_id
+        GROUP BY cs.account_type
+        ORDER BY total_balance DESC;
+        """,
+    ),
+    InsightQuery(
+        "Q3",
+        CUSTOMER,
+        "Who are the top 10 customers by total account balance across all account types?",
+        """
+        SELECT c.customer_id, c.name, SUM(a.account_balance) AS total_balance
+        FROM customers c
+        JOIN accounts a ON c.customer_id = a.customer_id
+        GROUP BY c.customer_id, c.name
+        ORDER BY total_balance DESC
+        LIMIT 10;
+        """,
+    ),
+    InsightQuery(
+        "Q4",
+        CUSTOMER,
+        "Which customers opened accounts in 2023 with a balance above ₹1,00,000?",
+        """
+        SELECT c.customer_id, c.name, a.account_id, a.account_balance, c.join_date
+        FROM customers c
+        JOIN accounts a ON c.customer_id = a.customer_id
+        WHERE strftime('%Y', c.join_date) = ? AND a.account_balance > ?
+        ORDER BY a.account_balance DESC;
+        """,
+        params=("2023", 100000),
+    ),
+    InsightQuery(
+        "Q5",
+        TRANSACTION,
+        "What is the total transaction volume (sum of amounts) by transaction type?",
+        """
+        SELECT group_key AS txn_type, volume AS total_volume
+        FROM summary_txn_type
+        WHERE txn_count > 0
+        ORDER BY total_volume DESC;
+        """,
+    ),
+    InsightQuery(
+        "Q6",
+        TRANSACTION,
+        "How many failed transactions occurred for each transaction type?",
+        """
+        SELECT group_key AS txn_type, CAST(failed_count AS INTEGER) AS failed_count
+        FROM summary_txn_type
+        WHERE failed_count > 0
+        ORDER BY failed_count DESC;
+        """,
+    ),
+    InsightQuery(
+        "Q7",
+        TRANSACTION,
+        "What is the total number of transactions per transaction type?",
+        """
+        SELECT group_key AS txn_type, CAST(txn_count AS INTEGER) AS total_count
+        FROM summary_txn_type
+        WHERE txn_count > 0
+        ORDER BY total_count DESC;
+        """,
+    ),
+    InsightQuery(
+        "Q8",
+        TRANSACTION,
+        "Which accounts have 5 or more high-value transactions above ₹20,000?",
+        """
+        SELECT ac.account_id as account_number, COUNT(*) AS high_value_txn_count
+        FROM transactions ts
+        JOIN accounts ac ON ac.customer_id = ts.customer_id
+        WHERE amount > ?
+        GROUP BY ac.account_id
+        HAVING high_value_txn_count >= ?
+        ORDER BY high_value_txn_count DESC;
+        """,
+        params=(20000, 5),
+    ),
+    InsightQuery(
+        "Q9",
+        LOAN,
+        "What is the average loan amount and interest rate by loan type (Personal, Auto, Home, etc.)?",
+        """
+        SELECT NULLIF(group_key, '') AS loan_type,
+               amount_sum / NULLIF(amount_count, 0) AS avg_loan_amount,
+               rate_sum / NULLIF(rate_count, 0) AS avg_interest_rate
+        FROM summary_loan_type
+        WHERE loan_count > 0
+        ORDER BY avg_loan_amount DESC;
+        """,
+    ),
+    InsightQuery(
+        "Q10",
+        LOAN,
+        "Which customers currently hold more than one active or approved loan?",
+        """
+        SELECT c.customer_id, c.name, COUNT(l.loan_id) AS active_loan_count
+        FROM customers c
+        JOIN loans l ON c.customer_id = l.customer_id
+        WHERE l.loan_status IN ('Active', 'Approved')
+        GROUP BY c.customer_id, c.name
+        HAVING COUNT(l.loan_id) > 1
+        ORDER BY active_loan_count DESC;
+        """,
+    ),
+    InsightQuery(
+        "Q11",
+        LOAN,
+        "Who are the top 5 customers with the highest outstanding (non-closed) loan amounts?",
+        # Outstanding principal from the amortization schedule (scripts.amortization)
+        """
+        SELECT
+            c.customer_id,
+            c.name,
+            SUM(a.outstanding_principal) AS total_outstanding,
+            SUM(a.emi) AS total_emi,
+            MAX(a.as_of) AS as_of
+        FROM customers c
+        JOIN loans l ON c.customer_id = l.customer_id
+        JOIN loan_amortization a ON a.loan_id = l.loan_id
+        WHERE l.loan_status <> 'Closed'
+        GROUP BY c.customer_id, c.name
+        ORDER BY total_outstanding DESC
+        LIMIT 5;
+        """,
+    ),
+    InsightQuery(
+        "Q12",
+        BRANCH,
+        "What is the average loan amount per branch?",
+        """
+        SELECT b.branch_name, s.amount_sum / NULLIF(s.amount_count, 0) AS avg_loan_amount
+        FROM summary_branch_loans s
+        JOIN branches b ON b.branch_name = s.group_key
+        WHERE s.loan_count > 0
+        ORDER BY avg_loan_amount DESC;
+        """,
+    ),
+    InsightQuery(
+        "Q13",
+        BRANCH,
+        "How many customers exist in each age group (e.g., 18–25, 26–35, etc.)?",
+        """
+        SELECT
+            CASE
+                WHEN age BETWEEN 18 AND 25 THEN '18-25'
+                WHEN age BETWEEN 26 AND 35 THEN '26-35'
+                WHEN age BETWEEN 36 AND 45 THEN '36-45'
+                WHEN age BETWEEN 46 AND 55 THEN '46-55'
+                WHEN age BETWEEN 56 AND 65 THEN '56-65'
+                ELSE '66+'
+            END AS age_group,
+            COUNT(*) AS customer_count
+        FROM customers
+        GROUP BY age_group
+        ORDER BY age_group;
+        """,
+    ),
+    InsightQuery(
+        "Q14",
+        SUPPORT,
+        "Which issue categories have the longest average resolution time?",
+        """
+        SELECT NULLIF(group_key, '') AS issue_category,
+               resolution_sum / NULLIF(resolution_count, 0) AS avg_resolution_time
+        FROM summary_ticket_category
+        WHERE ticket_count > 0
+        ORDER BY avg_resolution_time DESC;
+        """,
+    ),
+    InsightQuery(
+        "Q15",
+        SUPPORT,
+        "Which support agents have resolved the most critical tickets with high customer ratings (≥4)?",
+        """
+        SELECT support_agent, COUNT(*) AS high_rating_tickets
+        FROM supporttickets
+        WHERE priority = 'High' AND customer_rating >= 4 AND status = 'Closed'
+        GROUP BY support_agent
+        HAVING COUNT(*) > 1
+        ORDER BY high_rating_tickets DESC;
+        """,
+    ),
+    # Written by another process while a run is under way, so never cached
+    InsightQuery(
+        "Q16",
+        STRESS,
+        "What loss distribution does the latest stress test of each scenario give?",
+        f"""
+        SELECT scenario, paths_done || ' / ' || paths AS paths, loans, exposure, expected_loss,
+               var_95, var_99, es_99, max_loss, COALESCE(finished_at, 'running') AS finished_at
+        FROM stress_runs
+        WHERE run_id IN ({_LATEST_STRESS_RUNS})
+        ORDER BY es_99 DESC;
+        """,
+        cache=False,
+    ),
+    InsightQuery(
+        "Q17",
+        STRESS,
+        "How are simulated losses distributed in each scenario's latest stress test?",
+        f"""
+        SELECT r.scenario, h.loss_from, h.loss_to, h.paths,
+               ROUND(100.0 * h.paths / NULLIF(r.paths_done, 0), 2) AS pct_paths
+        FROM stress_loss_histogram h
+        JOIN stress_runs r ON r.run_id = h.run_id
+        WHERE h.run_id IN ({_LATEST_STRESS_RUNS})
+        ORDER BY r.scenario, h.bucket;
+        """,
+        cache=False,
+    ),
+    InsightQuery(
+        "Q18",
+        STRESS,
+        "Which loan types and branches carry the most expected loss under stress?",
+        f"""
+        SELECT r.scenario, s.loan_type, NULLIF(s.branch_name, '') AS branch_name, s.loans, s.exposure,
+               s.expected_loss, ROUND(100.0 * s.expected_loss / NULLIF(s.exposure, 0), 2) AS loss_rate_pct
+        FROM stress_segments s
+        JOIN stress_runs r ON r.run_id = s.run_id
+        WHERE s.run_id IN ({_LATEST_STRESS_RUNS})
+        ORDER BY s.expected_loss DESC
+        LIMIT 20;
+        """,
+        cache=False,
+    ),
+):
+    register_insight(_query)
@@ -0,0 +1,265 @@
+"""Materialized aggregate tables behind the Insights page.
+
+Each ``summary_*`` table holds running sums/counts for one GROUP BY the Insights
+questions used to run over the base tables. Triggers on the base tables keep
+them current on every INSERT/UPDATE/DELETE (CRUD handlers, ETL, ad-hoc SQL), so
+an insight reads a handful of summary rows no matter how large the base tables
+grow. ``rebuild_summaries`` recomputes everything from scratch.
+
+Usage:
+    python -m scripts.insights_summary            # create (if missing) and rebuild
+"""
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import sys
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+__all__ = [
+    "SUMMARIES",
+    "SUMMARY_DEPENDENCIES",
+    "ensure_summaries",
+    "rebuild_summaries",
+    "drop_summary_triggers",
+]
+
+
+@dataclass(frozen=True)
+class _Summary:
+    """One summary table fed from ``source``.
+
+    ``key`` and each measure are SQL expressions over a row alias written as
+    ``{r}`` (NEW/OLD in triggers). A NULL key means the row does not
+    contribute (e.g. an account whose customer does not exist).
+    """
+
+    table: str
+    source: str
+    key: str
+    measures: Tuple[Tuple[str, str], ...]
+    watch: Tuple[str, ...]
+    rebuild_select: str
+
+    def create_sql(self) -> str:
+        cols = ", ".join(f"{name} REAL NOT NULL DEFAULT 0" for name, _ in self.measures)
+        return f"CREATE TABLE IF NOT EXISTS {self.table} (group_key TEXT PRIMARY KEY NOT NULL, {cols})"
+
+    def add_sql(self, r: str) -> str:
+        names = [name for name, _ in self.measures]
+        exprs = [expr.format(r=r) for _, expr in self.measures]
+        updates = ", ".join(f"{n} = {n} + excluded.{n}" for n in names)
+        return (
+            f"INSERT INTO {self.table} (group_key, {', '.join(names)}) "
+            f"SELECT k, {', '.join(names)} FROM (SELECT {self.key.format(r=r)} AS k, "
+            f"{', '.join(f'{e} AS {n}' for e, n in zip(exprs, names))}) WHERE k IS NOT NULL "
+            f"ON CONFLICT(group_key) DO UPDATE SET {updates};"
+        )
+
+    def subtract_sql(self, r: str) -> str:
+        sets = ", ".join(f"{n} = {n} - ({e.format(r=r)})" for n, e in self.measures)
+        return f"UPDATE {self.table} SET {sets} WHERE group_key = {self.key.format(r=r)};"
+
+    def triggers(self) -> List[Tuple[str, str]]:
+        """Return ``(trigger name, trigger body)`` pairs maintaining this summary."""
+        prefix = f"trg_{self.table}"
+        watch = ", ".join(self.watch)
+        return [
+            (f"{prefix}_ins", f"AFTER INSERT ON {self.source} BEGIN {self.add_sql('NEW')} END"),
+            (f"{prefix}_del", f"AFTER DELETE ON {self.source} BEGIN {self.subtract_sql('OLD')} END"),
+            (
+                f"{prefix}_upd",
+                f"AFTER UPDATE OF {watch} ON {self.source} "
+                f"BEGIN {self.subtract_sql('OLD')} {self.add_sql('NEW')} END",
+            ),
+        ]
+
+
+SUMMARIES: Tuple[_Summary, ...] = (
+    # Q1: accounts and balances per customer city
+    _Summary(
+        table="summary_city_balance",
+        source="accounts",
+        key="(SELECT IFNULL(city, '') FROM customers WHERE customer_id = {r}.customer_id)",
+        measures=(("account_count", "1"), ("balance_sum", "{r}.account_balance")),
+        watch=("customer_id", "account_balance"),
+        rebuild_select=(
+            "SELECT IFNULL(c.city, ''), COUNT(*), SUM(a.account_balance) "
+            "FROM customers c JOIN accounts a ON c.customer_id = a.customer_id GROUP BY 1"
+        ),
+    ),
+    # Q5-Q7: volume, count and failures per transaction type
+    _Summary(
+        table="summary_txn_type",
+        source="transactions",
+        key="{r}.txn_type",
+        measures=(
+            ("txn_count", "1"),
+            ("volume", "IFNULL({r}.amount, 0)"),
+            ("failed_count", "CASE WHEN {r}.status = 'Failed' THEN 1 ELSE 0 END"),
+        ),
+        watch=("txn_type", "amount", "status"),
+        rebuild_select=(
+            "SELECT txn_type, COUNT(*), TOTAL(amount), SUM(status = 'Failed') "
+            "FROM transactions WHERE txn_type IS NOT NULL GROUP BY txn_type"
+        ),
+    ),
+    # Q9: loan amount / interest rate averages per loan type
+    _Summary(
+        table="summary_loan_type",
+        source="loans",
+        key="IFNULL({r}.loan_type, '')",
+        measures=(
+            ("loan_count", "1"),
+            ("amount_sum", "IFNULL({r}.loan_amount, 0)"),
+            ("amount_count", "({r}.loan_amount IS NOT NULL)"),
+            ("rate_sum", "IFNULL({r}.interest_rate, 0)"),
+            ("rate_count", "({r}.interest_rate IS NOT NULL)"),
+        ),
+        watch=("loan_type", "loan_amount", "interest_rate"),
+        rebuild_select=(
+            "SELECT IFNULL(loan_type, ''), COUNT(*), TOTAL(loan_amount), COUNT(loan_amount), "
+            "TOTAL(interest_rate), COUNT(interest_rate) FROM loans GROUP BY 1"
+        ),
+    ),
+    # Q12: loan amount average per branch
+    _Summary(
+        table="summary_branch_loans",
+        source="loans",
+        key="{r}.branch_name",
+        measures=(
+            ("loan_count", "1"),
+            ("amount_sum", "IFNULL({r}.loan_amount, 0)"),
+            ("amount_count", "({r}.loan_amount IS NOT NULL)"),
+        ),
+        watch=("branch_name", "loan_amount"),
+        rebuild_select=(
+            "SELECT branch_name, COUNT(*), TOTAL(loan_amount), COUNT(loan_amount) "
+            "FROM loans WHERE branch_name IS NOT NULL GROUP BY branch_name"
+        ),
+    ),
+    # Q14: resolution time per ticket category
+    _Summary(
+        table="summary_ticket_category",
+        source="supporttickets",
+        key="IFNULL({r}.issue_category, '')",
+        measures=(
+            ("ticket_count", "1"),
+            ("resolution_sum", "IFNULL(julianday({r}.date_closed) - julianday({r}.date_opened), 0)"),
+            ("resolution_count", "(julianday({r}.date_closed) - julianday({r}.date_opened) IS NOT NULL)"),
+        ),
+        watch=("issue_category", "date_opened", "date_closed"),
+        rebuild_select=(
+            "SELECT IFNULL(issue_category, ''), COUNT(*), "
+            "TOTAL(julianday(date_closed) - julianday(date_opened)), "
+            "COUNT(julianday(date_closed) - julianday(date_opened)) FROM supporttickets GROUP BY 1"
+        ),
+    ),
+)
+
+# A customer's city moving (or the customer appearing/disappearing) moves all
+# of that customer's accounts between summary_city_balance groups.
+_CITY_MOVE_SQL = """
+    UPDATE summary_city_balance
+    SET account_count = account_count - (SELECT COUNT(*) FROM accounts WHERE customer_id = {r}.customer_id),
+        balance_sum = balance_sum - (SELECT TOTAL(account_balance) FROM accounts WHERE customer_id = {r}.customer_id)
+    WHERE group_key = IFNULL({r}.city, '');
+"""
+_CITY_ADD_SQL = """
+    INSERT INTO summary_city_balance (group_key, account_count, balance_sum)
+    SELECT IFNULL({r}.city, ''), COUNT(*), TOTAL(account_balance)
+    FROM accounts WHERE customer_id = {r}.customer_id HAVING COUNT(*) > 0
+    ON CONFLICT(group_key) DO UPDATE SET
+        account_count = account_count + excluded.account_count,
+        balance_sum = balance_sum + excluded.balance_sum;
+"""
+_CUSTOMER_TRIGGERS: Tuple[Tuple[str, str], ...] = (
+    (
+        "trg_summary_city_balance_cust_ins",
+        f"AFTER INSERT ON customers BEGIN {_CITY_ADD_SQL.format(r='NEW')} END",
+    ),
+    (
+        "trg_summary_city_balance_cust_del",
+        f"AFTER DELETE ON customers BEGIN {_CITY_MOVE_SQL.format(r='OLD')} END",
+    ),
+    (
+        "trg_summary_city_balance_cust_upd",
+        "AFTER UPDATE OF city, customer_id ON customers "
+        "WHEN OLD.city IS NOT NEW.city OR OLD.customer_id IS NOT NEW.customer_id "
+        f"BEGIN {_CITY_MOVE_SQL.format(r='OLD')} {_CITY_ADD_SQL.format(r='NEW')} END",
+    ),
+)
+
+# Base table -> summary tables it feeds (used for cache invalidation)
+SUMMARY_DEPENDENCIES: Dict[str, FrozenSet[str]] = {
+    "accounts": frozenset({"summary_city_balance"}),
+    "customers": frozenset({"summary_city_balance"}),
+    "transactions": frozenset({"summary_txn_type"}),
+    "loans": frozenset({"summary_loan_type", "summary_branch_loans"}),
+    "supporttickets": frozenset({"summary_ticket_category"}),
+}
+
+
+def _all_triggers() -> List[Tuple[str, str]]:
+    return [t for summary in SUMMARIES for t in summary.triggers()] + list(_CUSTOMER_TRIGGERS)
+
+
+def rebuild_summaries(conn: sqlite3.Connection) -> None:
+    """Recompute every summary table from the base tables in one transaction."""
+    with conn:
+        for summary in SUMMARIES:
+            conn.execute(summary.create_sql())
+            conn.execute(f"DELETE FROM {summary.table}")
+            names = ", ".join(name for name, _ in summary.measures)
+            conn.execute(f"INSERT INTO {summary.table} (group_key, {names}) {summary.rebuild_select}")
+
+
+def ensure_summaries(conn: sqlite3.Connection) -> bool:
+    """Create missing summary tables/triggers; rebuild if anything was missing.
+
+    Returns:
+        True if the summaries had to be (re)built.
+    """
+    existing = {
+        row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+    }
+    wanted = [s.table for s in SUMMARIES] + [name for name, _ in _all_triggers()]
+    if all(name in existing for name in wanted):
+        return False
+    with conn:
+        for summary in SUMMARIES:
+            conn.execute(summary.create_sql())
+        for name, body in _all_triggers():
+            conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    rebuild_summaries(conn)
+    return True
+
+
+def drop_summary_triggers(conn: sqlite3.Connection) -> None:
+    """Drop the maintenance triggers (bulk loads rebuild the summaries afterwards)."""
+    with conn:
+        for name, _ in _all_triggers():
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from scripts.commonmethod import DB_PATH
+
+    parser = argparse.ArgumentParser(description="Create and rebuild the Insights summary tables.")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if not ensure_summaries(conn):
+            rebuild_summaries(conn)
+        print("Insights summary tables rebuilt.")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
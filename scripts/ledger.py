@@ -0,0 +1,281 @@
+"""Posting engine for account balance changes.
+
+Every posting is applied inside ``BEGIN IMMEDIATE`` (the write lock is taken
+before anything is read) as a single conditional UPDATE on the exact account:
+
+    UPDATE accounts SET account_balance = account_balance - :amount
+    WHERE account_id = :account AND customer_id = :customer
+      AND account_balance - :amount >= :minimum
+    RETURNING account_balance
+
+so the minimum-balance rule is checked against the balance at write time and
+concurrent sessions can no longer overwrite each other's updates. Outcomes
+come back as :class:`PostingResult` values rather than UI messages, and
+``post_batch`` applies many postings under one lock acquisition.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import datetime
+import sqlite3
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+from scripts.commonmethod import write_transaction
+from scripts.txn_ids import next_txn_ids
+
+__all__ = [
+    "MIN_BALANCE",
+    "TXN_TYPES",
+    "DEFERRED_TYPES",
+    "STATUSES",
+    "POSTED",
+    "LOGGED",
+    "INSUFFICIENT_FUNDS",
+    "UNKNOWN_ACCOUNT",
+    "INVALID",
+    "Posting",
+    "PostingResult",
+    "ensure_reference_column",
+    "post",
+    "post_batch",
+    "apply_status_change",
+]
+
+# Debits may not take an account below this balance (₹)
+MIN_BALANCE = 1000.0
+
+# Transaction types as offered in the CRUD form; loan and credit-card payments
+# are logged as Pending and settled later
+TXN_TYPES: Tuple[str, ...] = ("Deposit", "Withdrawal", "Transfer", "loan Payment", "Debit", "Credit payment")
+DEFERRED_TYPES = frozenset({"loan payment", "credit payment"})
+STATUSES: Tuple[str, ...] = ("Success", "Failed", "Pending")
+
+DEBIT_TYPES = frozenset({"withdrawal", "transfer", "debit"})
+CREDIT_TYPES = frozenset({"deposit"})
+
+# Outcomes
+POSTED = "posted"  # balance changed and transaction recorded
+LOGGED = "logged"  # transaction recorded, balance untouched (pending/failed or non-balance type)
+INSUFFICIENT_FUNDS = "insufficient_funds"
+UNKNOWN_ACCOUNT = "unknown_account"
+INVALID = "invalid"
+
+_DEBIT_SQL = (
+    "UPDATE accounts SET account_balance = account_balance - ?, last_updated = ? "
+    "WHERE account_id = ? AND customer_id = ? AND account_balance - ? >= ? "
+    "RETURNING account_balance"
+)
+_CREDIT_SQL = (
+    "UPDATE accounts SET account_balance = account_balance + ?, last_updated = ? "
+    "WHERE account_id = ? AND customer_id = ? "
+    "RETURNING account_balance"
+)
+_INSERT_SQL = (
+    "INSERT INTO transactions (txn_id, account_id, customer_id, txn_type, amount, txn_time, status, reference_id) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_DEFERRED_MESSAGE = "Loan and credit-card payments are posted as Pending and settled by settle_pending."
+
+
+def ensure_reference_column(conn: sqlite3.Connection) -> None:
+    """Add ``transactions.reference_id`` to databases created before it existed.
+
+    ``reference_id`` names the loan (``loan Payment``) or credit card
+    (``Credit payment``) a payment is for. The column is looked up on every
+    call (a cheap PRAGMA), since ``conn`` may be to a different database.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(transactions)")}
+    if "reference_id" not in columns:
+        conn.execute("ALTER TABLE transactions ADD COLUMN reference_id INTEGER")
+
+def _now() -> str:
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+@dataclass(frozen=True)
+class Posting:
+    """One transaction to apply to ``account_id``.
+
+    ``status`` other than Success records the transaction without touching
+    the balance, as do types that are neither debits nor credits. Loan and
+    credit-card payments must be Pending: they wait for settlement (see
+    :mod:`scripts.settlement`), and ``reference_id`` is the loan or card they
+    pay. Without a ``txn_id`` one is allocated from :mod:`scripts.txn_ids`.
+    """
+
+    account_id: int
+    customer_id: str
+    txn_type: str
+    amount: float
+    status: str = "Success"
+    txn_id: Optional[str] = None
+    txn_time: Optional[str] = None
+    reference_id: Optional[int] = None
+
+    @property
+    def direction(self) -> int:
+        """-1 for a debit, +1 for a credit, 0 if the balance is not affected."""
+        if self.status.lower() != "success":
+            return 0
+        kind = self.txn_type.lower()
+        return -1 if kind in DEBIT_TYPES else 1 if kind in CREDIT_TYPES else 0
+
+
+@dataclass(frozen=True)
+class PostingResult:
+    """What happened to a :class:`Posting`.
+
+    ``balance`` is the balance after posting, or the current balance when a
+    debit was refused; None if the account does not exist.
+    """
+
+    posting: Posting
+    outcome: str
+    txn_id: Optional[str] = None
+    balance: Optional[float] = None
+    message: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.outcome in (POSTED, LOGGED)
+
+
+def _current_balance(conn: sqlite3.Connection, posting: Posting) -> Optional[float]:
+    row = conn.execute(
+        "SELECT account_balance FROM accounts WHERE account_id = ? AND customer_id = ?",
+        (posting.account_id, posting.customer_id),
+    ).fetchone()
+    return None if row is None else float(row[0])
+
+
+def _apply_balance(conn: sqlite3.Connection, posting: Posting, direction: int, amount: float) -> Tuple[str, Optional[float]]:
+    """Run the conditional balance UPDATE; return (outcome, balance)."""
+    today = datetime.date.today().strftime("%Y-%m-%d")
+    if direction < 0:
+        row = conn.execute(
+            _DEBIT_SQL,
+            (amount, today, posting.account_id, posting.customer_id, amount, MIN_BALANCE),
+        ).fetchone()
+    else:
+        row = conn.execute(_CREDIT_SQL, (amount, today, posting.account_id, posting.customer_id)).fetchone()
+    if row is not None:
+        return POSTED, float(row[0])
+    # Nothing updated: tell a refused debit from a missing account
+    balance = _current_balance(conn, posting)
+    return (UNKNOWN_ACCOUNT if balance is None else INSUFFICIENT_FUNDS), balance
+
+
+def _post_one(conn: sqlite3.Connection, posting: Posting) -> PostingResult:
+    amount = float(posting.amount)
+    if amount <= 0:
+        return PostingResult(posting, INVALID, message="Amount must be positive.")
+    if posting.txn_type.lower() in DEFERRED_TYPES and posting.status.lower() != "pending":
+        return PostingResult(posting, INVALID, message=_DEFERRED_MESSAGE)
+
+    direction = posting.direction
+    if direction:
+        outcome, balance = _apply_balance(conn, posting, direction, amount)
+    else:
+        balance = _current_balance(conn, posting)
+        outcome = LOGGED if balance is not None else UNKNOWN_ACCOUNT
+    if outcome == UNKNOWN_ACCOUNT:
+        return PostingResult(posting, outcome, message=f"Account {posting.account_id} not found for this customer.")
+    if outcome == INSUFFICIENT_FUNDS:
+        return PostingResult(
+            posting,
+            outcome,
+            balance=balance,
+            message=f"Minimum balance of ₹{MIN_BALANCE:,.0f} required. Available: ₹{balance:,.2f}",
+        )
+
+    conn.execute(
+        _INSERT_SQL,
+        (
+            posting.txn_id,
+            posting.account_id,
+            posting.customer_id,
+            posting.txn_type,
+            amount,
+            posting.txn_time or _now(),
+            posting.status,
+            posting.reference_id,
+        ),
+    )
+    return PostingResult(posting, outcome, posting.txn_id, balance)
+
+
+def post_batch(postings: Iterable[Posting]) -> List[PostingResult]:
+    """Apply ``postings`` in order inside one ``BEGIN IMMEDIATE`` transaction.
+
+    Refused postings (insufficient funds, unknown account) change nothing
+    and do not stop the batch; a database error rolls back the whole batch.
+    """
+    postings = list(postings)
+    if not postings:
+        return []
+    # Ids are allocated before taking the write lock (a node lease may need a write)
+    ids = iter(next_txn_ids(sum(1 for p in postings if not p.txn_id)))
+    postings = [p if p.txn_id else dataclasses.replace(p, txn_id=next(ids)) for p in postings]
+    with write_transaction("accounts", "transactions") as conn:
+        ensure_reference_column(conn)
+        conn.execute("BEGIN IMMEDIATE")
+        return [_post_one(conn, posting) for posting in postings]
+
+
+def post(posting: Posting) -> PostingResult:
+    """Apply a single posting; see :func:`post_batch`."""
+    return post_batch([posting])[0]
+
+
+def apply_status_change(
+    txn_id: str,
+    account_id: int,
+    new_status: str,
+    amount: float,
+) -> PostingResult:
+    """Move a Pending/Failed transaction to ``new_status`` with a (possibly adjusted) amount.
+
+    Becoming Success posts the transaction's effect to ``account_id`` under
+    the same rules as :func:`post`; the transaction row is updated only if
+    that succeeds. Loan and credit-card payments only become Success through
+    :func:`scripts.settlement.settle_pending`.
+    """
+    with write_transaction("accounts", "transactions") as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT customer_id, txn_type, status FROM transactions WHERE txn_id = ?", (txn_id,)
+        ).fetchone()
+        if row is None:
+            return PostingResult(
+                Posting(account_id, "", "", amount, new_status, txn_id), INVALID, message=f"Transaction {txn_id} not found."
+            )
+        customer_id, txn_type, old_status = row
+        posting = Posting(account_id, customer_id, txn_type, amount, new_status, txn_id)
+        if float(amount) <= 0:
+            return PostingResult(posting, INVALID, txn_id, message="Amount must be positive.")
+        if str(txn_type).lower() in DEFERRED_TYPES and new_status.lower() == "success":
+            return PostingResult(posting, INVALID, txn_id, message=_DEFERRED_MESSAGE)
+
+        direction = posting.direction if str(old_status).lower() != "success" else 0
+        if direction:
+            outcome, balance = _apply_balance(conn, posting, direction, float(amount))
+        else:
+            balance = _current_balance(conn, posting)
+            outcome = LOGGED if balance is not None else UNKNOWN_ACCOUNT
+        if outcome == UNKNOWN_ACCOUNT:
+            return PostingResult(posting, outcome, txn_id, message=f"Account {account_id} not found for this customer.")
+        if outcome == INSUFFICIENT_FUNDS:
+            return PostingResult(
+                posting,
+                outcome,
+                txn_id,
+                balance,
+                message=f"Minimum balance of ₹{MIN_BALANCE:,.0f} required. Available: ₹{balance:,.2f}",
+            )
+        conn.execute(
+            "UPDATE transactions SET status = ?, amount = ?, txn_time = ?, account_id = ? WHERE txn_id = ?",
+            (new_status, float(amount), _now(), account_id, txn_id),
+        )
+        return PostingResult(posting, outcome, txn_id, balance)
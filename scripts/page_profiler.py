@@ -0,0 +1,198 @@
+"""Per-render profiling for the Streamlit pages.
+
+``profile_render`` wraps one page render and records its wall time, the
+number of statements sent to SQLite on the render's connection (counted with
+a trace callback, so direct cursor use is included) and the tracemalloc
+peak. Samples are grouped by page, or by a finer label a page sets with
+``set_profile_label`` (CRUD uses ``operation/table``). With ``capture=True``
+the render also runs under cProfile and the stats are written to
+``PROFILE_DIR`` for viewing in snakeviz, flameprof or similar.
+
+tracemalloc is process-wide: renders from concurrent sessions that overlap
+share one peak, so treat memory numbers from a busy server as upper bounds.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import os
+import re
+import sqlite3
+import statistics
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Deque, Dict, Iterator, List, Optional
+
+__all__ = [
+    "PROFILE_DIR",
+    "PageSample",
+    "PageProfiler",
+    "get_profiler",
+    "profile_render",
+    "set_profile_label",
+]
+
+PROFILE_DIR = "profiles"
+
+_current = threading.local()
+
+
+@dataclass(frozen=True)
+class PageSample:
+    """One measured render."""
+
+    key: str
+    wall: float
+    queries: int
+    peak_bytes: int
+    at: float
+    profile_path: Optional[str] = None
+    error: Optional[str] = None
+
+
+class PageProfiler:
+    """Thread-safe store of recent :class:`PageSample` s per page key.
+
+    Args:
+        history: Samples kept per key.
+    """
+
+    def __init__(self, history: int = 200) -> None:
+        self.history = history
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[PageSample]] = {}
+        self._tracing = 0
+        # Whether tracemalloc was started here (and so should be stopped here)
+        self._owns_tracemalloc = False
+
+    def add(self, sample: PageSample) -> None:
+        with self._lock:
+            self._samples.setdefault(sample.key, deque(maxlen=self.history)).append(sample)
+
+    def samples(self, key: Optional[str] = None) -> List[PageSample]:
+        """Samples for ``key`` (all keys if None), oldest first."""
+        with self._lock:
+            if key is not None:
+                return list(self._samples.get(key, ()))
+            return sorted((s for d in self._samples.values() for s in d), key=lambda s: s.at)
+
+    def summary(self) -> List[Dict[str, object]]:
+        """Per-key render count, median/p95/max wall seconds, mean queries and max peak bytes."""
+        with self._lock:
+            groups = {key: list(d) for key, d in self._samples.items()}
+        rows = []
+        for key, samples in groups.items():
+            walls = sorted(s.wall for s in samples)
+            rows.append({
+                "page": key,
+                "renders": len(samples),
+                "median_s": statistics.median(walls),
+                "p95_s": walls[min(len(walls) - 1, int(0.95 * len(walls)))],
+                "max_s": walls[-1],
+                "mean_queries": statistics.fmean(s.queries for s in samples),
+                "max_peak_bytes": max(s.peak_bytes for s in samples),
+                "last_profile": next((s.profile_path for s in reversed(samples) if s.profile_path), None),
+            })
+        return sorted(rows, key=lambda r: r["p95_s"], reverse=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+    def _start_memory(self) -> None:
+        with self._lock:
+            if self._tracing == 0:
+                self._owns_tracemalloc = not tracemalloc.is_tracing()
+                if self._owns_tracemalloc:
+                    tracemalloc.start()
+                else:
+                    tracemalloc.reset_peak()
+            self._tracing += 1
+
+    def _stop_memory(self) -> int:
+        with self._lock:
+            _, peak = tracemalloc.get_traced_memory()
+            self._tracing -= 1
+            if self._tracing == 0 and self._owns_tracemalloc:
+                tracemalloc.stop()
+            return peak
+
+
+_profiler = PageProfiler()
+
+
+def get_profiler() -> PageProfiler:
+    """Return the process-wide profiler the app records into."""
+    return _profiler
+
+
+def set_profile_label(label: str) -> None:
+    """Refine the key of the render in progress on this thread, e.g. ``"Create/loans"``."""
+    key = getattr(_current, "key", None)
+    if key is not None:
+        _current.key = f"{key.split(':', 1)[0]}:{label}"
+
+
+def _profile_path(key: str) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", key).strip("-").lower()
+    return os.path.join(PROFILE_DIR, f"{slug}-{datetime.now():%Y%m%d-%H%M%S}.prof")
+
+
+@contextmanager
+def profile_render(
+    page: str,
+    conn: Optional[sqlite3.Connection] = None,
+    capture: bool = False,
+    profiler: Optional[PageProfiler] = None,
+) -> Iterator[None]:
+    """Measure the enclosed render of ``page`` and record a sample.
+
+    Args:
+        page: Page name; the sample key unless the page calls ``set_profile_label``.
+        conn: Connection the render uses; statements on it are counted.
+        capture: Also run the render under cProfile and save the stats to disk.
+        profiler: Where to record (defaults to the process-wide profiler).
+    """
+    profiler = profiler or _profiler
+    counter = [0]
+
+    def count(statement: str) -> None:
+        # Trigger bodies are reported as "-- TRIGGER ..." and are not round trips
+        if not statement.startswith("--"):
+            counter[0] += 1
+
+    if conn is not None:
+        conn.set_trace_callback(count)
+    profiler._start_memory()
+    _current.key = page
+    cprofile = cProfile.Profile() if capture else None
+    error = None
+    start = time.perf_counter()
+    try:
+        if cprofile is not None:
+            cprofile.enable()
+        yield
+    except Exception as e:
+        # st.stop()/st.rerun() raise BaseExceptions; those are not failures
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        if cprofile is not None:
+            cprofile.disable()
+        wall = time.perf_counter() - start
+        peak = profiler._stop_memory()
+        if conn is not None:
+            conn.set_trace_callback(None)
+        key = _current.key
+        _current.key = None
+        path = None
+        if cprofile is not None:
+            path = _profile_path(key)
+            cprofile.dump_stats(path)
+        profiler.add(PageSample(key, wall, counter[0], peak, time.time(), path, error))
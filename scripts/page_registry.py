@@ -0,0 +1,67 @@
+"""Lazy registry of the app's pages.
+
+``main.py`` only needs the page names to draw the sidebar; a page's module is
+imported, and its page object built, the first time that page is selected.
+Page objects are stateless, so one instance per process is shared by every
+session and rerun.
+"""
+
+from __future__ import annotations
+
+import importlib
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+__all__ = [
+    "PageSpec",
+    "PAGES",
+    "page_names",
+    "get_page",
+]
+
+
+@dataclass(frozen=True)
+class PageSpec:
+    """Where to find a page: ``module.attr`` is a class with ``render(conn)``."""
+
+    name: str
+    module: str
+    attr: str
+    # Hidden pages are left out of the sidebar and opened with ?page=<name>
+    hidden: bool = False
+
+
+PAGES: Dict[str, PageSpec] = {
+    spec.name: spec
+    for spec in (
+        PageSpec("Home", "scripts.home", "HomePage"),
+        PageSpec("Explorer", "scripts.export", "DataExplorer"),
+        PageSpec("Insights", "scripts.Insights", "InsightsPage"),
+        PageSpec("CRUD", "scripts.crud", "CRUDOperationsPage"),
+        PageSpec("Statements", "scripts.statement_page", "StatementsPage"),
+        PageSpec("About", "scripts.about", "AboutPage"),
+        PageSpec("Performance", "scripts.performance", "PerformancePage", hidden=True),
+    )
+}
+
+_lock = threading.Lock()
+_instances: Dict[str, Any] = {}
+
+
+def page_names(include_hidden: bool = False) -> List[str]:
+    """Page names in sidebar order."""
+    return [name for name, spec in PAGES.items() if include_hidden or not spec.hidden]
+
+
+def get_page(name: str) -> Any:
+    """Return the page object for ``name``, importing its module on first use."""
+    page = _instances.get(name)
+    if page is not None:
+        return page
+    spec = PAGES[name]
+    with _lock:
+        if name not in _instances:
+            module = importlib.import_module(spec.module)
+            _instances[name] = getattr(module, spec.attr)()
+        return _instances[name]
@@ -0,0 +1,76 @@
+"""Hidden Performance page: per-page render timings, query counts and memory.
+
+Not listed in the sidebar; open it with ``?page=performance``. Add
+``?profile=1`` to any page URL to capture a cProfile of its renders.
+"""
+
+from __future__ import annotations
+
+import os
+
+import pandas as pd
+import streamlit as st
+
+from scripts.commonmethod import get_cache_stats, get_pool_stats, get_tracer
+from scripts.page_profiler import PROFILE_DIR, get_profiler
+
+
+class PerformancePage:
+    def render(self, conn) -> None:
+        st.title("⏱️ Performance")
+        st.caption(
+            "Renders measured in this server process. Append `?profile=1` to a page URL to save "
+            f"cProfile stats under `{PROFILE_DIR}/` (open with snakeviz or flameprof)."
+        )
+        profiler = get_profiler()
+
+        st.subheader("Renders by page")
+        summary = profiler.summary()
+        if not summary:
+            st.info("No renders recorded yet. Visit some pages first.")
+        else:
+            df = pd.DataFrame(summary)
+            for col in ("median_s", "p95_s", "max_s"):
+                df[col.replace("_s", "_ms")] = (df.pop(col) * 1000).round(1)
+            df["max_peak_mb"] = (df.pop("max_peak_bytes") / 2**20).round(2)
+            df["mean_queries"] = df["mean_queries"].round(1)
+            st.dataframe(df, use_container_width=True, hide_index=True)
+
+            recent = pd.DataFrame([s.__dict__ for s in profiler.samples()[-50:]][::-1])
+            recent["wall_ms"] = (recent.pop("wall") * 1000).round(1)
+            recent["peak_mb"] = (recent.pop("peak_bytes") / 2**20).round(2)
+            recent["at"] = pd.to_datetime(recent["at"], unit="s")
+            with st.expander("Recent renders"):
+                st.dataframe(recent, use_container_width=True, hide_index=True)
+
+        if st.button("Reset measurements"):
+            profiler.reset()
+            get_tracer().reset()
+            st.rerun()
+
+        st.subheader("Saved profiles")
+        files = sorted(
+            (f for f in os.listdir(PROFILE_DIR) if f.endswith(".prof")) if os.path.isdir(PROFILE_DIR) else [],
+            reverse=True,
+        )
+        if not files:
+            st.write("None yet.")
+        for name in files[:20]:
+            with open(os.path.join(PROFILE_DIR, name), "rb") as f:
+                st.download_button(name, f.read(), file_name=name, key=f"prof_{name}")
+
+        st.subheader("Statements")
+        tracer = get_tracer()
+        if not tracer.enabled:
+            st.write("Query tracing is off (set `BANKSIGHT_TRACE=1` to record run_query/execute_action).")
+        elif tracer.summary():
+            df = pd.DataFrame(tracer.summary()[:50])
+            for col in ("total", "mean", "max"):
+                df[f"{col}_ms"] = (df.pop(col) * 1000).round(2)
+            st.dataframe(df, use_container_width=True, hide_index=True)
+
+        col1, col2 = st.columns(2)
+        col1.write("Connection pool")
+        col1.json(get_pool_stats())
+        col2.write("Query cache")
+        col2.json(get_cache_stats())
@@ -0,0 +1,167 @@
+"""In-process result cache for read queries with per-table write invalidation.
+
+Entries are keyed on SQL text plus parameters, expire after a TTL, are evicted
+least-recently-used once the memory budget is exceeded, and are dropped as soon
+as a write touches any table the query reads from.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+__all__ = [
+    "QueryCache",
+    "tables_read",
+    "tables_written",
+]
+
+_READ_RE = re.compile(r"\b(?:FROM|JOIN)\s+[\"`\[]?([A-Za-z_][A-Za-z0-9_]*)", re.IGNORECASE)
+_WRITE_RE = re.compile(
+    r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)"
+    r"\s+[\"`\[]?([A-Za-z_][A-Za-z0-9_]*)",
+    re.IGNORECASE,
+)
+
+
+def tables_read(sql: str) -> FrozenSet[str]:
+    """Return the (lower-cased) table names a SELECT reads from."""
+    return frozenset(name.lower() for name in _READ_RE.findall(sql))
+
+
+def tables_written(sql: str) -> Optional[FrozenSet[str]]:
+    """Return the table a DML statement writes to, or None if it can't be told."""
+    match = _WRITE_RE.match(sql)
+    if match is None:
+        return None
+    return frozenset({match.group(1).lower()})
+
+
+@dataclass
+class _Entry:
+    frame: pd.DataFrame
+    tables: FrozenSet[str]
+    expires_at: float
+    nbytes: int
+
+
+class QueryCache:
+    """Thread-safe LRU cache of query results bounded by TTL and memory.
+
+    Args:
+        max_bytes: Memory budget for cached DataFrames (deep memory usage).
+        default_ttl: Seconds an entry stays valid when no TTL is given.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, default_ttl: float = 300.0) -> None:
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+        # Bumped on every invalidation so a read that raced a write is not stored
+        self._versions: Dict[str, int] = {}
+        self._global_version = 0
+        self._listeners: List[Callable[[Optional[FrozenSet[str]]], None]] = []
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def add_listener(self, callback: Callable[[Optional[FrozenSet[str]]], None]) -> None:
+        """Call ``callback(tables)`` after every invalidation (None means all tables)."""
+        self._listeners.append(callback)
+
+    @staticmethod
+    def make_key(query: str, params: Any) -> Optional[Hashable]:
+        """Build a cache key from SQL text and params; None if params are unhashable."""
+        key = (query, tuple(params) if params is not None else ())
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.nbytes
+
+    def get(self, key: Hashable) -> Optional[pd.DataFrame]:
+        """Return a copy of the cached result, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.frame.copy()
+
+    def snapshot(self, tables: Iterable[str]) -> Tuple[int, Tuple[int, ...]]:
+        """Capture table versions before running a query (see :meth:`put`)."""
+        with self._lock:
+            return self._global_version, tuple(self._versions.get(t, 0) for t in sorted(tables))
+
+    def put(
+        self,
+        key: Hashable,
+        frame: pd.DataFrame,
+        tables: FrozenSet[str],
+        ttl: Optional[float] = None,
+        snapshot: Optional[Tuple[int, Tuple[int, ...]]] = None,
+    ) -> None:
+        """Store a result unless a write invalidated its tables since ``snapshot``."""
+        nbytes = int(frame.memory_usage(deep=True).sum())
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if snapshot is not None:
+                current = (self._global_version, tuple(self._versions.get(t, 0) for t in sorted(tables)))
+                if current != snapshot:
+                    return
+            if key in self._entries:
+                self._drop(key)
+            expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+            self._entries[key] = _Entry(frame, tables, expires_at, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, tables: Optional[Iterable[str]] = None) -> None:
+        """Drop entries reading any of ``tables``; None drops everything."""
+        names = None if tables is None else frozenset(t.lower() for t in tables)
+        with self._lock:
+            self.invalidations += 1
+            if names is None:
+                self._global_version += 1
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                for name in names:
+                    self._versions[name] = self._versions.get(name, 0) + 1
+                for key in [k for k, e in self._entries.items() if e.tables & names]:
+                    self._drop(key)
+        for callback in self._listeners:
+            callback(names)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        self.invalidate(None)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/invalidation counters and current footprint."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
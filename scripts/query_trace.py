@@ -0,0 +1,273 @@
+"""Statement-level tracing and a slow-query log for the data-access helpers.
+
+Every traced statement is reduced to a :class:`QueryRecord`: the SQL
+fingerprint (literals and whitespace normalized, so repeated calls group
+together), the shape of its parameters (types only, never values), rows
+returned or affected, wall time and the calling function outside the data
+layer. Statements slower than the threshold go to a rotating log file along
+with their EXPLAIN QUERY PLAN output.
+
+Tracing is off unless enabled; the helpers then pay a single attribute check.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from logging.handlers import RotatingFileHandler
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence
+
+__all__ = [
+    "DEFAULT_SLOW_LOG",
+    "QueryRecord",
+    "QueryTracer",
+    "fingerprint",
+    "params_shape",
+]
+
+DEFAULT_SLOW_LOG = "logs/slow_queries.log"
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+# Frames from these modules are the data layer itself, not the caller
+_SKIP_MODULES = ("scripts.commonmethod", "scripts.query_trace", "pandas", "contextlib", "concurrent", "threading")
+
+
+def fingerprint(sql: str) -> str:
+    """Normalize ``sql`` so statements differing only in literals compare equal."""
+    text = _STRING_RE.sub("?", sql)
+    text = _NUMBER_RE.sub("?", text)
+    text = _SPACE_RE.sub(" ", text).strip()
+    return _IN_LIST_RE.sub("(?+)", text)
+
+
+def params_shape(params: Any) -> str:
+    """Describe parameters by type only, e.g. ``(str, int)`` or ``{name: str}``."""
+    if params is None:
+        return "()"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in params.items()) + "}"
+    try:
+        return "(" + ", ".join(type(v).__name__ for v in params) + ")"
+    except TypeError:
+        return type(params).__name__
+
+
+def _caller() -> str:
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if not module.startswith(_SKIP_MODULES):
+            return f"{module}.{frame.f_code.co_name}:{frame.f_lineno}"
+        frame = frame.f_back
+    return "?"
+
+
+@dataclass(frozen=True)
+class QueryRecord:
+    """One executed statement."""
+
+    fingerprint: str
+    fingerprint_id: str
+    kind: str
+    params: str
+    rows: int
+    elapsed: float
+    caller: str
+    thread: str
+    started_at: float
+    cached: bool = False
+    error: Optional[str] = None
+
+
+class QueryTracer:
+    """Collect :class:`QueryRecord` s and log slow statements.
+
+    Args:
+        enabled: Record statements at all.
+        slow_ms: Statements at or above this many milliseconds are logged.
+        log_path: Rotating slow-query log file.
+        max_bytes: Size at which the log rotates.
+        backup_count: Rotated files to keep.
+        explain: Append EXPLAIN QUERY PLAN output to slow-query entries.
+        history: Recent records kept in memory.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        slow_ms: float = 200.0,
+        log_path: str = DEFAULT_SLOW_LOG,
+        max_bytes: int = 5 * 1024 * 1024,
+        backup_count: int = 3,
+        explain: bool = True,
+        history: int = 1000,
+    ) -> None:
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.log_path = log_path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.explain = explain
+        self._lock = threading.Lock()
+        self._recent: Deque[QueryRecord] = deque(maxlen=history)
+        # fingerprint -> {"count", "total", "max", "rows"}
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._plans: Dict[str, List[str]] = {}
+        self._listeners: List[Callable[[QueryRecord], None]] = []
+        self._logger: Optional[logging.Logger] = None
+
+    @classmethod
+    def from_env(cls) -> "QueryTracer":
+        """Build a tracer from ``BANKSIGHT_TRACE``, ``BANKSIGHT_SLOW_MS`` and ``BANKSIGHT_SLOW_LOG``."""
+        return cls(
+            enabled=os.environ.get("BANKSIGHT_TRACE", "") not in ("", "0"),
+            slow_ms=float(os.environ.get("BANKSIGHT_SLOW_MS", 200.0)),
+            log_path=os.environ.get("BANKSIGHT_SLOW_LOG", DEFAULT_SLOW_LOG),
+        )
+
+    def configure(self, **options: Any) -> None:
+        """Change settings in place (same names as the constructor)."""
+        for name, value in options.items():
+            if not hasattr(self, name) or name.startswith("_"):
+                raise TypeError(f"Unknown tracing option {name!r}")
+            if value is not None:
+                setattr(self, name, value)
+        if {"log_path", "max_bytes", "backup_count"} & options.keys():
+            self._close_log()
+
+    def add_listener(self, callback: Callable[[QueryRecord], None]) -> None:
+        """Call ``callback(record)`` for every recorded statement."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[QueryRecord], None]) -> None:
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def record(
+        self,
+        sql: str,
+        params: Optional[Sequence],
+        rows: int,
+        elapsed: float,
+        kind: str,
+        connect: Optional[Callable[[], sqlite3.Connection]] = None,
+        cached: bool = False,
+        error: Optional[BaseException] = None,
+    ) -> QueryRecord:
+        """Record one statement; ``connect`` supplies a connection for EXPLAIN."""
+        fp = fingerprint(sql)
+        rec = QueryRecord(
+            fingerprint=fp,
+            fingerprint_id=hashlib.sha1(fp.encode("utf-8")).hexdigest()[:10],
+            kind=kind,
+            params=params_shape(params),
+            rows=rows,
+            elapsed=elapsed,
+            caller=_caller(),
+            thread=threading.current_thread().name,
+            started_at=time.time() - elapsed,
+            cached=cached,
+            error=None if error is None else f"{type(error).__name__}: {error}",
+        )
+        with self._lock:
+            self._recent.append(rec)
+            if not cached:
+                totals = self._totals.setdefault(fp, {"count": 0, "total": 0.0, "max": 0.0, "rows": 0})
+                totals["count"] += 1
+                totals["total"] += elapsed
+                totals["max"] = max(totals["max"], elapsed)
+                totals["rows"] += rows
+        if not cached and elapsed * 1000 >= self.slow_ms:
+            self._log_slow(rec, sql, params, connect)
+        for callback in self._listeners:
+            callback(rec)
+        return rec
+
+    def recent(self) -> List[QueryRecord]:
+        """Most recent records, oldest first."""
+        with self._lock:
+            return list(self._recent)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per-fingerprint count, total/mean/max seconds and rows, slowest total first."""
+        with self._lock:
+            rows = [
+                {
+                    "fingerprint": fp,
+                    "count": int(t["count"]),
+                    "total": t["total"],
+                    "mean": t["total"] / t["count"],
+                    "max": t["max"],
+                    "rows": int(t["rows"]),
+                }
+                for fp, t in self._totals.items()
+            ]
+        return sorted(rows, key=lambda r: r["total"], reverse=True)
+
+    def reset(self) -> None:
+        """Forget recorded statements and cached plans."""
+        with self._lock:
+            self._recent.clear()
+            self._totals.clear()
+            self._plans.clear()
+
+    def _plan(self, rec: QueryRecord, sql: str, params: Optional[Sequence], connect) -> List[str]:
+        plan = self._plans.get(rec.fingerprint)
+        if plan is not None:
+            return plan
+        try:
+            rows = connect().execute(f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()
+            plan = [row[-1] for row in rows]
+        except sqlite3.Error as e:
+            # Multi-statement scripts, DDL and the like have no single plan
+            plan = [f"(no plan: {e})"]
+        self._plans[rec.fingerprint] = plan
+        return plan
+
+    def _log_slow(self, rec: QueryRecord, sql: str, params: Optional[Sequence], connect) -> None:
+        lines = [
+            f"{rec.elapsed * 1000:.1f} ms {rec.kind} rows={rec.rows} caller={rec.caller} "
+            f"fp={rec.fingerprint_id} params={rec.params}"
+            + (f" error={rec.error}" if rec.error else ""),
+            f"  {rec.fingerprint}",
+        ]
+        if self.explain and connect is not None and rec.error is None:
+            lines.extend(f"  plan: {step}" for step in self._plan(rec, sql, params, connect))
+        self._slow_logger().warning("\n".join(lines))
+
+    def _slow_logger(self) -> logging.Logger:
+        with self._lock:
+            if self._logger is None:
+                directory = os.path.dirname(self.log_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                handler = RotatingFileHandler(
+                    self.log_path, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding="utf-8"
+                )
+                handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                logger = logging.getLogger(f"banksight.slow_query.{id(self)}")
+                logger.handlers[:] = [handler]
+                logger.setLevel(logging.WARNING)
+                logger.propagate = False
+                self._logger = logger
+            return self._logger
+
+    def _close_log(self) -> None:
+        with self._lock:
+            if self._logger is not None:
+                for handler in self._logger.handlers:
+                    handler.close()
+                self._logger.handlers[:] = []
+                self._logger = None
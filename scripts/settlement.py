@@ -0,0 +1,382 @@
+"""Batch settlement of Pending loan and credit-card payments.
+
+``loan Payment`` and ``Credit payment`` transactions are logged as Pending.
+``settle_pending`` clears them in batches. Each batch is one
+``BEGIN IMMEDIATE`` transaction of set-based statements over a temporary plan
+table:
+
+1. Take the next ``batch_size`` pending payments in ``(txn_time, txn_id)`` order,
+   applying any edits passed as ``overrides`` (amount, account, target).
+2. Match each payment to its target. That is the loan or card named by
+   ``reference_id`` if it belongs to the customer, otherwise the customer's
+   only open loan (not Closed, amount outstanding) or only card with a
+   balance. Payments without an account get the customer's only account.
+3. Check the payment on its own, then cumulatively with the window sums
+   ``SUM(amount) OVER (PARTITION BY account ...)`` and ``... BY target``.
+   The source account must stay at or above the ₹1,000 minimum and the
+   target must not be overpaid. Payments are settled first come, first
+   served, as if posted one by one; one that does not fit stays Pending for
+   a later run.
+4. Apply the totals with one ``UPDATE ... FROM`` each to ``accounts``,
+   ``loans`` (a loan paid off is Closed) and ``creditcards``. Mark the
+   payments Success, recording the amount, account and target used. An
+   edited payment that stays Pending keeps its original values.
+
+A dry run performs the same steps across all batches in a single transaction
+and rolls it back, so the report is exact.
+
+Usage:
+    python -m scripts.settlement --dry-run --report pending.csv
+    python -m scripts.settlement
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from scripts.commonmethod import write_transaction
+from scripts.ledger import INSUFFICIENT_FUNDS, MIN_BALANCE, TXN_TYPES, ensure_reference_column
+
+__all__ = [
+    "DEFAULT_BATCH_SIZE",
+    "SETTLED",
+    "NO_TARGET",
+    "AMBIGUOUS_TARGET",
+    "NO_ACCOUNT",
+    "EXCEEDS_OUTSTANDING",
+    "SettlementReport",
+    "settle_pending",
+]
+
+DEFAULT_BATCH_SIZE = 5000
+LOAN_PAYMENT = "loan payment"
+CARD_PAYMENT = "credit payment"
+
+# Outcomes; anything but SETTLED leaves the payment Pending
+SETTLED = "settled"
+NO_TARGET = "no_target"
+AMBIGUOUS_TARGET = "ambiguous_target"
+NO_ACCOUNT = "no_source_account"
+EXCEEDS_OUTSTANDING = "exceeds_outstanding"
+
+_TOLERANCE = 1e-6
+_WRITES = ("accounts", "transactions", "loans", "creditcards")
+
+# Spellings of the pending payment rows (form values and lowercase imports),
+# so the (status, txn_type) index can be used
+_PAYMENT_TYPES = sorted({t for t in TXN_TYPES if t.lower() in (LOAN_PAYMENT, CARD_PAYMENT)} | {LOAN_PAYMENT, CARD_PAYMENT})
+_PENDING = ("Pending", "pending")
+
+_OPEN_LOAN = "l.customer_id = p.customer_id AND l.loan_status <> 'Closed' AND l.loan_amount > 0"
+_OPEN_CARD = "c.customer_id = p.customer_id AND c.current_balance > 0"
+
+_OVERRIDABLE = ("amount", "account_id", "reference_id")
+
+_PLAN_SQL = """
+CREATE TEMP TABLE settlement_plan (
+    txn_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    customer_id TEXT,
+    account_id INTEGER,
+    amount REAL NOT NULL,
+    txn_time TEXT NOT NULL,
+    reference_id INTEGER,
+    target_id INTEGER,
+    balance REAL,
+    outstanding REAL,
+    reason TEXT
+)
+"""
+
+_STEPS: Tuple[str, ...] = (
+    # Target named by reference_id, if it is the customer's
+    f"""
+    UPDATE settlement_plan AS p SET target_id = p.reference_id
+    WHERE p.reference_id IS NOT NULL AND CASE p.kind
+        WHEN '{LOAN_PAYMENT}' THEN EXISTS (SELECT 1 FROM loans l WHERE l.loan_id = p.reference_id AND l.customer_id = p.customer_id)
+        ELSE EXISTS (SELECT 1 FROM creditcards c WHERE c.card_id = p.reference_id AND c.customer_id = p.customer_id)
+    END
+    """,
+    # Otherwise the customer's only open loan / card
+    f"""
+    UPDATE settlement_plan AS p SET target_id = CASE p.kind
+        WHEN '{LOAN_PAYMENT}' THEN (SELECT CASE WHEN COUNT(*) = 1 THEN MIN(l.loan_id) END FROM loans l WHERE {_OPEN_LOAN})
+        ELSE (SELECT CASE WHEN COUNT(*) = 1 THEN MIN(c.card_id) END FROM creditcards c WHERE {_OPEN_CARD})
+    END
+    WHERE p.reference_id IS NULL
+    """,
+    f"""
+    UPDATE settlement_plan AS p SET reason = CASE
+        WHEN p.reference_id IS NULL AND CASE p.kind
+            WHEN '{LOAN_PAYMENT}' THEN (SELECT COUNT(*) FROM loans l WHERE {_OPEN_LOAN})
+            ELSE (SELECT COUNT(*) FROM creditcards c WHERE {_OPEN_CARD})
+        END > 1 THEN '{AMBIGUOUS_TARGET}'
+        ELSE '{NO_TARGET}' END
+    WHERE p.target_id IS NULL
+    """,
+    # Source account: the one recorded, or the customer's only account
+    """
+    UPDATE settlement_plan AS p
+    SET account_id = (SELECT MIN(a.account_id) FROM accounts a WHERE a.customer_id = p.customer_id)
+    WHERE p.account_id IS NULL AND (SELECT COUNT(*) FROM accounts a WHERE a.customer_id = p.customer_id) = 1
+    """,
+    f"""
+    UPDATE settlement_plan AS p SET reason = '{NO_ACCOUNT}'
+    WHERE p.reason IS NULL AND NOT EXISTS (
+        SELECT 1 FROM accounts a WHERE a.account_id = p.account_id AND a.customer_id = p.customer_id)
+    """,
+    f"""
+    UPDATE settlement_plan AS p SET
+        balance = (SELECT a.account_balance FROM accounts a WHERE a.account_id = p.account_id),
+        outstanding = CASE p.kind
+            WHEN '{LOAN_PAYMENT}' THEN (SELECT l.loan_amount FROM loans l WHERE l.loan_id = p.target_id)
+            ELSE (SELECT c.current_balance FROM creditcards c WHERE c.card_id = p.target_id)
+        END
+    WHERE p.reason IS NULL
+    """,
+    # Each payment on its own ...
+    f"""
+    UPDATE settlement_plan SET reason = CASE
+        WHEN amount > COALESCE(outstanding, 0) + {_TOLERANCE} THEN '{EXCEEDS_OUTSTANDING}'
+        ELSE '{INSUFFICIENT_FUNDS}' END
+    WHERE reason IS NULL AND (
+        amount > COALESCE(outstanding, 0) + {_TOLERANCE} OR COALESCE(balance, 0) - amount < :minimum - {_TOLERANCE})
+    """,
+)
+
+# ... then together with the earlier payments on the same account and target.
+# Only a payment that is the first to overdraw both its account and its target
+# is refused per pass; refusing it frees room for the ones after it, so the
+# statement is repeated until nothing changes (the same result as posting
+# the payments one by one).
+_CUMULATIVE_SQL = f"""
+UPDATE settlement_plan SET reason = r.reason
+FROM (
+    SELECT txn_id, reason FROM (
+        SELECT txn_id, reason,
+               ROW_NUMBER() OVER (PARTITION BY account_id ORDER BY txn_time, txn_id) AS nth_on_account,
+               ROW_NUMBER() OVER (PARTITION BY kind, target_id ORDER BY txn_time, txn_id) AS nth_on_target
+        FROM (
+            SELECT txn_id, account_id, kind, target_id, txn_time, CASE
+                WHEN outstanding - SUM(amount) OVER (PARTITION BY kind, target_id ORDER BY txn_time, txn_id)
+                     < -{_TOLERANCE} THEN '{EXCEEDS_OUTSTANDING}'
+                WHEN balance - SUM(amount) OVER (PARTITION BY account_id ORDER BY txn_time, txn_id)
+                     < :minimum - {_TOLERANCE} THEN '{INSUFFICIENT_FUNDS}'
+            END AS reason
+            FROM settlement_plan WHERE reason IS NULL
+        ) WHERE reason IS NOT NULL
+    ) WHERE nth_on_account = 1 AND nth_on_target = 1
+) AS r
+WHERE settlement_plan.txn_id = r.txn_id
+"""
+
+_APPLY: Tuple[str, ...] = (
+    """
+    UPDATE accounts SET account_balance = account_balance - s.total, last_updated = :today
+    FROM (SELECT account_id, SUM(amount) AS total FROM settlement_plan WHERE reason IS NULL GROUP BY account_id) AS s
+    WHERE accounts.account_id = s.account_id
+    """,
+    f"""
+    UPDATE loans SET
+        loan_amount = loan_amount - s.total,
+        loan_status = CASE WHEN loan_amount - s.total <= {_TOLERANCE} THEN 'Closed' ELSE loan_status END
+    FROM (SELECT target_id, SUM(amount) AS total FROM settlement_plan
+          WHERE reason IS NULL AND kind = '{LOAN_PAYMENT}' GROUP BY target_id) AS s
+    WHERE loans.loan_id = s.target_id
+    """,
+    f"""
+    UPDATE creditcards SET current_balance = current_balance - s.total
+    FROM (SELECT target_id, SUM(amount) AS total FROM settlement_plan
+          WHERE reason IS NULL AND kind = '{CARD_PAYMENT}' GROUP BY target_id) AS s
+    WHERE creditcards.card_id = s.target_id
+    """,
+    """
+    UPDATE transactions SET status = 'Success', amount = p.amount, account_id = p.account_id, reference_id = p.target_id
+    FROM settlement_plan AS p
+    WHERE transactions.txn_id = p.txn_id AND p.reason IS NULL
+    """,
+)
+
+_REPORT_SQL = f"""
+SELECT txn_id, kind, customer_id, account_id, target_id, amount, txn_time,
+       COALESCE(reason, '{SETTLED}') AS outcome
+FROM settlement_plan ORDER BY txn_time, txn_id
+"""
+
+
+@dataclass(frozen=True)
+class SettlementReport:
+    """Outcome of one settlement run.
+
+    ``lines`` has one row per pending payment examined, with its matched
+    ``account_id``/``target_id`` and ``outcome``; ``left_pending`` counts
+    the unsettled ones by reason.
+    """
+
+    dry_run: bool
+    examined: int
+    settled: int
+    amount_settled: float
+    batches: int
+    elapsed: float
+    left_pending: Dict[str, int] = field(default_factory=dict)
+    lines: pd.DataFrame = field(default_factory=pd.DataFrame)
+
+
+def _select_sql(restricted: bool) -> str:
+    types = ", ".join(f"'{t}'" for t in _PAYMENT_TYPES)
+    statuses = ", ".join(f"'{s}'" for s in _PENDING)
+    only = "AND txn_id IN (SELECT value FROM json_each(:txn_ids))" if restricted else ""
+    return f"""
+    INSERT INTO settlement_plan (txn_id, kind, customer_id, account_id, amount, txn_time, reference_id)
+    SELECT txn_id, lower(txn_type), customer_id, account_id, amount, txn_time, reference_id
+    FROM transactions
+    WHERE status IN ({statuses}) AND txn_type IN ({types}) {only}
+      AND (txn_time, txn_id) > (:after_time, :after_id)
+    ORDER BY txn_time, txn_id
+    LIMIT :limit
+    """
+
+
+def _settle_batch(
+    conn: sqlite3.Connection,
+    after: Tuple[str, str],
+    batch_size: int,
+    txn_ids: Optional[Sequence[str]],
+    overrides: Mapping[str, Mapping[str, object]],
+) -> pd.DataFrame:
+    """Plan and apply one batch on ``conn`` (inside the caller's transaction)."""
+    conn.execute("DROP TABLE IF EXISTS temp.settlement_plan")
+    conn.execute(_PLAN_SQL)
+    params = {
+        "after_time": after[0],
+        "after_id": after[1],
+        "limit": batch_size,
+        "txn_ids": json.dumps(list(txn_ids or [])),
+        "minimum": MIN_BALANCE,
+        "today": datetime.date.today().strftime("%Y-%m-%d"),
+    }
+    conn.execute(_select_sql(txn_ids is not None), params)
+    if overrides:
+        conn.executemany(
+            "UPDATE settlement_plan SET amount = COALESCE(:amount, amount), "
+            "account_id = COALESCE(:account_id, account_id), "
+            "reference_id = COALESCE(:reference_id, reference_id) WHERE txn_id = :txn_id",
+            [{**dict.fromkeys(_OVERRIDABLE), **edit, "txn_id": txn_id} for txn_id, edit in overrides.items()],
+        )
+    for sql in _STEPS:
+        conn.execute(sql, params)
+    while conn.execute(_CUMULATIVE_SQL, params).rowcount:
+        pass
+    for sql in _APPLY:
+        conn.execute(sql, params)
+    lines = pd.DataFrame(
+        conn.execute(_REPORT_SQL).fetchall(),
+        columns=["txn_id", "kind", "customer_id", "account_id", "target_id", "amount", "txn_time", "outcome"],
+    )
+    conn.execute("DROP TABLE temp.settlement_plan")
+    return lines
+
+
+def settle_pending(
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    dry_run: bool = False,
+    txn_ids: Optional[Sequence[str]] = None,
+    overrides: Optional[Mapping[str, Mapping[str, object]]] = None,
+) -> SettlementReport:
+    """Settle every Pending loan and credit-card payment (or just ``txn_ids``).
+
+    Args:
+        batch_size: Payments per transaction.
+        dry_run: Report what would happen without changing anything.
+        txn_ids: Restrict the run to these transactions.
+        overrides: Edits to settle payments with, by txn_id: any of
+            ``amount``, ``account_id`` and ``reference_id``. They are saved
+            in the same transaction as the settlement, only if it succeeds.
+    """
+    overrides = dict(overrides or {})
+    unknown = {key for edit in overrides.values() for key in edit} - set(_OVERRIDABLE)
+    if unknown:
+        raise ValueError(f"Cannot override {', '.join(sorted(unknown))}")
+    started = time.perf_counter()
+    batches: List[pd.DataFrame] = []
+    after = ("", "")
+
+    def run_batches(conn: sqlite3.Connection, single: bool) -> None:
+        nonlocal after
+        while True:
+            if not single:
+                conn.execute("BEGIN IMMEDIATE")
+            lines = _settle_batch(conn, after, batch_size, txn_ids, overrides)
+            if not single:
+                conn.commit()
+            if not lines.empty:
+                batches.append(lines)
+                after = (lines["txn_time"].iloc[-1], lines["txn_id"].iloc[-1])
+            if len(lines) < batch_size:
+                return
+
+    with write_transaction(*_WRITES) as conn:
+        ensure_reference_column(conn)
+        if dry_run:
+            # All batches in one transaction, so later batches see earlier ones; then undone
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                run_batches(conn, single=True)
+            finally:
+                conn.rollback()
+        else:
+            run_batches(conn, single=False)
+
+    lines = pd.concat(batches, ignore_index=True) if batches else pd.DataFrame(
+        columns=["txn_id", "kind", "customer_id", "account_id", "target_id", "amount", "txn_time", "outcome"]
+    )
+    settled = lines["outcome"] == SETTLED
+    return SettlementReport(
+        dry_run=dry_run,
+        examined=len(lines),
+        settled=int(settled.sum()),
+        amount_settled=float(lines.loc[settled, "amount"].sum()),
+        batches=len(batches),
+        elapsed=time.perf_counter() - started,
+        left_pending=lines.loc[~settled, "outcome"].value_counts().to_dict(),
+        lines=lines,
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from scripts import commonmethod
+
+    parser = argparse.ArgumentParser(description="Settle Pending loan and credit-card payments.")
+    parser.add_argument("--dry-run", action="store_true", help="report without changing anything")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="payments per transaction")
+    parser.add_argument("--report", default=None, help="write the per-payment outcomes to this CSV")
+    parser.add_argument("--db", default=commonmethod.DB_PATH, help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    commonmethod.DB_PATH = args.db
+    report = settle_pending(args.batch_size, args.dry_run)
+    verb = "Would settle" if report.dry_run else "Settled"
+    print(
+        f"{verb} {report.settled:,} of {report.examined:,} pending payments "
+        f"(₹{report.amount_settled:,.2f}) in {report.batches} batch(es), {report.elapsed:.2f}s"
+    )
+    for reason, count in sorted(report.left_pending.items()):
+        print(f"  left pending, {reason}: {count:,}")
+    if args.report:
+        report.lines.to_csv(args.report, index=False)
+        print(f"Report written to {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""Streamlit page for account statements with running balances."""
+
+from __future__ import annotations
+
+import datetime
+
+import streamlit as st
+
+from scripts.commonmethod import run_query
+from scripts.customer_context import load_customer_context
+from scripts.customer_picker import customer_picker
+from scripts.statements import DEFAULT_PAGE_SIZE, get_statement
+
+PAGE_SIZES = (25, DEFAULT_PAGE_SIZE, 100, 250)
+
+
+class StatementsPage:
+    def render(self, conn) -> None:
+        st.title("🧾 Account Statements")
+        customer_id = customer_picker()
+        ctx = load_customer_context(customer_id) if customer_id else None
+        if not ctx:
+            return
+        if not ctx.account_ids:
+            st.warning("This customer has no accounts.")
+            return
+
+        account_id = st.selectbox("Account", ctx.account_ids)
+        unassigned = run_query(
+            "SELECT COUNT(*) AS n FROM transactions WHERE customer_id = ? AND account_id IS NULL", (customer_id,), cache=True
+        )["n"].iloc[0]
+        if unassigned:
+            st.caption(f"{unassigned} older transactions of this customer are not linked to an account and are not listed.")
+        today = datetime.date.today()
+        col1, col2, col3 = st.columns(3)
+        start = col1.date_input("From", value=today - datetime.timedelta(days=365), max_value=today)
+        end = col2.date_input("To", value=today)
+        page_size = col3.selectbox("Rows per page", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE))
+        if start > end:
+            st.error("'From' must not be after 'To'.")
+            return
+
+        # Cursors of the pages visited so far; a new account or range starts over
+        query = (account_id, start, end, page_size)
+        nav = st.session_state.setdefault("statement_nav", {"query": None, "cursors": [None]})
+        if nav["query"] != query:
+            nav["query"], nav["cursors"] = query, [None]
+        cursors = nav["cursors"]
+
+        page = get_statement(account_id, start.isoformat(), end.isoformat(), page_size, cursors[-1])
+        if page is None:
+            st.error("Account not found.")
+            return
+
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Opening balance", f"₹{page.opening_balance:,.2f}")
+        m2.metric("Closing balance", f"₹{page.closing_balance:,.2f}")
+        m3.metric("Page", len(cursors))
+        if page.lines:
+            st.dataframe(page.to_frame(), use_container_width=True, hide_index=True)
+        else:
+            st.info("No transactions on this account in the selected period.")
+
+        prev_col, next_col = st.columns(2)
+        prev_col.button("◀ Previous", on_click=cursors.pop, disabled=len(cursors) == 1)
+        next_col.button("Next ▶", on_click=cursors.append, args=(page.next_cursor,), disabled=page.next_cursor is None)
@@ -0,0 +1,364 @@
+"""Account statements: one account's transactions in a date range, with running balances.
+
+Pages are read with keyset pagination on ``(txn_time, txn_id)`` over
+``idx_transactions_account_time``. Running balances come from a window
+``SUM`` over the page alone, seeded with the balance carried in the cursor,
+so every page after the first costs O(page size) however long the account's
+history is.
+
+The first page needs the balance at the start of the range. It is found from
+``statement_checkpoints``, which holds each account's cumulative net flow
+(Success deposits minus Success debits, withdrawals, transfers and settled
+payments) before every month. The first page then adds at most one month of
+rows. Triggers
+on ``transactions`` keep the checkpoints correct when rows are inserted,
+updated, deleted or backdated. Checkpoints for new months are added lazily,
+once per account and month.
+
+Balances are anchored to the account's actual ``account_balance``: the
+statement's latest line always matches it, even when the account's imported
+opening balance does not reconcile with its recorded transactions.
+
+Usage:
+    python -m scripts.statements            # create the table/triggers, backfill account ids
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import sqlite3
+import sys
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+import pandas as pd
+
+from scripts.commonmethod import get_connection, invalidate_cache, on_invalidate, run_query, write_transaction
+from scripts.indexes import INDEX_CATALOG
+from scripts.ledger import CREDIT_TYPES, DEBIT_TYPES, DEFERRED_TYPES
+
+__all__ = [
+    "DEFAULT_PAGE_SIZE",
+    "StatementCursor",
+    "StatementLine",
+    "StatementPage",
+    "effect_sql",
+    "ensure_statements",
+    "backfill_account_ids",
+    "build_checkpoints",
+    "get_statement",
+]
+
+DEFAULT_PAGE_SIZE = 50
+STATEMENT_INDEX = "idx_transactions_account_time"
+
+
+def effect_sql(r: str = "") -> str:
+    """SQL for a transaction's signed effect on its account balance.
+
+    ``r`` prefixes the column names, e.g. ``"NEW."`` inside a trigger. Settled
+    (Success) loan and credit-card payments are debits of their source account.
+    """
+    debits = ", ".join(f"'{t}'" for t in sorted(DEBIT_TYPES | DEFERRED_TYPES))
+    credits = ", ".join(f"'{t}'" for t in sorted(CREDIT_TYPES))
+    return (
+        f"(CASE WHEN lower({r}status) = 'success' THEN CASE "
+        f"WHEN lower({r}txn_type) IN ({debits}) THEN -{r}amount "
+        f"WHEN lower({r}txn_type) IN ({credits}) THEN {r}amount "
+        f"ELSE 0 END ELSE 0 END)"
+    )
+
+
+_CHECKPOINT_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS statement_checkpoints (
+    account_id INTEGER NOT NULL,
+    month TEXT NOT NULL,
+    opening_net REAL NOT NULL,
+    PRIMARY KEY (account_id, month)
+) WITHOUT ROWID
+"""
+
+
+def _shift_sql(r: str, sign: str) -> str:
+    # A row moves the opening of every later month of its account
+    return (
+        f"UPDATE statement_checkpoints SET opening_net = opening_net {sign} {effect_sql(r)} "
+        f"WHERE account_id = {r}account_id AND month > substr({r}txn_time, 1, 7);"
+    )
+
+
+_TRIGGERS: Tuple[Tuple[str, str], ...] = (
+    (
+        "trg_statement_checkpoints_ins",
+        f"AFTER INSERT ON transactions WHEN NEW.account_id IS NOT NULL BEGIN {_shift_sql('NEW.', '+')} END",
+    ),
+    (
+        "trg_statement_checkpoints_del",
+        f"AFTER DELETE ON transactions WHEN OLD.account_id IS NOT NULL BEGIN {_shift_sql('OLD.', '-')} END",
+    ),
+    (
+        "trg_statement_checkpoints_upd",
+        "AFTER UPDATE OF account_id, txn_type, amount, txn_time, status ON transactions "
+        f"BEGIN {_shift_sql('OLD.', '-')} {_shift_sql('NEW.', '+')} END",
+    ),
+)
+
+
+@dataclass(frozen=True)
+class StatementCursor:
+    """Where the next page starts: after ``(txn_time, txn_id)``, at ``balance``."""
+
+    txn_time: str
+    txn_id: str
+    balance: float
+
+
+@dataclass(frozen=True)
+class StatementLine:
+    txn_id: str
+    txn_time: str
+    txn_type: str
+    status: str
+    amount: float
+    effect: float
+    balance: float
+
+
+@dataclass(frozen=True)
+class StatementPage:
+    """One page of a statement; ``opening_balance`` is the balance before its first line."""
+
+    account_id: int
+    start: str
+    end: str
+    opening_balance: float
+    lines: Tuple[StatementLine, ...]
+    next_cursor: Optional[StatementCursor]
+
+    @property
+    def closing_balance(self) -> float:
+        return self.lines[-1].balance if self.lines else self.opening_balance
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame([line.__dict__ for line in self.lines], columns=list(StatementLine.__dataclass_fields__))
+
+
+def _invalidate_checkpoints(tables) -> None:
+    # Checkpoints change through triggers on transactions
+    if tables is not None and "transactions" in tables:
+        invalidate_cache("statement_checkpoints")
+
+
+on_invalidate(_invalidate_checkpoints)
+_ready = False
+
+
+def backfill_account_ids(conn: sqlite3.Connection) -> int:
+    """Set ``account_id`` on legacy transactions whose customer has exactly one account.
+
+    Returns:
+        Number of rows updated. Customers with several accounts are left
+        alone, since there is no way to tell which account was meant.
+    """
+    with conn:
+        return conn.execute(
+            """
+            UPDATE transactions
+            SET account_id = (SELECT MIN(a.account_id) FROM accounts a WHERE a.customer_id = transactions.customer_id)
+            WHERE account_id IS NULL
+              AND (SELECT COUNT(*) FROM accounts a WHERE a.customer_id = transactions.customer_id) = 1
+            """
+        ).rowcount
+
+
+def ensure_statements(conn: sqlite3.Connection) -> None:
+    """Create the checkpoint table, triggers and statement index; backfill account ids."""
+    index = next(spec for spec in INDEX_CATALOG if spec.name == STATEMENT_INDEX)
+    with conn:
+        conn.execute(_CHECKPOINT_TABLE_SQL)
+        conn.execute(index.create_sql())
+        for name, body in _TRIGGERS:
+            # Recreated so a changed effect_sql reaches existing databases
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            conn.execute(f"CREATE TRIGGER {name} {body}")
+    # Triggers first, so checkpoints built earlier follow the backfill
+    if backfill_account_ids(conn):
+        invalidate_cache("transactions", "statement_checkpoints")
+
+
+def _month(value: str) -> str:
+    return value[:7]
+
+
+def _next_month(month: str) -> str:
+    year, mon = int(month[:4]), int(month[5:7])
+    return f"{year + mon // 12:04d}-{mon % 12 + 1:02d}"
+
+
+def build_checkpoints(account_id: int, through: Optional[str] = None) -> int:
+    """Add the missing monthly checkpoints of ``account_id`` up to month ``through``.
+
+    ``through`` defaults to the current month. Only rows after the latest
+    existing checkpoint are read, so this costs about one month of rows once
+    the account is caught up.
+
+    Returns:
+        Number of checkpoints added.
+    """
+    through = through or datetime.date.today().strftime("%Y-%m")
+    with write_transaction("statement_checkpoints") as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        last = conn.execute(
+            "SELECT month, opening_net FROM statement_checkpoints WHERE account_id = ? ORDER BY month DESC LIMIT 1",
+            (account_id,),
+        ).fetchone()
+        if last is not None and last[0] >= through:
+            return 0
+        if last is None:
+            first = conn.execute(
+                "SELECT MIN(txn_time) FROM transactions WHERE account_id = ?", (account_id,)
+            ).fetchone()[0]
+            month, opening = min(_month(first), through) if first else through, 0.0
+            since = ""
+        else:
+            month, opening = last
+            since = month
+        flows = dict(
+            conn.execute(
+                f"SELECT substr(txn_time, 1, 7), SUM({effect_sql()}) FROM transactions "
+                "WHERE account_id = ? AND txn_time >= ? AND txn_time < ? GROUP BY 1",
+                (account_id, since, _next_month(through)),
+            ).fetchall()
+        )
+        rows = [] if last is not None else [(account_id, month, opening)]
+        while month < through:
+            opening += flows.get(month, 0.0) or 0.0
+            month = _next_month(month)
+            rows.append((account_id, month, opening))
+        conn.executemany(
+            "INSERT OR IGNORE INTO statement_checkpoints (account_id, month, opening_net) VALUES (?, ?, ?)", rows
+        )
+        return len(rows)
+
+
+def _ensure_ready() -> None:
+    global _ready
+    if not _ready:
+        # Existing databases get the checkpoint table on first use
+        ensure_statements(get_connection())
+        _ready = True
+
+
+_OPENING_SQL = f"""
+WITH latest AS (
+    SELECT month, opening_net FROM statement_checkpoints WHERE account_id = ? ORDER BY month DESC LIMIT 1
+), base AS (
+    SELECT month, opening_net FROM statement_checkpoints
+    WHERE account_id = ? AND month <= ? ORDER BY month DESC LIMIT 1
+)
+SELECT
+    (SELECT account_balance FROM accounts WHERE account_id = ?) AS account_balance,
+    COALESCE((SELECT opening_net FROM latest), 0) + (
+        SELECT COALESCE(SUM({effect_sql()}), 0) FROM transactions
+        WHERE account_id = ? AND txn_time >= COALESCE((SELECT month FROM latest), '')
+    ) AS total_net,
+    COALESCE((SELECT opening_net FROM base), 0) + (
+        SELECT COALESCE(SUM({effect_sql()}), 0) FROM transactions
+        WHERE account_id = ? AND txn_time >= COALESCE((SELECT month FROM base), '') AND txn_time < ?
+    ) AS opening_net
+"""
+
+_PAGE_SQL = f"""
+SELECT txn_id, txn_time, txn_type, status, amount, effect,
+       ? + SUM(effect) OVER (ORDER BY txn_time, txn_id ROWS UNBOUNDED PRECEDING) AS balance
+FROM (
+    SELECT txn_id, txn_time, txn_type, status, amount, {effect_sql()} AS effect
+    FROM transactions
+    WHERE account_id = ? AND txn_time >= ? AND txn_time < ? AND (txn_time, txn_id) > (?, ?)
+    ORDER BY txn_time, txn_id
+    LIMIT ?
+)
+ORDER BY txn_time, txn_id
+"""
+
+
+def _opening_balance(account_id: int, start: str) -> Optional[float]:
+    month = _month(start)
+    latest = run_query(
+        "SELECT MAX(month) AS month FROM statement_checkpoints WHERE account_id = ?", (account_id,), cache=True
+    )["month"].iloc[0]
+    if latest is None or pd.isna(latest) or latest < datetime.date.today().strftime("%Y-%m"):
+        build_checkpoints(account_id)
+    row = run_query(
+        _OPENING_SQL, (account_id, account_id, month, account_id, account_id, account_id, start), cache=True
+    ).iloc[0]
+    if pd.isna(row["account_balance"]):
+        return None
+    anchor = float(row["account_balance"]) - float(row["total_net"])
+    return anchor + float(row["opening_net"])
+
+
+def get_statement(
+    account_id: int,
+    start: str,
+    end: str,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    after: Optional[StatementCursor] = None,
+) -> Optional[StatementPage]:
+    """Return one page of ``account_id``'s statement for ``start``..``end`` (dates, inclusive).
+
+    Args:
+        account_id: Account to list.
+        start: First day, ``YYYY-MM-DD``.
+        end: Last day, ``YYYY-MM-DD``.
+        page_size: Lines per page.
+        after: ``next_cursor`` of the previous page; None for the first page.
+
+    Returns:
+        The page, or None if the account does not exist.
+    """
+    _ensure_ready()
+    end_exclusive = (datetime.date.fromisoformat(end) + datetime.timedelta(days=1)).isoformat()
+    if after is None:
+        opening = _opening_balance(account_id, start)
+        if opening is None:
+            return None
+        cursor_time, cursor_id = "", ""
+    else:
+        opening, cursor_time, cursor_id = after.balance, after.txn_time, after.txn_id
+
+    df = run_query(
+        _PAGE_SQL,
+        (opening, account_id, start, end_exclusive, cursor_time, cursor_id, page_size + 1),
+        cache=True,
+    )
+    more = len(df) > page_size
+    df = df.head(page_size)
+    lines = tuple(
+        StatementLine(t, time, kind, status, float(amount), float(effect), float(balance))
+        for t, time, kind, status, amount, effect, balance in df.itertuples(index=False, name=None)
+    )
+    next_cursor = StatementCursor(lines[-1].txn_time, lines[-1].txn_id, lines[-1].balance) if more else None
+    return StatementPage(account_id, start, end, opening, lines, next_cursor)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from scripts.commonmethod import DB_PATH
+
+    parser = argparse.ArgumentParser(description="Create the statement checkpoint table and backfill account ids.")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        ensure_statements(conn)
+        missing = conn.execute("SELECT COUNT(*) FROM transactions WHERE account_id IS NULL").fetchone()[0]
+        print(f"Statement checkpoints ready; {missing:,} transactions still have no account_id.")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,464 @@
+"""Monte Carlo stress tests of the loan book.
+
+A scenario shocks interest rates and default probabilities (PDs), overall
+and per ``loan_type`` / ``branch_name``. Each live loan (not Closed or
+Defaulted) enters with:
+
+- its exposure: the outstanding principal from ``scripts.amortization``;
+- a loss given default by loan type (``LGD``);
+- a one-year PD. The base PD is the share of Defaulted loans of its type in
+  the book. It is scaled by the scenario's PD multipliers and by the payment
+  shock of the rate rise: ``(shocked EMI / current EMI) ** PAYMENT_ELASTICITY``
+  on the remaining balance and term.
+
+Losses follow a one-factor (Vasicek) model. Each path draws one systematic
+factor ``Z``; a loan defaults with probability
+``Phi((Phi^-1(PD) - sqrt(rho) * Z) / sqrt(1 - rho))``. Loans are pooled into
+cells of the same loan type, branch and PD bucket, so each cell draws a
+single binomial default count per path. The book's size only affects the
+cell count, not the work per path.
+
+Paths are simulated in chunks by a process pool. Every chunk has its own
+seed derived from ``(seed, chunk index)``, so results do not depend on the
+worker count. As chunks complete, the run's loss statistics (expected
+loss, VaR, expected shortfall), loss histogram and per-segment expected
+losses are rewritten in ``stress_runs``, ``stress_loss_histogram`` and
+``stress_segments``. The Insights "Portfolio Stress Tests" section reads
+those tables, so a long nightly run can be watched while it is under way.
+
+Usage:
+    python -m scripts.stress_test                                 # every preset, 10,000 paths each
+    python -m scripts.stress_test --scenario recession --paths 100000 --workers 16
+    python -m scripts.stress_test --scenario-file scenarios.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from statistics import NormalDist
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from scripts.amortization import refresh_amortization
+from scripts.commonmethod import get_connection, run_query, write_transaction
+
+__all__ = [
+    "Shock",
+    "Scenario",
+    "SCENARIOS",
+    "StressResult",
+    "ensure_stress_tables",
+    "load_exposures",
+    "run_stress_test",
+]
+
+DEFAULT_PATHS = 10_000
+DEFAULT_CHUNK_PATHS = 500
+DEFAULT_SEED = 42
+HISTOGRAM_BUCKETS = 40
+PAYMENT_ELASTICITY = 2.0
+PD_FLOOR, PD_CAP = 0.001, 0.5
+DEFAULT_PD = 0.02
+# Loss given default by loan type; secured lending loses less
+LGD: Dict[str, float] = {
+    "Home": 0.25,
+    "Loan Against Property": 0.30,
+    "Auto": 0.45,
+    "Education": 0.55,
+    "Business": 0.60,
+    "Personal": 0.65,
+}
+DEFAULT_LGD = 0.50
+# Cells are (loan type, branch, PD bucket); buckets are 1/8 of a natural log apart
+_PD_BUCKETS_PER_E = 8
+# paths x cells floats held at once by a worker
+_BLOCK_ELEMENTS = 2_000_000
+
+_TABLES_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS stress_runs (
+        run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        scenario TEXT NOT NULL,
+        definition TEXT NOT NULL,
+        started_at TEXT NOT NULL,
+        finished_at TEXT,
+        seed INTEGER NOT NULL,
+        paths INTEGER NOT NULL,
+        paths_done INTEGER NOT NULL DEFAULT 0,
+        loans INTEGER NOT NULL,
+        exposure REAL NOT NULL,
+        expected_loss REAL,
+        loss_std REAL,
+        var_95 REAL,
+        var_99 REAL,
+        es_99 REAL,
+        max_loss REAL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stress_loss_histogram (
+        run_id INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        loss_from REAL NOT NULL,
+        loss_to REAL NOT NULL,
+        paths INTEGER NOT NULL,
+        PRIMARY KEY (run_id, bucket)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stress_segments (
+        run_id INTEGER NOT NULL,
+        loan_type TEXT NOT NULL,
+        branch_name TEXT NOT NULL,
+        loans INTEGER NOT NULL,
+        exposure REAL NOT NULL,
+        expected_loss REAL NOT NULL,
+        PRIMARY KEY (run_id, loan_type, branch_name)
+    ) WITHOUT ROWID
+    """,
+)
+_STRESS_TABLES = ("stress_runs", "stress_loss_histogram", "stress_segments")
+
+_EXPOSURE_SQL = """
+SELECT l.loan_id, COALESCE(l.loan_type, '') AS loan_type, COALESCE(l.branch_name, '') AS branch_name,
+       COALESCE(l.interest_rate, 0) AS annual_rate, a.term_months - a.installments_paid AS months_left,
+       a.outstanding_principal AS exposure
+FROM loans l JOIN loan_amortization a ON a.loan_id = l.loan_id
+WHERE l.loan_status NOT IN ('Closed', 'Defaulted') AND a.outstanding_principal > 0
+"""
+
+_BASE_PD_SQL = """
+SELECT COALESCE(loan_type, '') AS loan_type, AVG(loan_status = 'Defaulted') AS default_rate
+FROM loans GROUP BY 1
+"""
+
+
+@dataclass(frozen=True)
+class Shock:
+    """Rate rise in basis points and a multiplier on default probabilities."""
+
+    rate_bps: float = 0.0
+    pd_multiplier: float = 1.0
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """A stress scenario.
+
+    Attributes:
+        name: Label the results are stored under.
+        shock: Applied to every loan.
+        by_loan_type: Extra shocks for loans of a type (added/multiplied on top).
+        by_branch: Extra shocks for loans booked at a branch.
+        correlation: Asset correlation ``rho`` with the systematic factor.
+    """
+
+    name: str
+    shock: Shock = Shock()
+    by_loan_type: Mapping[str, Shock] = field(default_factory=dict)
+    by_branch: Mapping[str, Shock] = field(default_factory=dict)
+    correlation: float = 0.15
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "Scenario":
+        """Build a scenario from its JSON form (as written by ``to_dict``)."""
+        def shocks(section) -> Dict[str, Shock]:
+            return {key: Shock(**value) for key, value in (section or {}).items()}
+
+        return cls(
+            name=data["name"],
+            shock=Shock(**data.get("shock", {})),
+            by_loan_type=shocks(data.get("by_loan_type")),
+            by_branch=shocks(data.get("by_branch")),
+            correlation=float(data.get("correlation", 0.15)),
+        )
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    s.name: s
+    for s in (
+        Scenario("baseline"),
+        Scenario("rates_up_200bps", Shock(rate_bps=200)),
+        Scenario(
+            "recession",
+            Shock(rate_bps=300, pd_multiplier=2.0),
+            by_loan_type={"Business": Shock(pd_multiplier=1.5), "Personal": Shock(pd_multiplier=1.3)},
+            correlation=0.25,
+        ),
+    )
+}
+
+
+@dataclass(frozen=True)
+class StressResult:
+    """Loss distribution of one completed run (losses in ₹, one per path)."""
+
+    run_id: int
+    scenario: Scenario
+    loans: int
+    exposure: float
+    losses: np.ndarray
+    segments: pd.DataFrame
+    elapsed: float
+
+    @property
+    def expected_loss(self) -> float:
+        return float(self.losses.mean())
+
+    def var(self, level: float = 0.99) -> float:
+        return float(np.quantile(self.losses, level))
+
+    def expected_shortfall(self, level: float = 0.99) -> float:
+        return float(self.losses[self.losses >= self.var(level)].mean())
+
+
+def ensure_stress_tables(conn) -> None:
+    """Create the stress-test result tables if missing."""
+    for sql in _TABLES_SQL:
+        conn.execute(sql)
+    conn.commit()
+
+
+def _norm_cdf(x: np.ndarray) -> np.ndarray:
+    """Standard normal CDF, elementwise (erfc approximation, |error| < 1.2e-7)."""
+    z = np.abs(x) / math.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.5 * z)
+    poly = -z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 + t * (
+        -0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (-0.82215223 + t * 0.17087277))))))))
+    erfc = t * np.exp(poly)
+    return np.where(x >= 0, 1.0 - 0.5 * erfc, 0.5 * erfc)
+
+
+def _level_payment(balance: np.ndarray, monthly_rate: np.ndarray, months: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        growth = np.power(1.0 + monthly_rate, months)
+        emi = balance * monthly_rate * growth / (growth - 1.0)
+    return np.where(monthly_rate == 0, balance / months, emi)
+
+
+def load_exposures(scenario: Scenario) -> pd.DataFrame:
+    """Return the live loans with ``exposure``, ``lgd`` and the scenario's ``pd``."""
+    refresh_amortization()
+    loans = run_query(_EXPOSURE_SQL)
+    base = dict(run_query(_BASE_PD_SQL).itertuples(index=False, name=None))
+
+    bps = np.full(len(loans), scenario.shock.rate_bps, dtype=float)
+    multiplier = np.full(len(loans), scenario.shock.pd_multiplier, dtype=float)
+    for column, shocks in (("loan_type", scenario.by_loan_type), ("branch_name", scenario.by_branch)):
+        for key, shock in shocks.items():
+            hit = (loans[column] == key).to_numpy()
+            bps[hit] += shock.rate_bps
+            multiplier[hit] *= shock.pd_multiplier
+
+    rate = loans["annual_rate"].to_numpy(dtype=float) / 1200.0
+    months = np.maximum(loans["months_left"].fillna(1).to_numpy(dtype=float), 1.0)
+    balance = loans["exposure"].to_numpy(dtype=float)
+    ratio = _level_payment(balance, rate + bps / 120_000.0, months) / _level_payment(balance, rate, months)
+    base_pd = loans["loan_type"].map(base).fillna(DEFAULT_PD).clip(PD_FLOOR, PD_CAP).to_numpy(dtype=float)
+
+    loans["pd"] = np.clip(base_pd * multiplier * np.nan_to_num(ratio, nan=1.0) ** PAYMENT_ELASTICITY, PD_FLOOR, 0.999)
+    loans["lgd"] = loans["loan_type"].map(LGD).fillna(DEFAULT_LGD)
+    return loans
+
+
+def _cells(loans: pd.DataFrame) -> pd.DataFrame:
+    """Pool loans into (loan type, branch, PD bucket) cells.
+
+    A cell's PD is weighted by loss severity, so its expected loss equals the
+    sum over its loans.
+    """
+    severity = loans["exposure"] * loans["lgd"]
+    pooled = loans.assign(
+        bucket=np.round(np.log(loans["pd"].to_numpy()) * _PD_BUCKETS_PER_E).astype(np.int64),
+        severity=severity,
+        weighted_pd=severity * loans["pd"],
+    )
+    cells = pooled.groupby(["loan_type", "branch_name", "bucket"], sort=True).agg(
+        loans=("loan_id", "size"), exposure=("exposure", "sum"), severity=("severity", "sum"),
+        weighted_pd=("weighted_pd", "sum"),
+    ).reset_index()
+    cells["pd"] = cells["weighted_pd"] / cells["severity"]
+    cells["severity"] /= cells["loans"]
+    cells["threshold"] = np.vectorize(NormalDist().inv_cdf)(cells["pd"].to_numpy())
+    return cells
+
+
+def _simulate_chunk(
+    loans: np.ndarray, severity: np.ndarray, threshold: np.ndarray, correlation: float, paths: int, seed: Tuple[int, int]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Simulate ``paths`` paths; returns (loss per path, loss summed over paths per cell)."""
+    rng = np.random.default_rng(np.random.SeedSequence(seed))
+    losses = np.empty(paths)
+    cell_losses = np.zeros(len(loans))
+    scale = math.sqrt(1.0 - correlation)
+    block = max(1, _BLOCK_ELEMENTS // max(len(loans), 1))
+    for start in range(0, paths, block):
+        factor = rng.standard_normal(min(block, paths - start))
+        conditional = _norm_cdf((threshold[None, :] - math.sqrt(correlation) * factor[:, None]) / scale)
+        loss = rng.binomial(loans[None, :], conditional) * severity[None, :]
+        losses[start:start + len(factor)] = loss.sum(axis=1)
+        cell_losses += loss.sum(axis=0)
+    return losses, cell_losses
+
+
+def _statistics(losses: np.ndarray) -> Dict[str, float]:
+    var_99 = float(np.quantile(losses, 0.99))
+    return {
+        "expected_loss": float(losses.mean()),
+        "loss_std": float(losses.std()),
+        "var_95": float(np.quantile(losses, 0.95)),
+        "var_99": var_99,
+        "es_99": float(losses[losses >= var_99].mean()),
+        "max_loss": float(losses.max()),
+    }
+
+
+def _publish(run_id: int, losses: np.ndarray, cells: pd.DataFrame, cell_losses: np.ndarray, done: bool) -> None:
+    """Rewrite the run's statistics, histogram and segments from the paths so far."""
+    stats = _statistics(losses)
+    counts, edges = np.histogram(losses, bins=HISTOGRAM_BUCKETS)
+    segments = cells.assign(expected_loss=cell_losses / len(losses)).groupby(
+        ["loan_type", "branch_name"], sort=False
+    )[["loans", "exposure", "expected_loss"]].sum().reset_index()
+    with write_transaction(*_STRESS_TABLES) as conn:
+        conn.execute(
+            "UPDATE stress_runs SET paths_done = :paths_done, expected_loss = :expected_loss, loss_std = :loss_std, "
+            "var_95 = :var_95, var_99 = :var_99, es_99 = :es_99, max_loss = :max_loss, finished_at = :finished_at "
+            "WHERE run_id = :run_id",
+            {
+                **stats,
+                "paths_done": len(losses),
+                "run_id": run_id,
+                "finished_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S") if done else None,
+            },
+        )
+        conn.execute("DELETE FROM stress_loss_histogram WHERE run_id = ?", (run_id,))
+        conn.executemany(
+            "INSERT INTO stress_loss_histogram (run_id, bucket, loss_from, loss_to, paths) VALUES (?, ?, ?, ?, ?)",
+            [(run_id, i, float(edges[i]), float(edges[i + 1]), int(n)) for i, n in enumerate(counts)],
+        )
+        conn.execute("DELETE FROM stress_segments WHERE run_id = ?", (run_id,))
+        conn.executemany(
+            "INSERT INTO stress_segments (run_id, loan_type, branch_name, loans, exposure, expected_loss) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(run_id, *row) for row in segments.itertuples(index=False, name=None)],
+        )
+
+
+def run_stress_test(
+    scenario: Scenario,
+    paths: int = DEFAULT_PATHS,
+    seed: int = DEFAULT_SEED,
+    workers: Optional[int] = None,
+    chunk_paths: int = DEFAULT_CHUNK_PATHS,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> StressResult:
+    """Simulate ``paths`` loss paths of the live loan book under ``scenario``.
+
+    Args:
+        scenario: Shocks to apply.
+        paths: Number of Monte Carlo paths.
+        seed: Base seed; each chunk of paths derives its own from it.
+        workers: Simulation processes (default: CPU count).
+        chunk_paths: Paths per task handed to a worker.
+        progress: Called with ``(paths done, paths)`` as chunks complete.
+    """
+    started = time.perf_counter()
+    conn = get_connection()
+    ensure_stress_tables(conn)
+    loans = load_exposures(scenario)
+    cells = _cells(loans)
+    exposure = float(loans["exposure"].sum())
+    with write_transaction(*_STRESS_TABLES) as tx:
+        run_id = tx.execute(
+            "INSERT INTO stress_runs (scenario, definition, started_at, seed, paths, loans, exposure) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) RETURNING run_id",
+            (
+                scenario.name,
+                json.dumps(scenario.to_dict()),
+                datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                seed,
+                paths,
+                len(loans),
+                exposure,
+            ),
+        ).fetchone()[0]
+
+    arrays = (
+        cells["loans"].to_numpy(dtype=np.int64),
+        cells["severity"].to_numpy(dtype=float),
+        cells["threshold"].to_numpy(dtype=float),
+    )
+    starts = list(range(0, paths, chunk_paths))
+    chunks: List[Optional[np.ndarray]] = [None] * len(starts)
+    cell_losses = np.zeros(len(cells))
+    done = 0
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                _simulate_chunk, *arrays, scenario.correlation, min(chunk_paths, paths - start), (seed, i)
+            ): i
+            for i, start in enumerate(starts)
+        }
+        for future in as_completed(futures):
+            losses, per_cell = future.result()
+            chunks[futures[future]] = losses
+            cell_losses += per_cell
+            done += len(losses)
+            # Statistics over every path simulated so far; chunks finish in any order
+            _publish(run_id, np.concatenate([c for c in chunks if c is not None]), cells, cell_losses, done == paths)
+            if progress:
+                progress(done, paths)
+
+    segments = run_query("SELECT * FROM stress_segments WHERE run_id = ? ORDER BY expected_loss DESC", (run_id,))
+    return StressResult(
+        run_id, scenario, len(loans), exposure, np.concatenate(chunks), segments, time.perf_counter() - started
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from scripts import commonmethod
+
+    parser = argparse.ArgumentParser(description="Monte Carlo stress test of the loan book.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="preset (repeatable; default: all)")
+    parser.add_argument("--scenario-file", help="JSON scenario or list of scenarios (see Scenario.to_dict)")
+    parser.add_argument("--paths", type=int, default=DEFAULT_PATHS, help="Monte Carlo paths per scenario")
+    parser.add_argument("--chunk-paths", type=int, default=DEFAULT_CHUNK_PATHS, help="paths per worker task")
+    parser.add_argument("--workers", type=int, help="simulation processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--db", default=commonmethod.DB_PATH, help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    commonmethod.DB_PATH = args.db
+    scenarios = [SCENARIOS[name] for name in args.scenario or ([] if args.scenario_file else SCENARIOS)]
+    if args.scenario_file:
+        with open(args.scenario_file, encoding="utf-8") as f:
+            data = json.load(f)
+        scenarios += [Scenario.from_dict(d) for d in (data if isinstance(data, list) else [data])]
+
+    for scenario in scenarios:
+        result = run_stress_test(scenario, args.paths, args.seed, args.workers, args.chunk_paths)
+        print(
+            f"{scenario.name}: {result.loans:,} loans, exposure ₹{result.exposure:,.0f} | "
+            f"EL ₹{result.expected_loss:,.0f}  VaR99 ₹{result.var(0.99):,.0f}  "
+            f"ES99 ₹{result.expected_shortfall(0.99):,.0f}  ({result.elapsed:.1f}s, run {result.run_id})"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""Stream a (filtered) table to CSV, Parquet or NDJSON in bounded memory.
+
+Rows are pulled from a SQLite cursor with ``fetchmany`` and written chunk by
+chunk, so no DataFrame of the full result is ever built.
+
+Usage:
+    python -m scripts.table_export transactions -f csv -o transactions.csv
+    python -m scripts.table_export transactions -f parquet --column status --value failed -o failed.parquet
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import sys
+from typing import BinaryIO, Iterator, List, Optional, Sequence, Tuple
+
+from scripts import commonmethod
+from scripts.commonmethod import get_connection, run_query
+from scripts.table_query import TableFilter, build_select
+
+__all__ = [
+    "EXPORT_FORMATS",
+    "CONTENT_TYPES",
+    "iter_chunks",
+    "export_table",
+]
+
+EXPORT_FORMATS: Tuple[str, ...] = ("csv", "parquet", "ndjson")
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "ndjson": "application/x-ndjson",
+}
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+def iter_chunks(flt: TableFilter, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[List[str], List[tuple]]]:
+    """Yield ``(column_names, rows)`` chunks of the filtered table."""
+    sql, params = build_select(flt)
+    cursor = get_connection().cursor()
+    try:
+        cursor.execute(sql, params)
+        columns = [d[0] for d in cursor.description]
+        yielded = False
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yielded = True
+            yield columns, rows
+        if not yielded:
+            # Still emit the header/schema for an empty result
+            yield columns, []
+    finally:
+        cursor.close()
+
+
+def _write_csv(chunks: Iterator[Tuple[List[str], List[tuple]]], out: BinaryIO) -> int:
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="", write_through=True)
+    writer = csv.writer(text)
+    total = 0
+    header_written = False
+    for columns, rows in chunks:
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        writer.writerows(rows)
+        total += len(rows)
+    text.flush()
+    text.detach()
+    return total
+
+
+def _write_ndjson(chunks: Iterator[Tuple[List[str], List[tuple]]], out: BinaryIO) -> int:
+    total = 0
+    for columns, rows in chunks:
+        lines = "".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows)
+        out.write(lines.encode("utf-8"))
+        total += len(rows)
+    return total
+
+
+def _parquet_schema(flt: TableFilter, columns: Sequence[str]):
+    """Map declared SQLite types to Arrow, demoting columns holding mixed values to string."""
+    import pyarrow as pa
+
+    declared = {
+        row['name']: (row['type'] or "").upper()
+        for _, row in run_query(f'PRAGMA table_info("{flt.table}")', cache=True).iterrows()
+    }
+    candidates = {}
+    for col in columns:
+        decl = declared.get(col, "")
+        if "INT" in decl:
+            candidates[col] = (pa.int64(), "('integer', 'null')")
+        elif any(t in decl for t in ("REAL", "FLOA", "DOUB")):
+            candidates[col] = (pa.float64(), "('integer', 'real', 'null')")
+
+    mixed = set()
+    if candidates:
+        # One pass over the table to find numeric columns holding stray text values
+        probes = ", ".join(
+            f'MAX(typeof("{col}") NOT IN {allowed})' for col, (_, allowed) in candidates.items()
+        )
+        sql, params = build_select(flt, probes)
+        flags = get_connection().execute(sql, params).fetchone()
+        mixed = {col for col, flag in zip(candidates, flags) if flag}
+
+    fields = []
+    for col in columns:
+        if col in candidates and col not in mixed:
+            fields.append(pa.field(col, candidates[col][0]))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    return pa.schema(fields)
+
+
+def _write_parquet(flt: TableFilter, chunks: Iterator[Tuple[List[str], List[tuple]]], out: BinaryIO) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:  # pragma: no cover - optional dependency
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow).") from e
+
+    writer = None
+    total = 0
+    try:
+        for columns, rows in chunks:
+            if writer is None:
+                schema = _parquet_schema(flt, columns)
+                writer = pq.ParquetWriter(out, schema)
+            arrays = []
+            for i, field in enumerate(schema):
+                values = [row[i] for row in rows]
+                if pa.types.is_string(field.type):
+                    values = [None if v is None else str(v) for v in values]
+                arrays.append(pa.array(values, type=field.type))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            total += len(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    return total
+
+
+def export_table(
+    flt: TableFilter,
+    fmt: str,
+    out: BinaryIO,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    """Write the rows matching ``flt`` to the binary stream ``out``.
+
+    Args:
+        flt: Table and filter to export.
+        fmt: One of EXPORT_FORMATS.
+        out: Binary file-like object to write to.
+        chunk_size: Rows fetched from the cursor per batch.
+
+    Returns:
+        Number of rows written.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt!r}")
+    chunks = iter_chunks(flt, chunk_size)
+    if fmt == "csv":
+        return _write_csv(chunks, out)
+    if fmt == "ndjson":
+        return _write_ndjson(chunks, out)
+    return _write_parquet(flt, chunks, out)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Stream a BankSight table to CSV, Parquet or NDJSON.")
+    parser.add_argument("table", help="Table to export")
+    parser.add_argument("-f", "--format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    parser.add_argument("--column", help="Column to filter on")
+    parser.add_argument("--value", action="append", default=[], help="Exact value to match (repeatable)")
+    parser.add_argument("--search", default="", help="Case-insensitive substring to match")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--db", default=commonmethod.DB_PATH, help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    commonmethod.DB_PATH = args.db
+    flt = TableFilter(args.table, args.column, tuple(args.value), args.search)
+    if args.output:
+        with open(args.output, "wb") as out:
+            count = export_table(flt, args.format, out, args.chunk_size)
+    else:
+        count = export_table(flt, args.format, sys.stdout.buffer, args.chunk_size)
+    print(f"Exported {count} rows from {args.table}.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""Compile Explorer filters into parameterized SQL and page through results.
+
+Only whitelisted table and column names are ever interpolated into SQL; filter
+values always travel as bound parameters.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+import pandas as pd
+
+from scripts.commonmethod import run_query
+
+__all__ = [
+    "ROWID_COLUMN",
+    "TableFilter",
+    "list_tables",
+    "table_columns",
+    "build_where",
+    "build_select",
+    "count_rows",
+    "fetch_page",
+]
+
+# Alias under which fetch_page returns each row's rowid (the keyset cursor)
+ROWID_COLUMN = "__rowid"
+
+
+@dataclass(frozen=True)
+class TableFilter:
+    """Explorer filter state for one table.
+
+    Attributes:
+        table: Table to read.
+        column: Column the filter applies to (None for no filter).
+        values: Exact values to match (multiselect); empty means no constraint.
+        search: Case-insensitive substring to look for (text search).
+    """
+
+    table: str
+    column: Optional[str] = None
+    values: Tuple[Any, ...] = ()
+    search: str = ""
+
+
+def list_tables() -> List[str]:
+    """Return the user tables in the database."""
+    return run_query(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';",
+        cache=True,
+    )['name'].tolist()
+
+
+def table_columns(table: str) -> List[str]:
+    """Return the column names of a whitelisted table."""
+    if table.lower() not in {t.lower() for t in list_tables()}:
+        raise ValueError(f"Unknown table: {table!r}")
+    return run_query(f'PRAGMA table_info("{table}")', cache=True)['name'].tolist()
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _is_null(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def build_where(flt: TableFilter) -> Tuple[str, List[Any]]:
+    """Compile a filter into a WHERE clause (possibly empty) and its params."""
+    if not flt.column or (not flt.values and not flt.search):
+        return "", []
+    if flt.column not in table_columns(flt.table):
+        raise ValueError(f"Unknown column {flt.column!r} for table {flt.table!r}")
+
+    col = _quote(flt.column)
+    clauses: List[str] = []
+    params: List[Any] = []
+    if flt.values:
+        concrete = [v.item() if hasattr(v, "item") else v for v in flt.values if not _is_null(v)]
+        parts = []
+        if concrete:
+            parts.append(f"{col} IN ({', '.join('?' for _ in concrete)})")
+            params.extend(concrete)
+        if len(concrete) != len(flt.values):
+            parts.append(f"{col} IS NULL")
+        clauses.append("(" + " OR ".join(parts) + ")")
+    if flt.search:
+        escaped = flt.search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        clauses.append(f"CAST({col} AS TEXT) LIKE ? ESCAPE '\\'")
+        params.append(f"%{escaped}%")
+    return " WHERE " + " AND ".join(clauses), params
+
+
+def build_select(flt: TableFilter, columns: str = "*") -> Tuple[str, List[Any]]:
+    """Return ``SELECT <columns> FROM <table> [WHERE ...]`` and its params."""
+    if flt.table.lower() not in {t.lower() for t in list_tables()}:
+        raise ValueError(f"Unknown table: {flt.table!r}")
+    where, params = build_where(flt)
+    return f"SELECT {columns} FROM {_quote(flt.table)}{where}", params
+
+
+def count_rows(flt: TableFilter) -> int:
+    """Return the number of rows matching the filter."""
+    sql, params = build_select(flt, "COUNT(*)")
+    return int(run_query(sql, params, cache=True).iloc[0, 0])
+
+
+def fetch_page(
+    flt: TableFilter,
+    page_size: int,
+    after_rowid: Optional[int] = None,
+    offset: int = 0,
+) -> pd.DataFrame:
+    """Fetch one page of matching rows in rowid order.
+
+    Pass ``after_rowid`` (the last ``ROWID_COLUMN`` value of the previous page)
+    for keyset pagination, which costs O(page_size) however deep the page is.
+    ``offset`` is the fallback for jumping to a page whose anchor is unknown.
+    """
+    sql, params = build_select(flt, f"rowid AS {ROWID_COLUMN}, *")
+    if after_rowid is not None:
+        sql += (" AND " if " WHERE " in sql else " WHERE ") + "rowid > ?"
+        params.append(int(after_rowid))
+        offset = 0
+    sql += " ORDER BY rowid LIMIT ? OFFSET ?"
+    params.extend([int(page_size), int(offset)])
+    return run_query(sql, params)
@@ -0,0 +1,225 @@
+"""Collision-free transaction ids.
+
+New ids look like ``T`` + 13-digit epoch milliseconds + 3-digit node + 3-digit
+sequence, e.g. ``T1792307811044007012`` (20 characters, the width of
+``transactions.txn_id``). They are unique across every process sharing the
+database, increase monotonically within a process, and sort after the legacy
+``T00001``-style ids loaded from ``Data/transactions.csv``.
+
+Each process leases a node number from the ``txn_id_nodes`` table for
+``LEASE_TTL`` seconds and renews it while it keeps issuing ids; a crashed
+process's node becomes reusable once its lease expires. Within a node the
+sequence allows 1,000 ids per millisecond; beyond that the generator borrows
+the next millisecond rather than repeat an id, and a new holder of the node
+never starts below the last millisecond recorded by the previous one.
+
+Allocate ids *before* opening a write transaction on the same thread: taking
+or renewing a lease writes to the database on a separate connection.
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional, Tuple
+
+from scripts import commonmethod
+
+__all__ = [
+    "LEASE_TTL",
+    "MAX_NODES",
+    "TxnIdGenerator",
+    "ensure_node_table",
+    "get_generator",
+    "next_txn_id",
+    "next_txn_ids",
+    "parse_txn_id",
+]
+
+LEASE_TTL = 300.0
+MAX_NODES = 1000
+SEQUENCE_SIZE = 1000
+PREFIX = "T"
+
+_NODE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS txn_id_nodes (
+    node_id INTEGER PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    last_ms INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+
+def ensure_node_table(conn: sqlite3.Connection) -> None:
+    """Create the node lease table if it does not exist."""
+    conn.execute(_NODE_TABLE_SQL)
+
+
+def parse_txn_id(txn_id: str) -> Optional[Tuple[int, int, int]]:
+    """Split a generated id into ``(epoch_ms, node, sequence)``; None for legacy ids."""
+    digits = txn_id[len(PREFIX):]
+    if not txn_id.startswith(PREFIX) or len(digits) != 19 or not digits.isdigit():
+        return None
+    return int(digits[:13]), int(digits[13:16]), int(digits[16:])
+
+
+class TxnIdGenerator:
+    """Issues ids for one process from a leased node number. Thread-safe.
+
+    Args:
+        db_path: Database holding the lease table; defaults to
+            ``commonmethod.DB_PATH`` at the time a lease is taken.
+        ttl: Lease length in seconds; renewed once half of it has passed.
+        clock: Returns the current time in seconds (for tests).
+    """
+
+    def __init__(self, db_path: Optional[str] = None, ttl: float = LEASE_TTL, clock: Callable[[], float] = time.time):
+        self._db_path = db_path
+        self._ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._holder = ""
+        self._node: Optional[int] = None
+        self._renew_at = 0.0
+        self._last_ms = 0
+        self._seq = 0
+
+    @property
+    def node(self) -> Optional[int]:
+        """The leased node number, or None before the first id."""
+        return self._node
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._db_path or commonmethod.DB_PATH, timeout=10, isolation_level=None)
+        ensure_node_table(conn)
+        return conn
+
+    def _acquire(self, now: float) -> None:
+        # A forked child must not keep issuing its parent's ids
+        self._pid = os.getpid()
+        self._holder = f"{socket.gethostname()}:{self._pid}:{uuid.uuid4().hex[:8]}"
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT node_id, last_ms FROM txn_id_nodes WHERE expires_at < ? ORDER BY node_id LIMIT 1", (now,)
+            ).fetchone()
+            if row is None:
+                node = conn.execute("SELECT COALESCE(MAX(node_id) + 1, 0) FROM txn_id_nodes").fetchone()[0]
+                if node >= MAX_NODES:
+                    raise RuntimeError(f"All {MAX_NODES} transaction id nodes are leased.")
+                last_ms = 0
+            else:
+                node, last_ms = row
+            conn.execute(
+                "INSERT INTO txn_id_nodes (node_id, holder, expires_at, last_ms) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(node_id) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at",
+                (node, self._holder, now + self._ttl, last_ms),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        self._node = node
+        self._last_ms = max(self._last_ms, last_ms)
+        self._seq = SEQUENCE_SIZE  # force a fresh millisecond under the new node
+        self._renew_at = now + self._ttl / 2
+
+    def _renew(self, now: float) -> None:
+        conn = self._connect()
+        try:
+            updated = conn.execute(
+                "UPDATE txn_id_nodes SET expires_at = ?, last_ms = ? WHERE node_id = ? AND holder = ?",
+                (now + self._ttl, self._last_ms, self._node, self._holder),
+            ).rowcount
+        finally:
+            conn.close()
+        if updated:
+            self._renew_at = now + self._ttl / 2
+        else:
+            # Lease lapsed and was taken over (e.g. the process was suspended)
+            self._acquire(now)
+
+    def _ensure_lease(self) -> None:
+        now = self._clock()
+        if self._node is None or self._pid != os.getpid():
+            self._acquire(now)
+        elif now >= self._renew_at:
+            self._renew(now)
+
+    def next_ids(self, count: int) -> List[str]:
+        """Return ``count`` new ids in increasing order."""
+        if count <= 0:
+            return []
+        with self._lock:
+            self._ensure_lease()
+            node = self._node
+            ids = []
+            for _ in range(count):
+                ms = int(self._clock() * 1000)
+                if ms > self._last_ms:
+                    self._last_ms, self._seq = ms, 0
+                elif self._seq < SEQUENCE_SIZE - 1:
+                    self._seq += 1
+                else:
+                    # Sequence exhausted (or clock went backwards): borrow the next millisecond
+                    self._last_ms, self._seq = self._last_ms + 1, 0
+                ids.append(f"{PREFIX}{self._last_ms:013d}{node:03d}{self._seq:03d}")
+            return ids
+
+    def next_id(self) -> str:
+        """Return one new id."""
+        return self.next_ids(1)[0]
+
+    def release(self) -> None:
+        """Give the node back so another process can use it immediately."""
+        with self._lock:
+            if self._node is None or self._pid != os.getpid():
+                return
+            try:
+                conn = self._connect()
+                try:
+                    conn.execute(
+                        "UPDATE txn_id_nodes SET expires_at = 0, last_ms = ? WHERE node_id = ? AND holder = ?",
+                        (self._last_ms, self._node, self._holder),
+                    )
+                finally:
+                    conn.close()
+            except sqlite3.Error:
+                pass  # the lease simply expires
+            self._node = None
+
+
+_generator: Optional[TxnIdGenerator] = None
+_generator_lock = threading.Lock()
+
+
+def get_generator() -> TxnIdGenerator:
+    """Return the process-wide generator (its lease is released at exit)."""
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                _generator = TxnIdGenerator()
+                atexit.register(_generator.release)
+    return _generator
+
+
+def next_txn_id() -> str:
+    """Return a new transaction id from the process-wide generator."""
+    return get_generator().next_id()
+
+
+def next_txn_ids(count: int) -> List[str]:
+    """Return ``count`` new transaction ids from the process-wide generator."""
+    return get_generator().next_ids(count)
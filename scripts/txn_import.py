@@ -0,0 +1,382 @@
+"""Bulk transaction import.
+
+Reads a CSV or NDJSON file of transactions, validates every row against the
+posting rules of :mod:`scripts.ledger` and posts the accepted rows in one
+transaction. Rows that fail go to a rejects CSV (the original columns plus
+``reason`` and ``detail``).
+
+Validation is vectorized. Field checks (type, status, amount, time, account
+and customer, duplicate ids) are column operations. The ₹1,000 floor is a
+per-account running balance (a grouped cumulative sum, in time order) over
+the balances read under the write lock. A debit that would breach the floor
+is refused and does not count towards later rows, so each pass refuses the
+first breach of every affected account and re-checks only those accounts.
+Accepted rows are inserted with ``executemany``, and every account gets one
+``UPDATE`` with its net change.
+
+Recognised columns (case-insensitive): ``account_id``, ``txn_type`` and
+``amount`` are required; ``customer_id`` (checked against the account),
+``txn_time`` (default: now), ``status`` (default: Success, or Pending for
+loan and credit-card payments), ``reference_id`` (the loan or card a payment
+is for) and ``txn_id`` (default: generated) are optional.
+
+Usage:
+    python -m scripts.txn_import month_end.csv [--dry-run] [--rejects PATH]
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import sys
+import time
+import warnings
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Set
+
+import numpy as np
+import pandas as pd
+
+from scripts.commonmethod import write_transaction
+from scripts.etl import sniff_date_format
+from scripts.ledger import (
+    CREDIT_TYPES,
+    DEBIT_TYPES,
+    DEFERRED_TYPES,
+    INSUFFICIENT_FUNDS,
+    INVALID,
+    MIN_BALANCE,
+    STATUSES,
+    TXN_TYPES,
+    UNKNOWN_ACCOUNT,
+    ensure_reference_column,
+)
+from scripts.txn_ids import next_txn_ids
+
+__all__ = [
+    "DUPLICATE_TXN_ID",
+    "ImportResult",
+    "read_transactions",
+    "validate_transactions",
+    "import_transactions",
+]
+
+DUPLICATE_TXN_ID = "duplicate_txn_id"
+JSON_LINES_SUFFIXES = (".json", ".jsonl", ".ndjson")
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Running balances are float sums; don't refuse a debit over rounding noise
+_FLOOR_TOLERANCE = 1e-6
+
+_INSERT_SQL = (
+    "INSERT INTO transactions (txn_id, account_id, customer_id, txn_type, amount, txn_time, status, reference_id) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_BALANCE_SQL = "UPDATE accounts SET account_balance = account_balance + ?, last_updated = ? WHERE account_id = ?"
+_ACCOUNTS_SQL = (
+    "SELECT account_id, customer_id, account_balance FROM accounts "
+    "WHERE account_id IN (SELECT value FROM json_each(?))"
+)
+_EXISTING_IDS_SQL = "SELECT txn_id FROM transactions WHERE txn_id IN (SELECT value FROM json_each(?))"
+
+
+@dataclass(frozen=True)
+class ImportResult:
+    """Summary of one import.
+
+    ``posted`` rows were written (including Pending/Failed rows that only
+    log); ``reasons`` counts rejected rows per reason code.
+    """
+
+    source: str
+    rows: int
+    posted: int
+    rejected: int
+    rejects_path: Optional[str]
+    elapsed: float
+    dry_run: bool = False
+    reasons: Dict[str, int] = field(default_factory=dict)
+
+
+def read_transactions(path: str) -> pd.DataFrame:
+    """Read a CSV or NDJSON transactions file with lowercased column names, values untouched."""
+    suffix = Path(path).suffix.lower()
+    if suffix == ".csv":
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    elif suffix in JSON_LINES_SUFFIXES:
+        df = pd.read_json(path, lines=True, dtype=False)
+    else:
+        raise ValueError(f"Unsupported file type: {suffix!r}")
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    return df.reset_index(drop=True)
+
+
+def _text(raw: pd.DataFrame, column: str) -> pd.Series:
+    """``column`` as stripped strings, "" where missing."""
+    if column not in raw:
+        return pd.Series("", index=raw.index, dtype=object)
+    values = raw[column]
+    return values.where(values.notna(), "").astype(str).str.strip()
+
+
+def _parse_times(values: pd.Series, now: str) -> pd.Series:
+    """Parse ``values`` to TIME_FORMAT text; blanks become ``now``, failures NaN."""
+    blank = values == ""
+    fmt = sniff_date_format(values[~blank])
+    parsed = pd.to_datetime(values, format=fmt, errors="coerce") if fmt else pd.Series(pd.NaT, index=values.index)
+    # Stragglers: ISO 8601 variants first, then anything day-first (as the ETL does)
+    for fallback_format in ("ISO8601", "mixed"):
+        misses = ~blank & parsed.isna()
+        if not misses.any():
+            break
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="Parsing dates")
+            fallback = pd.to_datetime(values[misses], errors="coerce", dayfirst=True, format=fallback_format)
+        if parsed.dtype != fallback.dtype:
+            parsed = parsed.astype(fallback.dtype)
+        parsed.loc[misses] = fallback
+    out = parsed.dt.strftime(TIME_FORMAT)
+    out[blank] = now
+    return out
+
+
+def _floor_refusals(codes: np.ndarray, opening: np.ndarray, delta: np.ndarray, debit: np.ndarray):
+    """Refuse debits that would take an account below MIN_BALANCE.
+
+    Rows must be sorted by account code, then time. Returns ``(refused,
+    running)``: the refused rows and each row's balance after it (for a
+    refused row, the balance it found).
+    """
+    refused = np.zeros(len(delta), dtype=bool)
+    running = np.empty(len(delta))
+    rows = np.arange(len(delta))
+    while rows.size:
+        step = np.where(refused[rows], 0.0, delta[rows])
+        sub_codes = codes[rows]
+        after = opening[sub_codes] + pd.Series(step).groupby(sub_codes, sort=False).cumsum().to_numpy()
+        running[rows] = after
+        breach = debit[rows] & ~refused[rows] & (after < MIN_BALANCE - _FLOOR_TOLERANCE)
+        if not breach.any():
+            break
+        hits = rows[breach]
+        first = hits[np.r_[True, codes[hits][1:] != codes[hits][:-1]]]
+        refused[first] = True
+        # Only accounts that just had a refusal can change
+        rows = rows[np.isin(sub_codes, codes[first])]
+    return refused, running
+
+
+def validate_transactions(
+    raw: pd.DataFrame,
+    accounts: pd.DataFrame,
+    existing_ids: Set[str],
+    now: Optional[str] = None,
+) -> pd.DataFrame:
+    """Check every row of ``raw`` against the posting rules.
+
+    Args:
+        raw: Rows as returned by :func:`read_transactions`.
+        accounts: ``account_id``, ``customer_id``, ``account_balance`` of the
+            accounts referenced by ``raw`` (current balances).
+        existing_ids: ``txn_id`` values of ``raw`` already in the database.
+        now: Time given to rows without a ``txn_time``.
+
+    Returns:
+        One row per input row (same index) with the canonical
+        ``txn_id`` ("" if to be generated), ``account_id``, ``customer_id``,
+        ``txn_type``, ``amount``, ``txn_time``, ``status``, ``reference_id``, the signed balance
+        ``delta``, and ``reason``/``detail`` ("" for accepted rows).
+    """
+    now = now or datetime.datetime.now().strftime(TIME_FORMAT)
+    n = len(raw)
+    reason = np.full(n, "", dtype=object)
+    detail = np.full(n, "", dtype=object)
+
+    def reject(mask, code, message) -> None:
+        mask = np.asarray(mask, dtype=bool) & (reason == "")
+        reason[mask] = code
+        detail[mask] = message[mask] if isinstance(message, np.ndarray) else message
+
+    account_id = pd.to_numeric(_text(raw, "account_id"), errors="coerce")
+    reject(account_id.isna() | (account_id % 1 != 0), INVALID, "account_id is missing or not a number")
+
+    kinds = _text(raw, "txn_type").str.lower()
+    txn_type = kinds.map({t.lower(): t for t in TXN_TYPES})
+    reject(txn_type.isna(), INVALID, f"txn_type must be one of {', '.join(TXN_TYPES)}")
+    deferred = kinds.isin(DEFERRED_TYPES)
+
+    amount = pd.to_numeric(_text(raw, "amount"), errors="coerce")
+    reject(amount.isna(), INVALID, "amount is missing or not a number")
+    reject(amount <= 0, INVALID, "amount must be positive")
+
+    status_text = _text(raw, "status").str.lower()
+    status = status_text.map({s.lower(): s for s in STATUSES})
+    unset = status_text == ""
+    status.loc[unset] = np.where(deferred[unset], "Pending", "Success")
+    reject(status.isna(), INVALID, f"status must be one of {', '.join(STATUSES)}")
+    reject(deferred & (status != "Pending"), INVALID, "loan and credit-card payments are posted as Pending")
+
+    reference_text = _text(raw, "reference_id")
+    reference_id = pd.to_numeric(reference_text, errors="coerce")
+    reject((reference_text != "") & (reference_id.isna() | (reference_id % 1 != 0)), INVALID, "reference_id is not a number")
+
+    txn_time = _parse_times(_text(raw, "txn_time"), now)
+    reject(txn_time.isna(), INVALID, "txn_time is not a recognised date/time")
+
+    # Account must exist and, if a customer is given, belong to them
+    known = accounts.set_index("account_id")
+    owner = account_id.map(known["customer_id"])
+    reject(owner.isna(), UNKNOWN_ACCOUNT, "account not found")
+    customer = _text(raw, "customer_id")
+    reject((customer != "") & (customer != owner.astype(str)), UNKNOWN_ACCOUNT, "account belongs to another customer")
+
+    txn_id = _text(raw, "txn_id")
+    given = txn_id != ""
+    reject(given & txn_id.duplicated(keep="first"), DUPLICATE_TXN_ID, "txn_id repeated in this file")
+    reject(given & txn_id.isin(existing_ids), DUPLICATE_TXN_ID, "txn_id already exists")
+
+    out = pd.DataFrame(
+        {
+            "txn_id": txn_id,
+            "account_id": account_id,
+            "customer_id": owner,
+            "txn_type": txn_type,
+            "amount": amount,
+            "txn_time": txn_time,
+            "status": status,
+            "reference_id": reference_id,
+        },
+        index=raw.index,
+    )
+    success = (status == "Success").to_numpy()
+    direction = np.where(kinds.isin(DEBIT_TYPES), -1.0, np.where(kinds.isin(CREDIT_TYPES), 1.0, 0.0)) * success
+    out["delta"] = np.where(reason == "", direction * amount.fillna(0).to_numpy(), 0.0)
+
+    # Minimum balance, per account in time order (file order breaks ties)
+    moving = np.flatnonzero((reason == "") & (out["delta"].to_numpy() != 0))
+    if moving.size:
+        order = moving[np.lexsort((moving, out["txn_time"].to_numpy()[moving], out["account_id"].to_numpy()[moving]))]
+        codes, uniques = pd.factorize(out["account_id"].to_numpy()[order])
+        opening = known["account_balance"].astype(float).fillna(0).reindex(uniques).to_numpy()
+        delta = out["delta"].to_numpy()[order]
+        refused, running = _floor_refusals(codes, opening, delta, delta < 0)
+        hit = order[refused]
+        available = np.array([f"balance would fall below ₹{MIN_BALANCE:,.0f}; available ₹{b:,.2f}" for b in running[refused]], dtype=object)
+        message = np.full(n, "", dtype=object)
+        message[hit] = available
+        mask = np.zeros(n, dtype=bool)
+        mask[hit] = True
+        reject(mask, INSUFFICIENT_FUNDS, message)
+        out.loc[out.index[hit], "delta"] = 0.0
+
+    out["reason"] = reason
+    out["detail"] = detail
+    return out
+
+
+def _default_rejects_path(path: str) -> str:
+    p = Path(path)
+    return str(p.with_name(f"{p.stem}.rejects.csv"))
+
+
+def import_transactions(path: str, rejects_path: Optional[str] = None, dry_run: bool = False) -> ImportResult:
+    """Validate ``path`` and post its accepted rows in one transaction.
+
+    Balances are read and the rows validated and written under a single
+    ``BEGIN IMMEDIATE``, so no other posting can interleave. With
+    ``dry_run`` nothing is written except the rejects file.
+
+    Args:
+        path: CSV or NDJSON file of transactions.
+        rejects_path: Where to write rejected rows; defaults to
+            ``<name>.rejects.csv`` next to ``path``. Not written when every
+            row is accepted.
+        dry_run: Validate only.
+    """
+    started = time.perf_counter()
+    raw = read_transactions(path)
+    # Ids are allocated before taking the write lock (a node lease may need a write)
+    generated = iter(next_txn_ids(len(raw))) if not dry_run else iter(())
+
+    account_ids = pd.to_numeric(_text(raw, "account_id"), errors="coerce").dropna()
+    account_ids = [int(a) for a in account_ids.unique() if a % 1 == 0]
+    given_ids = [t for t in _text(raw, "txn_id").unique().tolist() if t]
+
+    with write_transaction("accounts", "transactions") as conn:
+        ensure_reference_column(conn)
+        conn.execute("BEGIN IMMEDIATE")
+        accounts = pd.DataFrame(
+            conn.execute(_ACCOUNTS_SQL, (json.dumps(account_ids),)).fetchall(),
+            columns=["account_id", "customer_id", "account_balance"],
+        )
+        existing = {row[0] for row in conn.execute(_EXISTING_IDS_SQL, (json.dumps(given_ids),))}
+        checked = validate_transactions(raw, accounts, existing)
+        accepted = checked[checked["reason"] == ""].sort_values(["txn_time"], kind="stable")
+
+        if not dry_run and not accepted.empty:
+            ids = [t if t else next(generated) for t in accepted["txn_id"]]
+            conn.executemany(
+                _INSERT_SQL,
+                zip(
+                    ids,
+                    accepted["account_id"].astype(int).tolist(),
+                    accepted["customer_id"].tolist(),
+                    accepted["txn_type"].tolist(),
+                    accepted["amount"].astype(float).tolist(),
+                    accepted["txn_time"].tolist(),
+                    accepted["status"].tolist(),
+                    [None if pd.isna(r) else int(r) for r in accepted["reference_id"]],
+                ),
+            )
+            net = accepted.loc[accepted["delta"] != 0].groupby("account_id")["delta"].sum()
+            today = datetime.date.today().strftime("%Y-%m-%d")
+            conn.executemany(_BALANCE_SQL, [(float(d), today, int(a)) for a, d in net.items()])
+
+    rejected = checked["reason"] != ""
+    written = None
+    if rejected.any():
+        written = rejects_path or _default_rejects_path(path)
+        rejects = raw[rejected.to_numpy()].copy()
+        rejects["reason"] = checked.loc[rejected, "reason"]
+        rejects["detail"] = checked.loc[rejected, "detail"]
+        rejects.to_csv(written, index=False)
+
+    return ImportResult(
+        source=path,
+        rows=len(raw),
+        posted=0 if dry_run else len(accepted),
+        rejected=int(rejected.sum()),
+        rejects_path=written,
+        elapsed=time.perf_counter() - started,
+        dry_run=dry_run,
+        reasons=checked.loc[rejected, "reason"].value_counts().to_dict(),
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from scripts import commonmethod
+
+    parser = argparse.ArgumentParser(description="Validate and post a CSV/NDJSON file of transactions.")
+    parser.add_argument("path", help="CSV or NDJSON transactions file")
+    parser.add_argument("--rejects", default=None, help="rejects CSV (default: <name>.rejects.csv)")
+    parser.add_argument("--dry-run", action="store_true", help="validate without posting")
+    parser.add_argument("--db", default=commonmethod.DB_PATH, help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    commonmethod.DB_PATH = args.db
+    result = import_transactions(args.path, args.rejects, args.dry_run)
+    verb = "Validated" if result.dry_run else "Posted"
+    print(
+        f"{verb} {result.rows - result.rejected:,} of {result.rows:,} rows in {result.elapsed:.2f}s; "
+        f"{result.rejected:,} rejected"
+    )
+    for code, count in sorted(result.reasons.items()):
+        print(f"  {code}: {count:,}")
+    if result.rejects_path:
+        print(f"Rejects written to {result.rejects_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())